@@ -13,17 +13,26 @@ from .const import (
     CALCULATION_MODE,
     CONF_API_KEY,
     CONF_AREA,
+    CONF_CURRENCY,
     CONF_ENERGY_SCALE,
     CONF_CALCULATION_MODE,
+    CONF_DATASETS,
+    CONF_ENERGY_METER,
+    CONF_FETCH_SPREAD,
     CONF_MODIFYER,
     CONF_VAT_VALUE,
+    CONF_ZONES,
+    DEFAULT_CURRENCY,
+    DEFAULT_FETCH_SPREAD,
     DEFAULT_MODIFYER,
     DEFAULT_ENERGY_SCALE,
+    DEFAULT_PERIOD,
     DOMAIN,
     CONF_PERIOD,
 )
 from .coordinator import EntsoeCoordinator
 from .services import async_setup_services
+from .zones import EntsoeZonesCoordinator
 
 _LOGGER = logging.getLogger(__name__)
 PLATFORMS = [Platform.SENSOR]
@@ -39,45 +48,108 @@ async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up the ENTSO-e prices component from a config entry."""
+    if CONF_ZONES in entry.options:
+        return await async_setup_zones_entry(hass, entry)
 
     # Initialise the coordinator and save it as domain-data
-    api_key = entry.options[CONF_API_KEY]
-    area = entry.options[CONF_AREA]
-    period = entry.options.get(CONF_PERIOD, "PT60M")
-    energy_scale = entry.options.get(CONF_ENERGY_SCALE, DEFAULT_ENERGY_SCALE)
-    modifyer = entry.options.get(CONF_MODIFYER, DEFAULT_MODIFYER)
-    vat = entry.options.get(CONF_VAT_VALUE, 0)
-    calculation_mode = entry.options.get(
-        CONF_CALCULATION_MODE, CALCULATION_MODE["default"]
-    )
-    entsoe_coordinator = EntsoeCoordinator(
-        hass,
-        api_key=api_key,
-        area=area,
-        period=period,
-        energy_scale=energy_scale,
-        modifyer=modifyer,
-        calculation_mode=calculation_mode,
-        VAT=vat,
-    )
+    entsoe_coordinator = EntsoeCoordinator(hass, **_coordinator_options(entry))
 
     hass.data.setdefault(DOMAIN, {})[entry.entry_id] = entsoe_coordinator
 
-    # Fetch initial data, so we have data when entities subscribe and set up the platform
-    await entsoe_coordinator.async_config_entry_first_refresh()
+    # recalculate the prices when an entity used in the template changes
+    entsoe_coordinator.async_track_template()
+    entry.async_on_unload(entsoe_coordinator.async_untrack_template)
+
+    # Start from the archived prices, the entities restore their state when there are none
+    await entsoe_coordinator.async_load_cached()
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
     entry.async_on_unload(entry.add_update_listener(async_update_options))
 
+    # Fetch the latest data without holding up the setup, the sensors update when it completes
+    entry.async_create_background_task(
+        hass, entsoe_coordinator.async_refresh(), f"{DOMAIN} first refresh"
+    )
+
     return True
 
 
+async def async_setup_zones_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
+    """Set up an entry comparing the prices of several zones."""
+    zones_coordinator = EntsoeZonesCoordinator(
+        hass,
+        api_key=entry.options[CONF_API_KEY],
+        zones=entry.options[CONF_ZONES],
+        period=entry.options.get(CONF_PERIOD, DEFAULT_PERIOD),
+        energy_scale=entry.options.get(CONF_ENERGY_SCALE, DEFAULT_ENERGY_SCALE),
+        currency=entry.options.get(CONF_CURRENCY, DEFAULT_CURRENCY),
+        fetch_spread=entry.options.get(CONF_FETCH_SPREAD, DEFAULT_FETCH_SPREAD),
+    )
+    hass.data.setdefault(DOMAIN, {})[entry.entry_id] = zones_coordinator
+
+    await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+    entry.async_on_unload(entry.add_update_listener(async_reload_entry))
+
+    entry.async_create_background_task(
+        hass, zones_coordinator.async_refresh(), f"{DOMAIN} first refresh"
+    )
+
+    return True
+
+
+async def async_reload_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Reload the entry after its options changed."""
+    await hass.config_entries.async_reload(entry.entry_id)
+
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
     if unload_ok := await hass.config_entries.async_unload_platforms(entry, PLATFORMS):
-        hass.data[DOMAIN].pop(entry.entry_id)
+        coordinator = hass.data[DOMAIN].pop(entry.entry_id)
+        if isinstance(coordinator, EntsoeCoordinator):
+            # closing the archive may wait for a write in the executor
+            await hass.async_add_executor_job(coordinator.release_archive)
     return unload_ok
 
 
 async def async_update_options(hass: HomeAssistant, entry: ConfigEntry) -> None:
     """Update options."""
-    await hass.config_entries.async_reload(entry.entry_id)
+    coordinator: EntsoeCoordinator = hass.data[DOMAIN][entry.entry_id]
+    options = _coordinator_options(entry)
+
+    # a different api key, area or datasets need new data, everything else is
+    # recalculated from the prices the coordinator already has
+    if not coordinator.can_apply_options(**options):
+        await hass.config_entries.async_reload(entry.entry_id)
+        return
+
+    sensors_changed = (
+        options["energy_scale"] != coordinator.energy_scale
+        or options["currency"] != coordinator.currency
+        or options["energy_meter"] != coordinator.energy_meter
+    )
+    coordinator.async_apply_options(**options)
+
+    if sensors_changed:
+        # the units are part of the entity descriptions and the cost sensor
+        # follows the energy meter, recreate the sensors
+        await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
+        await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+
+
+def _coordinator_options(entry: ConfigEntry) -> dict:
+    """Return the coordinator arguments from the entry options."""
+    return {
+        "api_key": entry.options[CONF_API_KEY],
+        "area": entry.options[CONF_AREA],
+        "period": entry.options.get(CONF_PERIOD, DEFAULT_PERIOD),
+        "energy_scale": entry.options.get(CONF_ENERGY_SCALE, DEFAULT_ENERGY_SCALE),
+        "modifyer": entry.options.get(CONF_MODIFYER, DEFAULT_MODIFYER),
+        "calculation_mode": entry.options.get(
+            CONF_CALCULATION_MODE, CALCULATION_MODE["default"]
+        ),
+        "VAT": entry.options.get(CONF_VAT_VALUE, 0),
+        "currency": entry.options.get(CONF_CURRENCY, DEFAULT_CURRENCY),
+        "datasets": entry.options.get(CONF_DATASETS, []),
+        "fetch_spread": entry.options.get(CONF_FETCH_SPREAD, DEFAULT_FETCH_SPREAD),
+        "energy_meter": entry.options.get(CONF_ENERGY_METER),
+    }
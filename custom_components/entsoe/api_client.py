@@ -1,65 +1,231 @@
 from __future__ import annotations
 
+import asyncio
 import enum
+import io
 import logging
-import xml.etree.ElementTree as ET
-from collections import defaultdict
-from datetime import datetime, timedelta
-from typing import Dict, Union
+import time
+import zipfile
+from array import array
+from collections import deque
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+from datetime import datetime
+from functools import partial
+from typing import TYPE_CHECKING, Dict, NamedTuple, Union
 
 import aiohttp
-import pytz
-import requests
-from aiohttp import ClientResponse, ClientError
-
-from custom_components.entsoe.const import DEFAULT_PERIOD
+from aiohttp import ClientError, ClientResponseError
+
+from custom_components.entsoe.const import (
+    DATASET_GENERATION_FORECAST,
+    DATASET_IMBALANCE_PRICES,
+    DATASET_LOAD_FORECAST,
+    DEFAULT_PERIOD,
+)
 from custom_components.entsoe.utils import get_interval_minutes
-from .utils import bucket_time
+from .price_series import PriceSegment, PriceSeries
+from .utils import parse_utc_minutes
+
+if TYPE_CHECKING:
+    from .response_recorder import ResponseRecorder
 
 _LOGGER = logging.getLogger(__name__)
 API_URLS = ["https://web-api.tp.entsoe.eu/api", "https://external-api.tp.entsoe.eu/api"]
 DATETIMEFORMAT = "%Y%m%d%H00"
+# characters of a document fed to the XML parser at once
+PARSE_CHUNK_SIZE = 65536
+# documents larger than this are parsed in the executor, a day of prices stays inline
+EXECUTOR_PARSE_SIZE = 256 * 1024
+# ENTSO-e allows 400 requests per minute for a security token
+RATE_LIMIT = 400
+RATE_LIMIT_WINDOW = 60
+
 
 class EntsoeException(Exception):
     pass
 
+
+class EntsoeUnauthorized(EntsoeException):
+    """The API rejected the security token."""
+
+
+@dataclass
+class FetchRecord:
+    """Summary of a single fetch, kept for the diagnostics flight recorder."""
+
+    params: dict = field(default_factory=dict)
+    started: str = field(default_factory=lambda: datetime.now().isoformat())
+    endpoint: str | None = None
+    status: int | None = None
+    bytes: int = 0
+    parse_duration: float | None = None
+    points_per_timeseries: list = field(default_factory=list)
+    resolutions: list = field(default_factory=list)
+    duplicate_periods_skipped: int = 0
+    averaged: bool = False
+    error: str | None = None
+
+
+class Dataset(NamedTuple):
+    """A document type of the ENTSO-e API and how to request and decode it."""
+
+    document_type: str
+    # element holding the value of a Point
+    quantity: str
+    # request parameters set to the code of the area
+    domain_params: tuple[str, ...]
+    # fixed request parameters
+    params: dict
+    # element of a TimeSeries the series are grouped by, e.g. the production type
+    group: str | None = None
+    # published during the day, polled for the slots after the last one received
+    incremental: bool = False
+
+
+DAY_AHEAD_PRICES = Dataset("A44", "price.amount", ("in_Domain", "out_Domain"), {})
+LOAD_FORECAST = Dataset(
+    "A65", "quantity", ("outBiddingZone_Domain",), {"processType": "A01"}
+)
+GENERATION_FORECAST = Dataset(
+    "A69", "quantity", ("in_Domain",), {"processType": "A01"}, "psrType"
+)
+IMBALANCE_PRICES = Dataset(
+    "A85", "imbalance_Price.amount", ("controlArea_Domain",), {}, incremental=True
+)
+# the datasets that can be enabled next to the prices
+DATASETS = {
+    DATASET_LOAD_FORECAST: LOAD_FORECAST,
+    DATASET_GENERATION_FORECAST: GENERATION_FORECAST,
+    DATASET_IMBALANCE_PRICES: IMBALANCE_PRICES,
+}
+
+
+def unpack_documents(body: bytes, encoding: str = "utf-8") -> list[str]:
+    """Return the XML documents of a response, a zip archive holds one per file."""
+    if not body.startswith(b"PK\x03\x04"):
+        return [body.decode(encoding)]
+    with zipfile.ZipFile(io.BytesIO(body)) as archive:
+        return [
+            archive.read(name).decode(encoding)
+            for name in sorted(archive.namelist())
+            if name.lower().endswith(".xml")
+        ]
+
+
+class RateLimiter:
+    """Sliding window of the requests sent with a security token."""
+
+    def __init__(self, limit: int = RATE_LIMIT, window: float = RATE_LIMIT_WINDOW):
+        self.limit = limit
+        self.window = window
+        self._sent: deque[float] = deque()
+
+    async def acquire(self) -> None:
+        """Wait until another request may be sent."""
+        while True:
+            now = time.monotonic()
+            while self._sent and self._sent[0] <= now - self.window:
+                self._sent.popleft()
+            if len(self._sent) < self.limit:
+                self._sent.append(now)
+                return
+            await asyncio.sleep(self._sent[0] + self.window - now)
+
+
+_RATE_LIMITERS: dict[str, RateLimiter] = {}
+
+
+def rate_limiter(api_key: str) -> RateLimiter:
+    """Return the limiter shared by every client using the key."""
+    limiter = _RATE_LIMITERS.get(api_key)
+    if limiter is None:
+        limiter = _RATE_LIMITERS[api_key] = RateLimiter()
+    return limiter
+
+
 class EntsoeClient:
 
-    def __init__(self, api_key: str, period: str = DEFAULT_PERIOD) -> None:
+    def __init__(
+            self,
+            api_key: str,
+            period: str = DEFAULT_PERIOD,
+            fetch_log: deque | None = None,
+            api_urls: list[str] | None = None,
+            recorder: ResponseRecorder | None = None,
+            session: aiohttp.ClientSession | None = None,
+    ) -> None:
         if api_key == "":
             raise TypeError("API key cannot be empty")
         self.api_key = api_key
         self.configuration_period = period
+        # optional bounded buffer in which a FetchRecord is stored for every request
+        self.fetch_log = fetch_log
+        # the endpoints can be overridden, e.g. to point the client at a local test server
+        self.api_urls = api_urls or API_URLS
+        # optional recorder to store responses on disk or to replay them without network access
+        self.recorder = recorder
+        # optional session shared with other clients, otherwise one is opened per request
+        self.session = session
 
     async def _base_request(
-            self, params: Dict, start: datetime, end: datetime
-    ) -> ClientResponse:
-
-        base_params = {
-            "securityToken": self.api_key,
-            "periodStart": start.strftime(DATETIMEFORMAT),
-            "periodEnd": end.strftime(DATETIMEFORMAT),
-        }
-        params.update(base_params)
-
-        for url in API_URLS:
-            _LOGGER.debug(f"Performing request to {url} with params {params}")
-            async with aiohttp.ClientSession() as session:
+            self, params: Dict, start: datetime, end: datetime, record: FetchRecord
+    ) -> list[str]:
+
+        params.update(
+            {
+                "periodStart": start.strftime(DATETIMEFORMAT),
+                "periodEnd": end.strftime(DATETIMEFORMAT),
+            }
+        )
+        record.params = dict(params)
+        params["securityToken"] = self.api_key
+
+        if self.recorder is not None and self.recorder.replaying:
+            record.endpoint = self.recorder.directory
+            try:
+                body = await self.recorder.async_replay(record.params)
+            except FileNotFoundError as exc:
+                raise EntsoeException(
+                    f"No recorded response available for {record.params}"
+                ) from exc
+            record.bytes = len(body)
+            return unpack_documents(body)
+
+        for url in self.api_urls:
+            _LOGGER.debug(f"Performing request to {url} with params {record.params}")
+            record.endpoint = url
+            await rate_limiter(self.api_key).acquire()
+            async with self._session() as session:
                 try:
-                    return await session.get(url=url, params=params, raise_for_status=True)
+                    async with session.get(
+                        url=url, params=params, raise_for_status=True
+                    ) as response:
+                        record.status = response.status
+                        body = await response.read()
+                        record.bytes = len(body)
+                        if self.recorder is not None:
+                            await self.recorder.async_record(record.params, body)
+                        return unpack_documents(body, response.get_encoding())
+                except ClientResponseError as e:
+                    record.status = e.status
+                    if e.status == 401:
+                        # every endpoint will reject the same key
+                        raise EntsoeUnauthorized(
+                            "Unauthorized: Please check your API-key."
+                        ) from e
+                    _LOGGER.info(e)
+                    continue
                 except ClientError as e:
                     _LOGGER.info(e)
                     continue
 
         raise EntsoeException("All ENTSO-e API endpoints failed to respond with status 200.")
 
-    def _remove_namespace(self, tree):
-        """Remove namespaces in the passed XML tree for easier tag searching."""
-        for elem in tree.iter():
-            # Remove the namespace if present
-            if "}" in elem.tag:
-                elem.tag = elem.tag.split("}", 1)[1]
-        return tree
+    def _session(self):
+        if self.session is not None:
+            return nullcontext(self.session)
+        return aiohttp.ClientSession()
 
     async def query_day_ahead_prices(
             self, country_code: Union[Area, str], start: datetime, end: datetime
@@ -73,134 +239,242 @@ class EntsoeClient:
 
         Returns
         -------
-        str
+        dict of local datetime -> price, in the configured period
         """
+        series = await self.query_price_series(country_code, start, end)
+        return series.localized(get_interval_minutes(self.configuration_period))
+
+    async def query_price_series(
+            self, country_code: Union[Area, str], start: datetime, end: datetime
+    ) -> PriceSeries:
+        """Return the day-ahead prices as published, see PriceSeries for the views."""
+        series = await self.query_timeseries(DAY_AHEAD_PRICES, country_code, start, end)
+        return series.get(None, PriceSeries())
+
+    async def query_timeseries(
+            self,
+            dataset: Dataset,
+            country_code: Union[Area, str],
+            start: datetime,
+            end: datetime,
+    ) -> dict[str | None, PriceSeries]:
+        """Return the series of a dataset, per value of its group element."""
         area = Area[country_code.upper()]
-        params = {
-            "documentType": "A44",
-            "in_Domain": area.code,
-            "out_Domain": area.code,
-        }
-        response = await self._base_request(params=params, start=start, end=end)
+        params = {"documentType": dataset.document_type, **dataset.params}
+        params.update((param, area.code) for param in dataset.domain_params)
+        record = FetchRecord()
+        if self.fetch_log is not None:
+            self.fetch_log.append(record)
+
+        try:
+            documents = await self._base_request(
+                params=params, start=start, end=end, record=record
+            )
+        except Exception as exc:
+            record.error = repr(exc)
+            raise exc
 
+        parse = partial(
+            self.parse_documents,
+            documents,
+            dataset.quantity,
+            record=record,
+            group=dataset.group,
+        )
         try:
-            series = self.parse_price_document(await response.text())
-            return dict(sorted(series.items()))
+            if sum(len(document) for document in documents) > EXECUTOR_PARSE_SIZE:
+                # the segments come back as compact arrays, the loop stays responsive
+                return await asyncio.get_running_loop().run_in_executor(None, parse)
+            return parse()
 
         except Exception as exc:
+            record.error = repr(exc)
             _LOGGER.debug(
-                f"Failed to parse response content error: {exc} content:{response.content}"
+                f"Failed to parse response content error: {exc} content:{documents}"
             )
             raise exc
 
     # lets process the received document
-    def parse_price_document(self, document: str) -> dict:
-
-        root = self._remove_namespace(ET.fromstring(document))
-        _LOGGER.debug(f"content: {root}")
-        series = {}
-
-        # for all given timeseries in this response
-        # There may be overlapping times in the repsonse. For now we skip timeseries which we already processed
-        for timeseries in root.findall(".//TimeSeries"):
-            # For germany, discard if sequence != 1
-            if timeseries.find(".//out_Domain.mRID").text == Area['DE_LU'].code:
-                sequence = timeseries.find(".//classificationSequence_AttributeInstanceComponent.position")
-                if sequence is not None  and sequence.text != '1':
-                    continue
-            
-            # for all periods in this timeseries.....-> we still asume the time intervals do not overlap, and are in sequence
-            for period in timeseries.findall(".//Period"):
-                # there can be different resolutions for each period (BE casus in which historical is quarterly and future is hourly)
-                resolution = period.find(".//resolution").text
-
-                # for now supporting 60 and 15 minutes resolutions (ISO8601 defined)
-                if resolution == "PT60M" or resolution == "PT1H":
-                    resolution = "PT60M"
-                elif resolution != "PT15M":
-                    continue
-
-                response_start = period.find(".//timeInterval/start").text
-                start_time = (
-                    datetime.strptime(response_start, "%Y-%m-%dT%H:%MZ")
-                    .replace(tzinfo=pytz.UTC)
-                    .astimezone()
-                )
-                start_time.replace(minute=0)  # ensure we start from the whole hour
-
-                response_end = period.find(".//timeInterval/end").text
-                end_time = (
-                    datetime.strptime(response_end, "%Y-%m-%dT%H:%MZ")
-                    .replace(tzinfo=pytz.UTC)
-                    .astimezone()
-                )
-                _LOGGER.debug(
-                    f"Period found is from {start_time} till {end_time} with resolution {resolution}"
-                )
-                if start_time in series:
-                    _LOGGER.debug(
-                        "We found a duplicate period in the response, possibly with another resolution. We skip this period"
-                    )
-                    continue
-
-                # Parse the resolution, we only support the 'PTxM' format
-                interval = get_interval_minutes(resolution)
-                data = self.process_points(period, start_time, interval)
-                if resolution != self.configuration_period:
-                    _LOGGER.debug(
-                        f"Got {interval} minutes interval prices, but period is configured on {self.configuration_period} minutes. Averaging data into intervals of {self.configuration_period} minutes."
-                    )
-                    data = self.average_to_interval(
-                        data,
-                        expected_interval=get_interval_minutes(
-                            self.configuration_period
-                        ),
-                    )
-                series.update(data)
-        return series
-
-    # processing hourly prices info -> thats easy
-    def process_points(
-            self, period: Element, start_time: datetime, interval: int
+    def parse_price_document(
+            self, document: str, record: FetchRecord | None = None
     ) -> dict:
-        _LOGGER.debug(f"Processing prices based on interval {interval} minutes")
-        # Extract (position, price) pairs
-        points = sorted(
-            (int(p.findtext(".//position")), float(p.findtext(".//price.amount")))
-            for p in period.findall(".//Point")
+        series = self.parse_price_series(document, record)
+        return series.localized(get_interval_minutes(self.configuration_period))
+
+    # parse the document into segments keyed by UTC epoch minutes, as published
+    def parse_price_series(
+            self, document: str, record: FetchRecord | None = None
+    ) -> PriceSeries:
+        return self.parse_timeseries(document, "price.amount", record).get(
+            None, PriceSeries()
         )
-        if not points:
-            return {}
-
-        data = {}
-        last_price = None
-        for pos in range(points[0][0], points[-1][0] + 1):
-            if points and pos == points[0][0]:
-                last_price = points.pop(0)[1]
-            data[start_time + timedelta(minutes=(pos - 1) * interval)] = last_price
 
-        return data
+    # decode the documents of a response, the series of later documents are merged in
+    def parse_documents(
+            self,
+            documents: list[str],
+            quantity: str,
+            record: FetchRecord | None = None,
+            group: str | None = None,
+    ) -> dict[str | None, PriceSeries]:
+        result: dict[str | None, PriceSeries] = {}
+        for document in documents:
+            for key, series in self.parse_timeseries(
+                document, quantity, record, group
+            ).items():
+                if key in result:
+                    result[key].merge(series)
+                else:
+                    result[key] = series
+        return result
+
+    # decode the TimeSeries of any document type in a single pass
+    def parse_timeseries(
+            self,
+            document: str,
+            quantity: str,
+            record: FetchRecord | None = None,
+            group: str | None = None,
+    ) -> dict[str | None, PriceSeries]:
+        """
+        Return a PriceSeries with the quantity of every Point, per value of the
+        group element of the TimeSeries (or under None without a group).
 
-    def average_to_interval(self, data: dict, expected_interval: int) -> dict:
+        The document is fed to a pull parser in chunks and every Period becomes a
+        PriceSegment as soon as it is complete, no element tree is kept.
         """
-        Average prices into the expected interval buckets
+        if record is None:
+            record = FetchRecord()
+        parse_start = time.perf_counter()
+
+        # imported on first use, the XML parser is not needed to set up the integration
+        from xml.etree.ElementTree import XMLPullParser
+
+        parser = XMLPullParser(events=("end",))
+        target_interval = get_interval_minutes(self.configuration_period)
+        result: dict[str | None, PriceSeries] = {}
+        # text of the elements seen since the start of the TimeSeries, without namespace
+        fields: dict[str, str | None] = {}
+        # series receiving the Periods of the current TimeSeries, False when skipped
+        series = None
+        points = []
+        points_in_timeseries = 0
+
+        for offset in range(0, len(document), PARSE_CHUNK_SIZE):
+            parser.feed(document[offset : offset + PARSE_CHUNK_SIZE])
+            for _, element in parser.read_events():
+                tag = element.tag.rpartition("}")[2]
+                if tag == "Point":
+                    value = fields.pop(quantity, None)
+                    if value is not None:
+                        points.append((int(fields.pop("position")), float(value)))
+                    element.clear()
+                elif tag == "Period":
+                    if series is None:
+                        series = self._timeseries_target(fields, result, group)
+                    if series is not False:
+                        points_in_timeseries += self._add_period(
+                            series, fields, points, target_interval, record
+                        )
+                    points = []
+                    element.clear()
+                elif tag == "TimeSeries":
+                    if series is not False:
+                        record.points_per_timeseries.append(points_in_timeseries)
+                    series = None
+                    points_in_timeseries = 0
+                    fields.clear()
+                    element.clear()
+                else:
+                    fields[tag] = element.text
+        parser.close()
+
+        record.parse_duration = round(time.perf_counter() - parse_start, 6)
+        return result
+
+    # select the series the Periods of a TimeSeries are added to
+    def _timeseries_target(
+            self, fields: dict, result: dict, group: str | None
+    ) -> PriceSeries | bool:
+        domain = next(
+            (text for tag, text in fields.items() if tag.endswith("Domain.mRID")), None
+        )
+        # For germany, discard if sequence != 1
+        if domain == DE_LU_CODE:
+            sequence = fields.get("classificationSequence_AttributeInstanceComponent.position")
+            if sequence is not None and sequence != "1":
+                return False
+
+        key = fields.get(group) if group is not None else None
+        series = result.get(key)
+        if series is None:
+            series = result[key] = PriceSeries()
+        if domain in AREA_TIMEZONES:
+            series.tz_name = AREA_TIMEZONES[domain]
+        return series
 
-        args:
-            data: The data to average
-            expected_interval: The interval in minutes after transformation (e.g. 30, 60)
+    # add a completed Period to the series, returns the number of points added
+    def _add_period(
+            self,
+            series: PriceSeries,
+            fields: dict,
+            points: list,
+            target_interval: int,
+            record: FetchRecord,
+    ) -> int:
+        # there can be different resolutions for each period (BE casus in which historical is quarterly and future is hourly)
+        resolution = fields.get("resolution")
+        try:
+            interval = get_interval_minutes(resolution)
+        except (TypeError, ValueError):
+            _LOGGER.debug(f"Skipping period with unsupported resolution {resolution}")
+            return 0
+        if resolution not in record.resolutions:
+            record.resolutions.append(resolution)
+
+        start_minute = parse_utc_minutes(fields["start"])
+        end_minute = parse_utc_minutes(fields["end"])
+        _LOGGER.debug(
+            f"Period found is from {start_minute} till {end_minute} (epoch minutes) with resolution {resolution}"
+        )
+        # There may be overlapping times in the repsonse. For now we skip periods which we already processed
+        if series.covers(start_minute):
+            _LOGGER.debug(
+                "We found a duplicate period in the response, possibly with another resolution. We skip this period"
+            )
+            record.duplicate_periods_skipped += 1
+            return 0
+
+        first_minute, values = self.process_points(points, start_minute, interval)
+        if not values:
+            return 0
+        if interval < target_interval:
+            record.averaged = True
+        series.append(PriceSegment(first_minute, interval, values, end_minute))
+        return len(values)
+
+    # processing the points of a period into a contiguous buffer
+    def process_points(
+            self, points: list[tuple[int, float]], start_minute: int, interval: int
+    ) -> tuple[int, array]:
         """
+        Return the epoch minute of the first point and the values from there on
+        up to the last point, positions missing in between repeat the previous value.
+        """
+        if not points:
+            return start_minute, array("d")
 
-        # Create buckets of expected_interval
-        by_hour = defaultdict(list)
-        for timestamp, price in data.items():
-            bucket = bucket_time(timestamp, expected_interval)
-            by_hour[bucket].append(price)
+        points.sort()
+        first_position = points[0][0]
+        last_position = points[-1][0]
+        values = array("d")
+        last_value = None
+        points = dict(points)
+        for pos in range(first_position, last_position + 1):
+            last_value = points.get(pos, last_value)
+            values.append(last_value)
 
-        # Calculate the average for each bucket
-        return {
-            hour: round(sum(prices) / len(prices), 2)
-            for hour, prices in by_hour.items()
-        }
+        return start_minute + (first_position - 1) * interval, values
 
 
 class Area(enum.Enum):
@@ -208,16 +482,13 @@ class Area(enum.Enum):
     ENUM containing 3 things about an Area: CODE, Meaning, Timezone
     """
 
-    def __new__(cls, *args, **kwds):
+    def __new__(cls, code: str, meaning: str, tz: str):
         obj = object.__new__(cls)
-        obj._value_ = args[0]
+        obj._value_ = code
+        obj._meaning = meaning
+        obj._tz = tz
         return obj
 
-    # ignore the first param since it's already set by __new__
-    def __init__(self, _: str, meaning: str, tz: str):
-        self._meaning = meaning
-        self._tz = tz
-
     def __str__(self):
         return self.value
 
@@ -735,3 +1006,8 @@ class Area(enum.Enum):
         "Europe/Rome",
     )
     DE_AMP_LU = "10Y1001C--00002H", "Amprion LU CA", "Europe/Berlin"
+
+
+# precomputed, looked up for every TimeSeries in a document
+DE_LU_CODE = Area.DE_LU.code
+AREA_TIMEZONES = {area.code: area.tz for area in Area}
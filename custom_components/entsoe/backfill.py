@@ -0,0 +1,161 @@
+"""Import historical prices into the long-term statistics of Home Assistant."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from datetime import datetime, timedelta
+
+from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.util import dt as dt_util
+from homeassistant.util import slugify
+
+from .api_client import EntsoeClient, EntsoeException
+from .const import DOMAIN, MAX_QUERY_DAYS
+from .coordinator import EntsoeCoordinator
+from .utils import split_range
+
+_LOGGER = logging.getLogger(__name__)
+
+# seconds a single chunk may take, a year of quarter hourly prices is a large document
+CHUNK_TIMEOUT = 60
+
+
+def statistic_id_for(coordinator: EntsoeCoordinator, name: str | None) -> str:
+    """Return the id of the external statistic holding the prices of an entry."""
+    return f"{DOMAIN}:{slugify(name or coordinator.area)}_price"
+
+
+def hourly_statistics(prices: dict[datetime, float]) -> list[dict]:
+    """Aggregate prices of any period into the hourly rows the recorder expects."""
+    hours: dict[datetime, list[float]] = {}
+    for timestamp, price in prices.items():
+        hour = dt_util.as_utc(timestamp).replace(minute=0, second=0, microsecond=0)
+        hours.setdefault(hour, []).append(price)
+
+    return [
+        {
+            "start": hour,
+            "mean": round(sum(values) / len(values), 5),
+            "min": min(values),
+            "max": max(values),
+        }
+        for hour, values in sorted(hours.items())
+    ]
+
+
+def backfill_range(
+    start: datetime, end: datetime, last_imported: datetime | None, now: datetime
+) -> tuple[datetime, datetime]:
+    """
+    Return the complete hours between start and end that are not imported yet.
+
+    The hour in progress is left out, its statistic would never be corrected
+    because a resumed backfill continues after the last imported hour.
+    """
+    start = dt_util.as_utc(start).replace(minute=0, second=0, microsecond=0)
+    end = min(dt_util.as_utc(end), dt_util.as_utc(now))
+    end = end.replace(minute=0, second=0, microsecond=0)
+
+    if last_imported is not None and start <= last_imported < end:
+        start = last_imported + timedelta(hours=1)
+    return start, end
+
+
+async def async_fetch_statistics(
+    coordinator: EntsoeCoordinator,
+    client: EntsoeClient,
+    start: datetime,
+    end: datetime,
+) -> list[dict]:
+    """Fetch the prices of one chunk and return its hourly statistics."""
+    try:
+        async with asyncio.timeout(CHUNK_TIMEOUT):
+            series = await client.query_price_series(coordinator.area, start, end)
+    except (asyncio.TimeoutError, EntsoeException) as exc:
+        raise HomeAssistantError(
+            translation_domain=DOMAIN,
+            translation_key="backfill_failed",
+            translation_placeholders={
+                "start": start.isoformat(),
+                "end": end.isoformat(),
+                "error": str(exc) or type(exc).__name__,
+            },
+        ) from exc
+
+    # a Period may extend beyond the chunk, those hours belong to the next one
+    prices = {
+        timestamp: price
+        for timestamp, price in series.localized(coordinator.period_minutes).items()
+        if start <= timestamp < end
+    }
+    return hourly_statistics(await coordinator.async_parse_hourprices(prices))
+
+
+async def async_last_imported_hour(
+    hass: HomeAssistant, statistic_id: str
+) -> datetime | None:
+    """Return the start of the last hour imported for the statistic."""
+    from homeassistant.components.recorder import get_instance
+    from homeassistant.components.recorder.statistics import get_last_statistics
+
+    last = await get_instance(hass).async_add_executor_job(
+        get_last_statistics, hass, 1, statistic_id, False, set()
+    )
+    if not last.get(statistic_id):
+        return None
+    return dt_util.utc_from_timestamp(last[statistic_id][0]["start"])
+
+
+async def async_backfill_statistics(
+    hass: HomeAssistant,
+    coordinator: EntsoeCoordinator,
+    statistic_id: str,
+    name: str,
+    start: datetime,
+    end: datetime,
+) -> dict:
+    """
+    Fetch the prices between start and end and add them as external statistics.
+
+    The prices are converted with the template, VAT and energy scale of the entry,
+    each chunk is inserted as one batch as soon as it is fetched. Only complete
+    hours are imported, when the last imported hour lies within the range the
+    import continues after it, so an interrupted backfill does not start over.
+    """
+    from homeassistant.components.recorder.statistics import (
+        async_add_external_statistics,
+    )
+
+    last_imported = await async_last_imported_hour(hass, statistic_id)
+    start, end = backfill_range(start, end, last_imported, dt_util.utcnow())
+    if last_imported is not None and last_imported + timedelta(hours=1) == start:
+        _LOGGER.debug(f"Resuming the backfill of {statistic_id} after {last_imported}")
+
+    metadata = {
+        "has_mean": True,
+        "has_sum": False,
+        "name": name,
+        "source": DOMAIN,
+        "statistic_id": statistic_id,
+        "unit_of_measurement": f"{coordinator.currency}/{coordinator.energy_scale}",
+    }
+    client = coordinator.create_client()
+
+    imported = 0
+    for chunk_start, chunk_end in split_range(start, end, MAX_QUERY_DAYS):
+        _LOGGER.debug(f"Backfilling {statistic_id} from {chunk_start} to {chunk_end}")
+        statistics = await async_fetch_statistics(
+            coordinator, client, chunk_start, chunk_end
+        )
+        if statistics:
+            async_add_external_statistics(hass, metadata, statistics)
+            imported += len(statistics)
+
+    return {
+        "statistic_id": statistic_id,
+        "imported_hours": imported,
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+    }
@@ -11,6 +11,8 @@ from homeassistant.config_entries import ConfigEntry, ConfigFlow, OptionsFlow
 from homeassistant.core import callback
 from homeassistant.data_entry_flow import FlowResult
 from homeassistant.helpers.selector import (
+    EntitySelector,
+    EntitySelectorConfig,
     SelectOptionDict,
     SelectSelector,
     SelectSelectorConfig,
@@ -28,12 +30,18 @@ from .const import (
     CONF_AREA,
     CONF_CALCULATION_MODE,
     CONF_CURRENCY,
+    CONF_DATASETS,
+    CONF_ENERGY_METER,
     CONF_ENERGY_SCALE,
+    CONF_FETCH_SPREAD,
     CONF_ENTITY_NAME,
     CONF_MODIFYER,
     CONF_VAT_VALUE,
+    CONF_ZONES,
+    DATASET_OPTIONS,
     DEFAULT_CURRENCY,
     DEFAULT_ENERGY_SCALE,
+    DEFAULT_FETCH_SPREAD,
     DEFAULT_MODIFYER,
     DOMAIN,
     ENERGY_SCALES,
@@ -44,6 +52,35 @@ from .const import (
 )
 
 
+def zone_options_schema(options: dict[str, Any]) -> dict:
+    """Return the fields of an entry comparing zones, defaulting to its options."""
+    return {
+        vol.Required(
+            CONF_ZONES, default=options.get(CONF_ZONES, [])
+        ): SelectSelector(
+            SelectSelectorConfig(
+                options=[
+                    SelectOptionDict(value=country, label=info["name"])
+                    for country, info in AREA_INFO.items()
+                ],
+                multiple=True,
+            ),
+        ),
+        vol.Required(
+            CONF_PERIOD, default=options.get(CONF_PERIOD, DEFAULT_PERIOD)
+        ): SelectSelector(
+            SelectSelectorConfig(options=PERIOD_OPTIONS),
+        ),
+        vol.Optional(
+            CONF_CURRENCY, default=options.get(CONF_CURRENCY, DEFAULT_CURRENCY)
+        ): vol.All(vol.Coerce(str)),
+        vol.Optional(
+            CONF_ENERGY_SCALE,
+            default=options.get(CONF_ENERGY_SCALE, DEFAULT_ENERGY_SCALE),
+        ): vol.In(list(ENERGY_SCALES.keys())),
+    }
+
+
 class EntsoeFlowHandler(ConfigFlow, domain=DOMAIN):
     """Handle a config flow for Entsoe."""
 
@@ -71,6 +108,12 @@ class EntsoeFlowHandler(ConfigFlow, domain=DOMAIN):
         self, user_input: dict[str, Any] | None = None
     ) -> FlowResult:
         """Handle a flow initiated by the user."""
+        return self.async_show_menu(step_id="user", menu_options=["area", "zones"])
+
+    async def async_step_area(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Handle an entry with the prices of a single area."""
         errors = {}
         already_configured = False
 
@@ -117,7 +160,7 @@ class EntsoeFlowHandler(ConfigFlow, domain=DOMAIN):
                 )
 
         return self.async_show_form(
-            step_id="user",
+            step_id="area",
             errors=errors,
             data_schema=vol.Schema(
                 {
@@ -141,6 +184,51 @@ class EntsoeFlowHandler(ConfigFlow, domain=DOMAIN):
             ),
         )
 
+    async def async_step_zones(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Handle an entry comparing the prices of several zones."""
+        errors = {}
+
+        if user_input is not None:
+            self.name = user_input[CONF_ENTITY_NAME]
+            try:
+                await self.async_set_unique_id(self.name + UNIQUE_ID)
+                self._abort_if_unique_id_configured()
+            except Exception as e:
+                errors["base"] = "already_configured"
+
+            if len(user_input[CONF_ZONES]) < 2:
+                errors[CONF_ZONES] = "too_few_zones"
+
+            if not errors:
+                return self.async_create_entry(
+                    title=self.name or COMPONENT_TITLE,
+                    data={},
+                    options={
+                        CONF_API_KEY: user_input[CONF_API_KEY],
+                        CONF_ZONES: user_input[CONF_ZONES],
+                        CONF_PERIOD: user_input[CONF_PERIOD],
+                        CONF_CURRENCY: user_input[CONF_CURRENCY],
+                        CONF_ENERGY_SCALE: user_input[CONF_ENERGY_SCALE],
+                        CONF_ENTITY_NAME: user_input[CONF_ENTITY_NAME],
+                    },
+                )
+
+        return self.async_show_form(
+            step_id="zones",
+            errors=errors,
+            data_schema=vol.Schema(
+                {
+                    vol.Optional(CONF_ENTITY_NAME, default=""): vol.All(
+                        vol.Coerce(str)
+                    ),
+                    vol.Required(CONF_API_KEY): vol.All(vol.Coerce(str)),
+                    **zone_options_schema({}),
+                },
+            ),
+        )
+
     async def async_step_extra(self, user_input=None):
         """Handle VAT, template and calculation mode if requested."""
         errors = {}
@@ -267,6 +355,9 @@ class EntsoeOptionFlowHandler(OptionsFlow):
         self, user_input: dict[str, Any] | None = None
     ) -> FlowResult:
         """Handle a flow initiated by the user."""
+        if CONF_ZONES in self.config_entry.options:
+            return await self.async_step_zones(user_input)
+
         errors = {}
 
         if user_input is not None:
@@ -358,6 +449,64 @@ class EntsoeOptionFlowHandler(OptionsFlow):
                             ]
                         ),
                     ),
+                    vol.Optional(
+                        CONF_DATASETS,
+                        default=self.config_entry.options.get(CONF_DATASETS, []),
+                    ): SelectSelector(
+                        SelectSelectorConfig(
+                            options=DATASET_OPTIONS,
+                            multiple=True,
+                            translation_key=CONF_DATASETS,
+                        ),
+                    ),
+                    vol.Optional(
+                        CONF_FETCH_SPREAD,
+                        default=self.config_entry.options.get(
+                            CONF_FETCH_SPREAD, DEFAULT_FETCH_SPREAD
+                        ),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=0, max=3600)),
+                    vol.Optional(
+                        CONF_ENERGY_METER,
+                        description={
+                            "suggested_value": self.config_entry.options.get(
+                                CONF_ENERGY_METER
+                            )
+                        },
+                    ): EntitySelector(
+                        EntitySelectorConfig(domain="sensor", device_class="energy")
+                    ),
+                },
+            ),
+        )
+
+    async def async_step_zones(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Handle the options of an entry comparing zones."""
+        errors = {}
+
+        if user_input is not None:
+            user_input[CONF_ENTITY_NAME] = self.config_entry.options[CONF_ENTITY_NAME]
+            if len(user_input[CONF_ZONES]) < 2:
+                errors[CONF_ZONES] = "too_few_zones"
+            else:
+                return self.async_create_entry(title="", data=user_input)
+
+        return self.async_show_form(
+            step_id="zones",
+            errors=errors,
+            data_schema=vol.Schema(
+                {
+                    vol.Required(
+                        CONF_API_KEY, default=self.config_entry.options[CONF_API_KEY]
+                    ): vol.All(vol.Coerce(str)),
+                    **zone_options_schema(self.config_entry.options),
+                    vol.Optional(
+                        CONF_FETCH_SPREAD,
+                        default=self.config_entry.options.get(
+                            CONF_FETCH_SPREAD, DEFAULT_FETCH_SPREAD
+                        ),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=0, max=3600)),
                 },
             ),
         )
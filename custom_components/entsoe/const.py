@@ -15,11 +15,18 @@ CONF_ENERGY_SCALE = "energy_scale"
 CONF_ADVANCED_OPTIONS = "advanced_options"
 CONF_CALCULATION_MODE = "calculation_mode"
 CONF_VAT_VALUE = "VAT_value"
+CONF_DATASETS = "datasets"
+CONF_FETCH_SPREAD = "fetch_spread"
+CONF_ENERGY_METER = "energy_meter"
+# the areas compared by a zones entry, an entry with zones has no single area
+CONF_ZONES = "zones"
 
 DEFAULT_MODIFYER = "{{current_price}}"
 DEFAULT_CURRENCY = CURRENCY_EURO
 DEFAULT_ENERGY_SCALE = "kWh"
 DEFAULT_PERIOD = "PT60M"
+# seconds after a period boundary over which the fetches of the entries are spread
+DEFAULT_FETCH_SPREAD = 300
 
 # default is only for internal use / backwards compatibility
 CALCULATION_MODE = {
@@ -30,7 +37,30 @@ CALCULATION_MODE = {
 }
 
 ENERGY_SCALES = {"kWh": 1000, "MWh": 1}
-PERIOD_OPTIONS = ["PT60M", "PT15M"]
+
+# number of fetches kept in memory for the diagnostics
+FETCH_HISTORY_SIZE = 20
+PERIOD_OPTIONS = ["PT60M", "PT30M", "PT15M"]
+
+# datasets that can be fetched next to the prices
+DATASET_LOAD_FORECAST = "load_forecast"
+DATASET_GENERATION_FORECAST = "generation_forecast"
+DATASET_IMBALANCE_PRICES = "imbalance_prices"
+DATASET_OPTIONS = [
+    DATASET_LOAD_FORECAST,
+    DATASET_GENERATION_FORECAST,
+    DATASET_IMBALANCE_PRICES,
+]
+
+# production types of the generation forecast
+PSR_SOLAR = ("B16",)
+PSR_WIND = ("B18", "B19")
+
+# the ENTSO-e API returns at most one year of prices per request
+MAX_QUERY_DAYS = 365
+# long service requests are fetched in chunks of days, a few at the same time
+FETCH_CHUNK_DAYS = 31
+MAX_CONCURRENT_FETCHES = 4
 
 # Commented ones are not working at entsoe
 AREA_INFO = {
@@ -1,25 +1,58 @@
 from __future__ import annotations
 
+import asyncio
 import logging
+import re
 import threading
-from datetime import timedelta
-from functools import cached_property
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from functools import cached_property, partial
 
-import async_timeout
 import homeassistant.helpers.config_validation as cv
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.helpers.event import TrackTemplate, async_track_template_result
+from homeassistant.helpers.storage import STORAGE_DIR
 from homeassistant.helpers.template import Template
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
 from homeassistant.util import dt
 from jinja2 import pass_context
-from requests.exceptions import HTTPError
 
-from .api_client import EntsoeClient
-from .const import AREA_INFO, CALCULATION_MODE, DEFAULT_MODIFYER, ENERGY_SCALES
-from .utils import get_interval_minutes, bucket_time
+from .api_client import DATASETS, Area, EntsoeClient, EntsoeUnauthorized
+from .const import (
+    AREA_INFO,
+    CALCULATION_MODE,
+    DEFAULT_CURRENCY,
+    DEFAULT_FETCH_SPREAD,
+    DEFAULT_MODIFYER,
+    DOMAIN,
+    ENERGY_SCALES,
+    FETCH_CHUNK_DAYS,
+    FETCH_HISTORY_SIZE,
+    MAX_CONCURRENT_FETCHES,
+)
+from .price_archive import PriceArchive, open_archive, release_archive
+from .price_series import PriceSeries
+from .planner import battery_schedule, plan
+from .price_statistics import price_statistics
+from .utils import (
+    bucket_time,
+    fetch_jitter,
+    get_interval_minutes,
+    next_fetch_delay,
+    split_range,
+)
 
 # depending on timezone les than 24 hours could be returned.
 MIN_HOURS = 20
+# prices rendered in the event loop before yielding to it, a few days stay inline
+RENDER_BATCH = 500
+# service requests spanning more than this are localized in the executor
+INLINE_RANGE = timedelta(days=7)
+# seconds a chunk of a service request may take, waiting for a free slot excluded
+CHUNK_TIMEOUT = 30
+# minutes between the polls of the incremental datasets, the imbalance settlement period
+POLL_MINUTES = 15
 
 
 # This class contains actually two main tasks
@@ -38,6 +71,11 @@ class EntsoeCoordinator(DataUpdateCoordinator):
             modifyer,
             calculation_mode=CALCULATION_MODE["default"],
             VAT=0,
+            api_urls=None,
+            currency=DEFAULT_CURRENCY,
+            datasets=(),
+            fetch_spread=DEFAULT_FETCH_SPREAD,
+            energy_meter=None,
     ) -> None:
         """Initialize the data object."""
         self.hass = hass
@@ -47,22 +85,29 @@ class EntsoeCoordinator(DataUpdateCoordinator):
         self.period_minutes = get_interval_minutes(period)
         self.area = AREA_INFO[area]["code"]
         self.energy_scale = energy_scale
+        self.currency = currency
         self.calculation_mode = calculation_mode
         self.vat = VAT
+        self.fetch_spread = fetch_spread
+        # the energy meter entity of which the cost sensor accumulates the cost
+        self.energy_meter = energy_meter
+        self.api_urls = api_urls
+        self.series = None
+        # datasets fetched next to the prices, e.g. the load forecast
+        self.datasets = list(datasets or ())
+        self.dataset_series = {}
+        # values derived from the data, built once for every version of it
+        self._derived_data = None
+        self._derived = {}
+        self._template_tracker = None
+        self._template_used_time = False
         self.calculator_last_sync = None
         self.filtered_hourprices = []
         self.lock = threading.Lock()
+        # flight recorder of the latest fetches, exposed through the diagnostics
+        self.fetch_history = deque(maxlen=FETCH_HISTORY_SIZE)
 
-        # Check incase the sensor was setup using config flow.
-        # This blow up if the template isnt valid.
-        if not isinstance(self.modifyer, Template):
-            if self.modifyer in (None, ""):
-                self.modifyer = DEFAULT_MODIFYER
-            self.modifyer = cv.template(self.modifyer)
-        # check for yaml setup.
-        else:
-            if self.modifyer.template in ("", None):
-                self.modifyer = cv.template(DEFAULT_MODIFYER)
+        self.modifyer = self._validate_modifyer(modifyer)
 
         logger = logging.getLogger(__name__)
         super().__init__(
@@ -72,6 +117,111 @@ class EntsoeCoordinator(DataUpdateCoordinator):
             update_interval=timedelta(minutes=self.period_minutes),
         )
 
+    @staticmethod
+    def _validate_modifyer(modifyer) -> Template:
+        # Check incase the sensor was setup using config flow.
+        # This blow up if the template isnt valid.
+        if not isinstance(modifyer, Template):
+            if modifyer in (None, ""):
+                modifyer = DEFAULT_MODIFYER
+            return cv.template(modifyer)
+        # check for yaml setup.
+        if modifyer.template in ("", None):
+            return cv.template(DEFAULT_MODIFYER)
+        return modifyer
+
+    # ENTSO: check if changed options can be applied to the cached series, without a refetch
+    def can_apply_options(self, api_key, area, datasets=(), **kwargs) -> bool:
+        return (
+            api_key == self.api_key
+            and AREA_INFO[area]["code"] == self.area
+            and list(datasets or ()) == self.datasets
+        )
+
+    # ENTSO: apply changed options in place by recalculating the prices from the cached series
+    @callback
+    def async_apply_options(
+            self,
+            period,
+            energy_scale,
+            modifyer,
+            calculation_mode=CALCULATION_MODE["default"],
+            VAT=0,
+            currency=DEFAULT_CURRENCY,
+            fetch_spread=DEFAULT_FETCH_SPREAD,
+            energy_meter=None,
+            **kwargs,
+    ) -> None:
+        self.modifyer = self._validate_modifyer(modifyer)
+        self.energy_scale = energy_scale
+        self.currency = currency
+        self.calculation_mode = calculation_mode
+        self.vat = VAT
+        self.fetch_spread = fetch_spread
+        self.energy_meter = energy_meter
+        if period != self.period:
+            self.period = period
+            self.period_minutes = get_interval_minutes(period)
+        self.update_interval = self.next_fetch_delay()
+
+        if self._template_tracker is not None:
+            self.async_track_template()
+        self.async_recalculate()
+
+    # ENTSO: recalculate the prices from the cached series, without fetching
+    @callback
+    def async_recalculate(self) -> None:
+        # force the analysis to be recalculated on the next sensor update
+        self.calculator_last_sync = None
+        if self.series is None:
+            return
+
+        self.logger.debug("Recalculating prices from the cached series")
+        self.data = self.parse_hourprices(self.series.localized(self.period_minutes))
+        # unlike async_set_updated_data this keeps the scheduled refresh
+        self.async_update_listeners()
+
+    # ENTSO: follow the entities referenced by the template and recalculate when they change
+    @callback
+    def async_track_template(self) -> None:
+        self.async_untrack_template()
+        if self.modifyer.hass is None:
+            self.modifyer.hass = self.hass
+
+        # a fixed now() keeps the tracker from re-rendering every minute
+        self._template_tracker = async_track_template_result(
+            self.hass,
+            [
+                TrackTemplate(
+                    self.modifyer,
+                    {"current_price": 0, "now": self._fake_now(dt.now())},
+                )
+            ],
+            self._async_template_changed,
+        )
+
+    @callback
+    def async_untrack_template(self) -> None:
+        if self._template_tracker is not None:
+            self._template_tracker.async_remove()
+            self._template_tracker = None
+
+    @callback
+    def _async_template_changed(self, event, updates) -> None:
+        if event is None:
+            return
+        self.logger.debug(
+            f"Entity {event.data.get('entity_id')} used in the template changed"
+        )
+        self.async_recalculate()
+
+    def _fake_now(self, fake_dt):
+        def inner(*args, **kwargs):
+            self._template_used_time = True
+            return fake_dt
+
+        return pass_context(inner)
+
     # ENTSO: recalculate the price using the given template
     def calc_price(self, value, fake_dt=None, no_template=False) -> float:
         """Calculate price based on the users settings."""
@@ -83,15 +233,8 @@ class EntsoeCoordinator(DataUpdateCoordinator):
 
         price = value / ENERGY_SCALES[self.energy_scale]
         if fake_dt is not None:
-
-            def faker():
-                def inner(*args, **kwargs):
-                    return fake_dt
-
-                return pass_context(inner)
-
             template_value = self.modifyer.async_render(
-                now=faker(), current_price=price
+                now=self._fake_now(fake_dt), current_price=price
             )
         else:
             template_value = self.modifyer.async_render()
@@ -100,20 +243,86 @@ class EntsoeCoordinator(DataUpdateCoordinator):
 
         return price
 
+    # ENTSO: the template only passes the price through, so it does not need rendering
+    def is_plain_template(self) -> bool:
+        return re.sub(r"\s", "", self.modifyer.template) == DEFAULT_MODIFYER
+
     # ENTSO: recalculate the price for each price
     def parse_hourprices(self, hourprices):
+        if self.is_plain_template():
+            return {
+                hour: round(price / ENERGY_SCALES[self.energy_scale] * (1 + self.vat), 5)
+                for hour, price in hourprices.items()
+            }
+
+        # a render that did not call now() only depends on the price (and the entity
+        # states, which do not change during this loop) so it is reused for equal prices
+        rendered = {}
+        result = {}
         for hour, price in hourprices.items():
-            hourprices[hour] = self.calc_price(value=price, fake_dt=hour)
-        return hourprices
+            if price in rendered:
+                result[hour] = rendered[price]
+                continue
+            self._template_used_time = False
+            result[hour] = self.calc_price(value=price, fake_dt=hour)
+            if not self._template_used_time:
+                rendered[price] = result[hour]
+        return result
+
+    # ENTSO: the offset after each period boundary at which this entry fetches, stable per entry
+    @property
+    def fetch_jitter(self) -> timedelta:
+        seed = self.config_entry.entry_id if self.config_entry else self.area
+        return fetch_jitter(seed, self.fetch_spread, self.refresh_minutes)
+
+    # ENTSO: the enabled datasets that are polled for their latest slots
+    @property
+    def incremental_datasets(self) -> list[str]:
+        return [dataset for dataset in self.datasets if DATASETS[dataset].incremental]
+
+    # ENTSO: minutes between two refreshes, shorter while a dataset is polled
+    @property
+    def refresh_minutes(self) -> int:
+        if self.incremental_datasets:
+            return min(self.period_minutes, POLL_MINUTES)
+        return self.period_minutes
+
+    # ENTSO: time until the next fetch, the sensors keep updating on the period boundaries
+    def next_fetch_delay(self, now=None) -> timedelta:
+        return next_fetch_delay(
+            now or dt.utcnow(), self.refresh_minutes, self.fetch_jitter
+        )
+
+    # ENTSO: recalculate large sets of prices without blocking the event loop
+    async def async_parse_hourprices(self, hourprices):
+        if len(hourprices) <= RENDER_BATCH:
+            return self.parse_hourprices(hourprices)
+        if self.is_plain_template():
+            # plain arithmetic, safe to run in a worker thread
+            return await self.hass.async_add_executor_job(
+                self.parse_hourprices, hourprices
+            )
+
+        # templates must render in the event loop, yield to it between batches
+        result = {}
+        items = list(hourprices.items())
+        for index in range(0, len(items), RENDER_BATCH):
+            result.update(self.parse_hourprices(dict(items[index : index + RENDER_BATCH])))
+            await asyncio.sleep(0)
+        return result
 
     # ENTSO: Triggered by HA to refresh the data (interval = 60 minutes)
     async def _async_update_data(self) -> dict:
         """Get the latest data from ENTSO-e"""
         self.logger.debug("ENTSO-e DataUpdateCoordinator data update")
+        # the next refresh is scheduled with this interval once this one finishes
+        self.update_interval = self.next_fetch_delay()
         self.logger.debug(self.area)
 
         now = dt.now()
         today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        # the incremental datasets are polled on every refresh, the prices when missing
+        await self.poll_datasets(now)
         if self.check_update_needed(now) is False:
             self.logger.debug("Skipping api fetch. All data is already available")
             return self.data
@@ -122,17 +331,50 @@ class EntsoeCoordinator(DataUpdateCoordinator):
         tomorrow_evening = yesterday + timedelta(hours=71)
 
         self.logger.debug(f"fetching prices for start date: {yesterday} to end date: {tomorrow_evening}")
-        data = await self.fetch_prices(yesterday, tomorrow_evening)
-        self.logger.debug(f"received data = {data}")
+        # the datasets share the refresh, the requests are sent concurrently
+        series, _ = await asyncio.gather(
+            self.fetch_prices(yesterday, tomorrow_evening),
+            self.fetch_datasets(yesterday, tomorrow_evening),
+        )
+        self.logger.debug(f"received data = {series}")
 
+        if series is None:
+            # degraded mode, keep the prices we have
+            return self.data
 
-        if data is not None:
-            parsed_data = self.parse_hourprices(data)
-            self.logger.debug(
-                f"received pricing data from entso-e for {len(data)} hours"
+        # keep the series as published, the views for other periods derive from it
+        self.series = series
+        data = series.localized(self.period_minutes)
+        parsed_data = self.parse_hourprices(data)
+        self.logger.debug(
+            f"received pricing data from entso-e for {len(data)} hours"
+        )
+        self.data = parsed_data
+        # the archive is the bootstrap of the next start
+        try:
+            await self.hass.async_add_executor_job(self.archive.add, series)
+        except OSError as exc:
+            self.logger.warning(f"Unable to archive the prices: {exc}")
+        return parsed_data
+
+    # ENTSO: load the archived prices, so the sensors have data before the first fetch completes
+    async def async_load_cached(self) -> None:
+        today = dt.start_of_local_day()
+        start = int((today - timedelta(days=1)).timestamp()) // 60
+        end = int((today + timedelta(days=2)).timestamp()) // 60
+        try:
+            series = await self.hass.async_add_executor_job(
+                self.archive.series, start, end, Area[self.area].tz
             )
-            self.data = parsed_data
-            return parsed_data
+        except OSError as exc:
+            self.logger.warning(f"Unable to read the archived prices: {exc}")
+            return
+        if not len(series):
+            return
+
+        self.logger.debug(f"loaded {series} from the archive")
+        self.series = series
+        self.data = self.parse_hourprices(series.localized(self.period_minutes))
 
     # ENTSO: check if we need to refresh the data. If we have None, or less than 20hrs left for today, or less than 20hrs tomorrow and its after 11
     def check_update_needed(self, now):
@@ -144,22 +386,110 @@ class EntsoeCoordinator(DataUpdateCoordinator):
             return True
         return False
 
+    # ENTSO: a client with the settings of this coordinator, using the shared session of HA
+    def create_client(self) -> EntsoeClient:
+        return EntsoeClient(
+            api_key=self.api_key,
+            period=self.period,
+            fetch_log=self.fetch_history,
+            api_urls=self.api_urls,
+            session=async_get_clientsession(self.hass),
+        )
+
+    # ENTSO: fetch the enabled datasets, on a failure the previous series are kept
+    async def fetch_datasets(self, start_date, end_date):
+        datasets = [
+            dataset for dataset in self.datasets if not DATASETS[dataset].incremental
+        ]
+        if not datasets:
+            return
+        client = self.create_client()
+
+        async def query(dataset):
+            async with asyncio.timeout(10):
+                return await client.query_timeseries(
+                    DATASETS[dataset], self.area, start_date, end_date
+                )
+
+        results = await asyncio.gather(
+            *(query(dataset) for dataset in datasets), return_exceptions=True
+        )
+        for dataset, result in zip(datasets, results):
+            if isinstance(result, Exception):
+                self.logger.warning(
+                    f"Fetching the {dataset} from ENTSO-e failed with exception: {result}"
+                )
+                continue
+            self.dataset_series[dataset] = result
+
+    # ENTSO: the window of a poll, from the hour of the last received slot until the next hour
+    def poll_window(self, dataset, now) -> tuple[datetime, datetime]:
+        # the API takes whole UTC hours, at most the slots of an hour are received twice
+        now = dt.as_utc(now)
+        start = now.replace(minute=0, second=0, microsecond=0) - timedelta(days=1)
+        last_minutes = [
+            series.last_minute
+            for series in self.dataset_series.get(dataset, {}).values()
+            if series.last_minute is not None
+        ]
+        if last_minutes:
+            start = max(
+                start, datetime.fromtimestamp(min(last_minutes) * 60, timezone.utc)
+            )
+        end = now + timedelta(hours=1)
+        return (
+            start.replace(minute=0, second=0, microsecond=0),
+            end.replace(minute=0, second=0, microsecond=0),
+        )
+
+    # ENTSO: poll the incremental datasets and append the new slots to their buffers
+    async def poll_datasets(self, now):
+        datasets = self.incremental_datasets
+        if not datasets:
+            return
+        client = self.create_client()
+
+        async def poll(dataset):
+            start, end = self.poll_window(dataset, now)
+            async with asyncio.timeout(10):
+                return await client.query_timeseries(
+                    DATASETS[dataset], self.area, start, end
+                )
+
+        results = await asyncio.gather(
+            *(poll(dataset) for dataset in datasets), return_exceptions=True
+        )
+        # a day is kept, like the prices of yesterday
+        horizon = int((dt.as_utc(now) - timedelta(days=1)).timestamp()) // 60
+        for dataset, result in zip(datasets, results):
+            if isinstance(result, Exception):
+                self.logger.warning(
+                    f"Polling the {dataset} from ENTSO-e failed with exception: {result}"
+                )
+                continue
+            buffers = self.dataset_series.setdefault(dataset, {})
+            for group, series in result.items():
+                buffer = buffers.setdefault(group, PriceSeries(tz_name=series.tz_name))
+                added = buffer.extend(series)
+                self.logger.debug(f"appended {added} slots to the {dataset}")
+            for buffer in buffers.values():
+                buffer.discard_before(horizon)
+
     # ENTSO: new prices using an async job
     async def fetch_prices(self, start_date, end_date):
         try:
-            async with async_timeout.timeout(10):
-                client = EntsoeClient(api_key=self.api_key, period=self.period)
-                return await client.query_day_ahead_prices(
+            async with asyncio.timeout(10):
+                client = self.create_client()
+                return await client.query_price_series(
                     country_code=self.area, start=start_date, end=end_date
                 )
 
-        except HTTPError as exc:
-            if exc.response.status_code == 401:
-                raise UpdateFailed("Unauthorized: Please check your API-key.") from exc
+        except EntsoeUnauthorized as exc:
+            raise UpdateFailed("Unauthorized: Please check your API-key.") from exc
         except Exception as exc:
-            if self.data is not None:
-                newest_timestamp = self.data[max(self.data.keys())]
-                if (newest_timestamp) > dt.now():
+            if self.data:
+                newest_timestamp = max(self.data.keys())
+                if newest_timestamp > dt.now():
                     self.logger.warning(
                         f"Warning the integration is running in degraded mode (falling back on stored data) since fetching the latest ENTSOE-e prices failed with exception: {exc}."
                     )
@@ -180,7 +510,9 @@ class EntsoeCoordinator(DataUpdateCoordinator):
 
     # ENTSO: Return the data for the given date
     def get_data(self, date):
-        return {k: v for k, v in self.data.items() if k.date() == date.date()}
+        start = dt.start_of_local_day(date)
+        end = start + timedelta(days=1)
+        return {k: v for k, v in self.data.items() if start <= k < end}
 
     # ENTSO: Return the data for today
     def get_data_today(self):
@@ -206,22 +538,76 @@ class EntsoeCoordinator(DataUpdateCoordinator):
     def get_current_price(self) -> int:
         return self.data[self.current_bucket_time]
 
+    # SENSOR: Split energy consumed evenly from start to end over the slots it was consumed in
+    def split_energy(self, energy, start, end) -> dict[datetime, float]:
+        if end <= start:
+            return {bucket_time(end, self.period_minutes): energy}
+
+        period = timedelta(minutes=self.period_minutes)
+        shares = {}
+        slot = bucket_time(start, self.period_minutes)
+        while slot < end:
+            share = (min(slot + period, end) - max(slot, start)) / (end - start)
+            shares[slot] = energy * share
+            slot += period
+        return shares
+
+    # SENSOR: Get the cost of energy consumed evenly from start to end, each part at the price of its slot
+    def get_cost(self, energy, start, end) -> float:
+        # slots without a price are not charged
+        cost = 0.0
+        for slot, slot_energy in self.split_energy(energy, start, end).items():
+            price = self.data.get(slot)
+            if price is not None:
+                cost += slot_energy * price
+        return cost
+
     # SENSOR: Get the next hour price
     def get_next_price(self) -> int:
         return self.data[
             self.current_bucket_time + timedelta(minutes=self.period_minutes)
         ]
 
+    # SENSOR: Get the value of a dataset for the current bucket, summed over the groups (e.g. production types)
+    def get_current_value(self, dataset, groups=(None,)) -> float:
+        minute = int(self.current_bucket_time.timestamp()) // 60
+        series = self.dataset_series[dataset]
+        values = [
+            series[group].prices(self.period_minutes)[minute]
+            for group in groups
+            if group in series
+        ]
+        if not values:
+            raise KeyError(f"No {dataset} available for {groups}")
+        return sum(values)
+
+    # SENSOR: Get the last published price of a dataset, e.g. the imbalance price of the last settled slot
+    def get_latest_price(self, dataset) -> float:
+        series = self.dataset_series[dataset][None]
+        if not series.segments:
+            raise KeyError(f"No {dataset} available")
+        segment = max(series.segments, key=lambda segment: segment.last_minute)
+        return round(segment.prices[-1] / ENERGY_SCALES[self.energy_scale], 5)
+
     # SENSOR: Get timestamped prices of today as attribute for Average Sensor
     def get_prices_today(self):
-        return self.get_timestamped_prices(self.get_data_today())
+        return self.get_derived(
+            ("prices_today", self.today),
+            lambda: self.get_timestamped_prices(self.get_data_today()),
+        )
 
     # SENSOR: Get timestamped prices of tomorrow as attribute for Average Sensor
     def get_prices_tomorrow(self):
-        return self.get_timestamped_prices(self.get_data_tomorrow())
+        return self.get_derived(
+            ("prices_tomorrow", self.today),
+            lambda: self.get_timestamped_prices(self.get_data_tomorrow()),
+        )
 
     # SENSOR: Get timestamped prices of today & tomorrow or yesterday & today as attribute for Average Sensor
     def get_prices(self):
+        return self.get_derived(("prices", self.today), self._get_prices)
+
+    def _get_prices(self):
         if len(self.data) > 48:
             return self.get_timestamped_prices(
                 {hour: price for hour, price in self.data.items() if hour >= self.today}
@@ -236,12 +622,52 @@ class EntsoeCoordinator(DataUpdateCoordinator):
 
     # SENSOR: Timestamp the prices
     def get_timestamped_prices(self, hourprices):
+        timestamps = self.get_derived(
+            "str", lambda: {hour: str(hour) for hour in self.data or ()}
+        )
         list = []
         for hour, price in hourprices.items():
-            str_hour = str(hour)
+            str_hour = timestamps.get(hour) or str(hour)
             list.append({"time": str_hour, "price": price})
         return list
 
+    # SERVICES: Timestamp the prices as ISO 8601, the timestamps of the current data are formatted once
+    def get_serialized_prices(self, prices):
+        timestamps = self.get_derived(
+            "isoformat", lambda: {hour: hour.isoformat() for hour in self.data or ()}
+        )
+        return [
+            {"timestamp": timestamps.get(hour) or hour.isoformat(), "price": price}
+            for hour, price in prices.items()
+        ]
+
+    # SENSOR: return the value derived from the data, it is built again when the data is replaced
+    def get_derived(self, key, build):
+        derived = self._get_derived_values()
+        value = derived.get(key)
+        if value is None:
+            value = derived[key] = build()
+        return value
+
+    # ANALYSIS: as get_derived, for values built in the executor from parameters of the caller,
+    # only the value of the latest parameters is kept, so changing parameters do not pile up
+    async def async_get_derived(self, key, parameters, build, *args):
+        data = self.data
+        cached = self._get_derived_values().get(key)
+        if cached is not None and cached[0] == parameters:
+            return cached[1]
+        value = await self.hass.async_add_executor_job(build, *args)
+        # prices replaced while building are not cached
+        if self.data is data:
+            self._get_derived_values()[key] = (parameters, value)
+        return value
+
+    def _get_derived_values(self):
+        if self._derived_data is not self.data:
+            self._derived_data = self.data
+            self._derived = {}
+        return self._derived
+
     # --------------------------------------------------------------------------------------------------------------------------------
     # ANALYSIS: this method is called by each sensor, each complete hour, and ensures the date and filtered hourprices are in line with the current time
     # we could still optimize as not every calculator mode needs hourly updates
@@ -257,8 +683,8 @@ class EntsoeCoordinator(DataUpdateCoordinator):
                     "The calculator needs to be synced with the current time"
                 )
                 if not self.data:
-                    self.logger.debug("no data available yet, fetching data")
-                    await self._async_update_data()
+                    # the refresh of the coordinator runs in the background, never fetch here
+                    self.logger.debug("no data available yet")
 
                 if self.today.date() != now.date():
                     self.logger.debug(
@@ -342,17 +768,179 @@ class EntsoeCoordinator(DataUpdateCoordinator):
         return round(current / spread * 100, 1)
 
     # --------------------------------------------------------------------------------------------------------------------------------
+    # ANALYSIS: the kWh of the energy unit the prices are in
+    @property
+    def unit_kwh(self) -> float:
+        return 1000 / ENERGY_SCALES[self.energy_scale]
+
+    # ANALYSIS: plan count slots in the cheapest known prices from start until the deadline
+    def plan_cheapest_slots(
+        self, count, start=None, end=None, contiguous=False, profile=None
+    ):
+        if not self.data:
+            return None
+        interval = timedelta(minutes=self.period_minutes)
+        return plan(
+            self.data,
+            count,
+            interval,
+            start or dt.now(),
+            end or max(self.data) + interval,
+            contiguous,
+            profile,
+            self.unit_kwh,
+        )
+
+    # ANALYSIS: charge/discharge schedule of a battery over the known prices from the current slot,
+    # planned again only when the prices, the parameters or the current slot change
+    async def plan_battery_schedule(
+        self, capacity, charge_power, discharge_power, efficiency, state_of_charge
+    ):
+        if not self.data:
+            return None
+        start = self.current_bucket_time
+        prices = [(hour, price) for hour, price in self.data.items() if hour >= start]
+        parameters = (
+            start,
+            capacity,
+            charge_power,
+            discharge_power,
+            efficiency,
+            state_of_charge,
+        )
+        return await self.async_get_derived(
+            "battery_schedule",
+            parameters,
+            partial(battery_schedule, unit_kwh=self.unit_kwh),
+            prices,
+            timedelta(minutes=self.period_minutes),
+            capacity,
+            charge_power,
+            discharge_power,
+            efficiency,
+            state_of_charge,
+        )
+
     # SERVICES: returns data from the coordinator cache, or directly from ENTSO when not availble
     async def get_energy_prices(self, start_date, end_date):
+        prices, _ = await self.query_energy_prices(start_date, end_date)
+        return prices
+
+    # SERVICES: returns the prices and the errors of the chunks that could not be fetched
+    async def query_energy_prices(self, start_date, end_date):
         # check if we have the data already
         if (
-                len(self.get_data(start_date)) > MIN_HOURS
+                self.data
+                and len(self.get_data(start_date)) > MIN_HOURS
                 and len(self.get_data(end_date)) > MIN_HOURS
         ):
             self.logger.debug("return prices from coordinator cache.")
-            return {
-                k: v
-                for k, v in self.data.items()
-                if k.date() >= start_date.date() and k.date() <= end_date.date()
-            }
-        return self.parse_hourprices(await self.fetch_prices(start_date, end_date))
+            start, end = self.get_day_range(start_date, end_date)
+            return {k: v for k, v in self.data.items() if start <= k < end}, []
+        start, end = self.get_day_range(start_date, end_date)
+        series, errors = await self.get_archived_series(start, end)
+        if end - start > INLINE_RANGE:
+            prices = await self.hass.async_add_executor_job(
+                series.localized, self.period_minutes
+            )
+        else:
+            prices = series.localized(self.period_minutes)
+        prices = {k: v for k, v in prices.items() if start <= k < end}
+        return await self.async_parse_hourprices(prices), errors
+
+    # SERVICES: aggregate the prices of the range per day or week, only the aggregates leave the integration
+    async def get_price_statistics(self, start_date, end_date, group, percentiles, slots):
+        prices, errors = await self.query_energy_prices(start_date, end_date)
+        start, end = self.get_day_range(start_date, end_date)
+        if end - start > INLINE_RANGE:
+            statistics = await self.hass.async_add_executor_job(
+                price_statistics, prices, group, percentiles, slots
+            )
+        else:
+            statistics = price_statistics(prices, group, percentiles, slots)
+        statistics["start"] = start.isoformat()
+        statistics["end"] = end.isoformat()
+        if errors:
+            statistics["errors"] = errors
+        return statistics
+
+    # SERVICES: the local days from start to end, the day of the end is included
+    @staticmethod
+    def get_day_range(start_date, end_date):
+        start = dt.start_of_local_day(start_date)
+        end = dt.start_of_local_day(end_date) + timedelta(days=1)
+        return start, max(end, start + timedelta(days=1))
+
+    @cached_property
+    def archive(self) -> PriceArchive:
+        # the prices are archived as published, so entries of the same area share a file
+        return open_archive(
+            self.hass.config.path(STORAGE_DIR, DOMAIN, f"{self.area}.prices")
+        )
+
+    # ENTSO: release the archive on unload, the last entry of the area closes the file
+    def release_archive(self) -> None:
+        archive = self.__dict__.pop("archive", None)
+        if archive is not None:
+            release_archive(archive)
+
+    # SERVICES: returns the published prices from the local archive, only the days missing from it are fetched
+    async def get_archived_series(self, start_date, end_date):
+        start = int(start_date.timestamp()) // 60
+        end = -(-int(end_date.timestamp()) // 60)
+        errors = []
+        async with self.archive.fill_lock:
+            missing = await self.hass.async_add_executor_job(
+                self.archive.missing_days, start, end
+            )
+            chunks = [
+                chunk
+                for missing_start, missing_end in missing
+                for chunk in split_range(
+                    datetime.fromtimestamp(missing_start * 60, timezone.utc),
+                    datetime.fromtimestamp(missing_end * 60, timezone.utc),
+                    FETCH_CHUNK_DAYS,
+                )
+            ]
+            if chunks:
+                series, errors = await self.fetch_chunks(chunks)
+                if len(series):
+                    await self.hass.async_add_executor_job(self.archive.add, series)
+
+        series = await self.hass.async_add_executor_job(
+            self.archive.series, start, end, Area[self.area].tz
+        )
+        return series, errors
+
+    # SERVICES: fetch the chunks concurrently and merge them, a failing chunk does not fail the others
+    async def fetch_chunks(self, chunks):
+        client = self.create_client()
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_FETCHES)
+
+        async def fetch(chunk_start, chunk_end):
+            async with semaphore, asyncio.timeout(CHUNK_TIMEOUT):
+                self.logger.debug(f"fetching prices from {chunk_start} to {chunk_end}")
+                return await client.query_price_series(self.area, chunk_start, chunk_end)
+
+        results = await asyncio.gather(
+            *(fetch(*chunk) for chunk in chunks), return_exceptions=True
+        )
+
+        # chunks overlap where ENTSO-e returns whole delivery days, those Periods are skipped
+        series = PriceSeries(tz_name=Area[self.area].tz)
+        errors = []
+        for (chunk_start, chunk_end), result in zip(chunks, results):
+            if isinstance(result, Exception):
+                self.logger.warning(
+                    f"Fetching the prices from {chunk_start} to {chunk_end} failed with exception: {result!r}"
+                )
+                errors.append(
+                    {
+                        "start": chunk_start.isoformat(),
+                        "end": chunk_end.isoformat(),
+                        "error": str(result) or type(result).__name__,
+                    }
+                )
+                continue
+            series.merge(result)
+        return series, errors
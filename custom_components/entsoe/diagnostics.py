@@ -0,0 +1,31 @@
+"""Diagnostics support for ENTSO-e."""
+
+from __future__ import annotations
+
+from dataclasses import asdict
+from typing import Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .const import CONF_API_KEY, DOMAIN
+from .coordinator import EntsoeCoordinator
+
+TO_REDACT = {CONF_API_KEY, "securityToken"}
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    coordinator: EntsoeCoordinator = hass.data[DOMAIN][entry.entry_id]
+
+    return {
+        "entry": async_redact_data(entry.as_dict(), TO_REDACT),
+        "last_update_success": coordinator.last_update_success,
+        "hours_available": len(coordinator.data or {}),
+        "fetches": async_redact_data(
+            [asdict(record) for record in coordinator.fetch_history], TO_REDACT
+        ),
+    }
@@ -0,0 +1,249 @@
+"""Plan consumption and storage over the known prices."""
+
+from __future__ import annotations
+
+import heapq
+from collections.abc import Sequence
+from datetime import datetime, timedelta
+from operator import itemgetter
+
+Slot = tuple[datetime, float]
+
+# the state of charge is planned in steps of at most 1/BATTERY_LEVELS of the capacity,
+# finer while a power limit would be rounded off by more than LIMIT_TOLERANCE of it
+BATTERY_LEVELS = 50
+MAX_BATTERY_LEVELS = 400
+LIMIT_TOLERANCE = 0.02
+
+CHARGE = "charge"
+DISCHARGE = "discharge"
+IDLE = "idle"
+
+
+def cheapest_slots(prices: Sequence[Slot], count: int) -> list[Slot]:
+    """Return the count cheapest slots in order of time, on a tie the earliest."""
+    return sorted(heapq.nsmallest(count, prices, key=itemgetter(1)))
+
+
+def contiguous_runs(prices: Sequence[Slot], interval: timedelta) -> list[list[Slot]]:
+    """Split slots sorted by time into runs without gaps."""
+    runs = []
+    for slot in prices:
+        if runs and slot[0] - runs[-1][-1][0] == interval:
+            runs[-1].append(slot)
+        else:
+            runs.append([slot])
+    return runs
+
+
+def cheapest_window(
+    prices: Sequence[Slot],
+    count: int,
+    interval: timedelta,
+    weights: Sequence[float] | None = None,
+) -> list[Slot] | None:
+    """
+    Return the count consecutive slots with the lowest cost, on a tie the earliest.
+
+    Without weights the cost is the sum of the prices, kept in a sliding window.
+    With weights, one per slot of the window, it is the weighted sum. Returns None
+    when no run of the prices holds count slots.
+    """
+    best, best_cost = None, None
+    for run in contiguous_runs(prices, interval):
+        if len(run) < count:
+            continue
+        values = [price for _, price in run]
+        if weights is None:
+            cost = sum(values[:count])
+            costs = [cost]
+            for index in range(count, len(values)):
+                cost += values[index] - values[index - count]
+                costs.append(cost)
+        else:
+            costs = [
+                sum(weight * value for weight, value in zip(weights, values[first:]))
+                for first in range(len(values) - count + 1)
+            ]
+        first = min(range(len(costs)), key=costs.__getitem__)
+        if best_cost is None or costs[first] < best_cost:
+            best, best_cost = run[first : first + count], costs[first]
+    return best
+
+
+def plan(
+    prices: dict[datetime, float],
+    count: int,
+    interval: timedelta,
+    start: datetime,
+    end: datetime,
+    contiguous: bool = False,
+    profile: Sequence[float] | None = None,
+    unit_kwh: float = 1,
+) -> dict | None:
+    """
+    Plan count slots of interval between start and end.
+
+    Only slots that have not ended at start, and end at or before end, are
+    planned. A profile holds the power in kW of consecutive slots, its last
+    power holds for the remaining slots, and always plans a contiguous window.
+    The prices are per unit_kwh kWh, e.g. 1000 for prices per MWh, the energy
+    is returned in kWh. Returns None when the known prices do not hold enough
+    slots.
+    """
+    candidates = [
+        (timestamp, price)
+        for timestamp, price in sorted(prices.items())
+        if timestamp + interval > start and timestamp + interval <= end
+    ]
+
+    powers = None
+    if profile:
+        powers = list(profile[:count]) + [profile[-1]] * (count - len(profile))
+        slots = cheapest_window(candidates, count, interval, powers)
+    elif contiguous:
+        slots = cheapest_window(candidates, count, interval)
+    else:
+        slots = cheapest_slots(candidates, count) if len(candidates) >= count else None
+    if not slots:
+        return None
+
+    result = {
+        "start": slots[0][0].isoformat(),
+        "end": (slots[-1][0] + interval).isoformat(),
+        "slots": [
+            {"timestamp": timestamp.isoformat(), "price": price}
+            for timestamp, price in slots
+        ],
+        "average_price": round(sum(price for _, price in slots) / len(slots), 5),
+    }
+    if powers is not None:
+        hours = interval / timedelta(hours=1)
+        for slot, power in zip(result["slots"], powers):
+            slot["power"] = power
+        result["energy"] = round(sum(powers) * hours, 5)
+        result["cost"] = round(
+            sum(price * power * hours for (_, price), power in zip(slots, powers))
+            / unit_kwh,
+            5,
+        )
+    return result
+
+
+def battery_step(
+    capacity: float,
+    limits: Sequence[float],
+    levels: int = BATTERY_LEVELS,
+    max_levels: int = MAX_BATTERY_LEVELS,
+) -> float:
+    """
+    Return the energy in kWh of a step of the state of charge.
+
+    The step is at most capacity / levels and at most each limit, the energy
+    the battery may gain or lose in a slot, so every limit fits at least one
+    step. It is divided further until every limit is a whole number of steps
+    within LIMIT_TOLERANCE, as long as the capacity holds at most max_levels
+    steps.
+    """
+    base = min([capacity / levels, *(limit for limit in limits if limit > 0)])
+    divisor = 1
+    while capacity * (divisor + 1) / base <= max_levels and any(
+        limit - int(limit * divisor / base + 1e-9) * base / divisor
+        > LIMIT_TOLERANCE * limit
+        for limit in limits
+    ):
+        divisor += 1
+    return base / divisor
+
+
+def battery_schedule(
+    prices: Sequence[Slot],
+    interval: timedelta,
+    capacity: float,
+    charge_power: float,
+    discharge_power: float,
+    efficiency: float,
+    state_of_charge: float,
+    levels: int = BATTERY_LEVELS,
+    unit_kwh: float = 1,
+) -> dict:
+    """
+    Plan the charging and discharging of a battery with dynamic programming.
+
+    args:
+        prices: The slots to plan, sorted by time, per unit_kwh kWh
+        interval: The duration of a slot
+        capacity: The usable capacity in kWh
+        charge_power: The maximum power in kW from the grid while charging
+        discharge_power: The maximum power in kW into the grid while discharging
+        efficiency: The round trip efficiency between 0 and 1, lost half on
+            charging and half on discharging
+        state_of_charge: The state of charge at the start in percent
+        levels: The minimum number of steps of the state of charge
+        unit_kwh: The kWh of the energy unit of the prices, e.g. 1000 for MWh
+
+    The state of charge is a multiple of a step, see battery_step. Going
+    backwards over the slots, the best profit from every level until the end is
+    kept, so the planning is linear in the number of slots. Energy is bought
+    and sold at the price of the slot, and energy left in the battery at the
+    end is worth nothing. On a tie the battery stays idle.
+    """
+    hours = interval / timedelta(hours=1)
+    loss = efficiency**0.5
+    # the limits apply at the grid, the battery gains or loses energy after the losses
+    charge_limit = charge_power * hours * loss
+    discharge_limit = discharge_power * hours / loss
+    step = battery_step(capacity, (charge_limit, discharge_limit), levels)
+    levels = int(capacity / step + 1e-9)
+    # an epsilon keeps e.g. 2.0 kW * 1 h / 0.2 kWh from rounding down to 9 steps
+    max_up = int(charge_limit / step + 1e-9)
+    max_down = int(discharge_limit / step + 1e-9)
+
+    # profit from the current slot until the end, for every level at its start
+    value = [0.0] * (levels + 1)
+    choices = []
+    for _, price in reversed(prices):
+        buy = price * step / loss / unit_kwh
+        sell = price * step * loss / unit_kwh
+        best_values = []
+        best_deltas = []
+        for level in range(levels + 1):
+            best, best_delta = value[level], 0
+            for delta in range(1, min(max_up, levels - level) + 1):
+                profit = value[level + delta] - buy * delta
+                if profit > best:
+                    best, best_delta = profit, delta
+            for delta in range(1, min(max_down, level) + 1):
+                profit = value[level - delta] + sell * delta
+                if profit > best:
+                    best, best_delta = profit, -delta
+            best_values.append(best)
+            best_deltas.append(best_delta)
+        value = best_values
+        choices.append(best_deltas)
+    choices.reverse()
+
+    level = min(max(round(state_of_charge / 100 * capacity / step), 0), levels)
+    profit = value[level]
+    slots = []
+    for (timestamp, price), deltas in zip(prices, choices):
+        delta = deltas[level]
+        level += delta
+        # energy at the grid, positive while charging
+        energy = delta * step / loss if delta > 0 else delta * step * loss
+        slots.append(
+            {
+                "timestamp": timestamp.isoformat(),
+                "price": price,
+                "action": CHARGE if delta > 0 else DISCHARGE if delta < 0 else IDLE,
+                "power": round(energy / hours, 3),
+                "state_of_charge": round(level * step / capacity * 100, 1),
+            }
+        )
+
+    return {
+        "start": prices[0][0].isoformat() if prices else None,
+        "end": (prices[-1][0] + interval).isoformat() if prices else None,
+        "profit": round(profit, 5),
+        "slots": slots,
+    }
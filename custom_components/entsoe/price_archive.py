@@ -0,0 +1,238 @@
+"""Append-only archive of published prices, read through mmap."""
+
+from __future__ import annotations
+
+import asyncio
+import mmap
+import os
+import struct
+import threading
+from array import array
+from bisect import bisect_right
+from collections import Counter
+
+from .price_series import PriceSegment, PriceSeries
+from .resample import pad
+
+# epoch minute, resolution in minutes and price of a single published price
+RECORD = struct.Struct("<iid")
+MINUTE = struct.Struct("<i")
+DAY = 1440
+
+_ARCHIVES: dict[str, PriceArchive] = {}
+# number of open_archive calls not released yet, per path
+_REFERENCES: Counter = Counter()
+
+
+def open_archive(path: str) -> PriceArchive:
+    """Return the shared archive of a file, entries of the same area share one."""
+    archive = _ARCHIVES.get(path)
+    if archive is None:
+        archive = _ARCHIVES[path] = PriceArchive(path)
+    _REFERENCES[path] += 1
+    return archive
+
+
+def release_archive(archive: PriceArchive) -> None:
+    """Release an archive returned by open_archive, the last release closes it."""
+    _REFERENCES[archive.path] -= 1
+    if _REFERENCES[archive.path] > 0:
+        return
+    del _REFERENCES[archive.path]
+    if _ARCHIVES.get(archive.path) is archive:
+        del _ARCHIVES[archive.path]
+    archive.close()
+
+
+class PriceArchive:
+    """
+    Fixed width records sorted by epoch minute in a single file.
+
+    A range query is a binary search in the mapped file and a slice, nothing is
+    parsed. The prices are stored as published, at their own resolution and
+    without the template applied. All methods do blocking file IO.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        # held in the event loop while filling, so concurrent queries fetch a day once
+        self.fill_lock = asyncio.Lock()
+        self._file = None
+        self._mmap: mmap.mmap | None = None
+
+    def __len__(self) -> int:
+        with self._lock:
+            mapped = self._map()
+            return 0 if mapped is None else len(mapped) // RECORD.size
+
+    def _map(self) -> mmap.mmap | None:
+        if self._mmap is None:
+            if not os.path.exists(self.path):
+                return None
+            size = os.path.getsize(self.path)
+            if size % RECORD.size:
+                # an interrupted append left a partial record, drop it
+                size -= size % RECORD.size
+                os.truncate(self.path, size)
+            if size == 0:
+                return None
+            self._file = open(self.path, "rb")
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._mmap
+
+    def close(self) -> None:
+        with self._lock:
+            self._unmap()
+
+    def _unmap(self) -> None:
+        if self._mmap is not None:
+            self._mmap.close()
+            self._file.close()
+            self._mmap = self._file = None
+
+    @staticmethod
+    def _bisect(mapped: mmap.mmap, minute: int) -> int:
+        """Return the index of the first record at or after the epoch minute."""
+        low, high = 0, len(mapped) // RECORD.size
+        while low < high:
+            middle = (low + high) // 2
+            if MINUTE.unpack_from(mapped, middle * RECORD.size)[0] < minute:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def _read(self, start: int, end: int) -> list[tuple[int, int, float]]:
+        mapped = self._map()
+        if mapped is None:
+            return []
+        # a record before start may still hold a price for it
+        first = max(self._bisect(mapped, start) - 1, 0)
+        last = self._bisect(mapped, end)
+        return [
+            record
+            for record in RECORD.iter_unpack(
+                mapped[first * RECORD.size : last * RECORD.size]
+            )
+            if record[0] + record[1] > start
+        ]
+
+    def read(self, start: int, end: int) -> list[tuple[int, int, float]]:
+        """Return the records holding a price between the epoch minutes."""
+        with self._lock:
+            return self._read(start, end)
+
+    def series(self, start: int, end: int, tz_name: str = "UTC") -> PriceSeries:
+        """Return the archived prices between the epoch minutes as a PriceSeries."""
+        series = PriceSeries(tz_name=tz_name)
+        segment_start = resolution = None
+        prices = array("d")
+        for minute, record_resolution, price in self.read(start, end):
+            if (
+                record_resolution != resolution
+                or minute != segment_start + len(prices) * resolution
+            ):
+                if prices:
+                    series.append(_segment(segment_start, resolution, prices))
+                segment_start, resolution, prices = minute, record_resolution, array("d")
+            prices.append(price)
+        if prices:
+            series.append(_segment(segment_start, resolution, prices))
+        return series
+
+    def missing_days(self, start: int, end: int) -> list[tuple[int, int]]:
+        """
+        Return the ranges of UTC days between the epoch minutes without a price
+        for every minute, as (start, end) epoch minutes aligned to whole days.
+        """
+        first_day = start // DAY
+        last_day = -(-end // DAY)
+        covered = Counter()
+        for minute, resolution, _ in self.read(first_day * DAY, last_day * DAY):
+            covered[minute // DAY] += resolution
+
+        missing = []
+        for day in range(first_day, last_day):
+            if covered[day] >= DAY:
+                continue
+            if missing and missing[-1][1] == day * DAY:
+                missing[-1] = (missing[-1][0], (day + 1) * DAY)
+            else:
+                missing.append((day * DAY, (day + 1) * DAY))
+        return missing
+
+    def add(self, series: PriceSeries) -> int:
+        """
+        Store the prices of the series, replacing archived prices of the same time.
+
+        Prices archived already with the same value are skipped and prices after
+        the archive are appended, so the daily refresh of yesterday to tomorrow
+        only appends tomorrow. The file is rewritten only when an archived price
+        changed or prices are inserted before the end. Returns the number of
+        records written.
+        """
+        records = []
+        for segment in series.segments:
+            # store the prices up to the end of the Period, so coverage is exact
+            prices = pad(
+                array("d", segment.prices),
+                (segment.end - segment.last_minute) // segment.resolution,
+            )
+            records.extend(
+                (segment.start + index * segment.resolution, segment.resolution, price)
+                for index, price in enumerate(prices)
+            )
+        if not records:
+            return 0
+        records.sort()
+
+        with self._lock:
+            archived = set(self._read(records[0][0], records[-1][0] + 1))
+            records = [record for record in records if record not in archived]
+            if not records:
+                return 0
+
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            mapped = self._map()
+            tail = None
+            if mapped is not None:
+                tail = RECORD.unpack_from(mapped, len(mapped) - RECORD.size)
+
+            if tail is None or records[0][0] >= tail[0] + tail[1]:
+                self._unmap()
+                with open(self.path, "ab") as file:
+                    file.write(b"".join(RECORD.pack(*record) for record in records))
+                return len(records)
+
+            # the archived records overlapping a new price are replaced
+            starts, ends = _merged_ranges(records)
+            kept = []
+            for record in RECORD.iter_unpack(mapped):
+                index = bisect_right(starts, record[0] + record[1] - 1) - 1
+                if index < 0 or ends[index] <= record[0]:
+                    kept.append(record)
+            self._unmap()
+            temporary = f"{self.path}.tmp"
+            with open(temporary, "wb") as file:
+                file.write(
+                    b"".join(RECORD.pack(*record) for record in sorted(kept + records))
+                )
+            os.replace(temporary, self.path)
+            return len(records)
+
+
+def _merged_ranges(records: list[tuple[int, int, float]]) -> tuple[list, list]:
+    """Return the starts and ends of the ranges the sorted records cover, merged."""
+    starts, ends = [], []
+    for minute, resolution, _ in records:
+        if ends and minute <= ends[-1]:
+            ends[-1] = max(ends[-1], minute + resolution)
+        else:
+            starts.append(minute)
+            ends.append(minute + resolution)
+    return starts, ends
+
+
+def _segment(start: int, resolution: int, prices: array) -> PriceSegment:
+    return PriceSegment(start, resolution, prices, start + len(prices) * resolution)
@@ -0,0 +1,178 @@
+"""Lossless model of the price series published by ENTSO-e."""
+
+from __future__ import annotations
+
+from array import array
+from datetime import datetime
+from typing import NamedTuple
+
+from .resample import pad, resample
+from .utils import offset_table
+
+
+class PriceSegment(NamedTuple):
+    """The prices of one Period, exactly as published."""
+
+    # epoch minute of the first price
+    start: int
+    # minutes between two prices
+    resolution: int
+    # one price per resolution, gaps between points already forward filled
+    prices: array
+    # epoch minute at which the Period ends, the last price holds until then
+    end: int
+
+    @property
+    def last_minute(self) -> int:
+        return self.start + len(self.prices) * self.resolution
+
+
+class PriceSeries:
+    """
+    An ordered list of PriceSegments with views derived per target resolution.
+
+    Views are computed lazily and cached, so serving the same series at multiple
+    resolutions needs neither a refetch nor a reparse.
+    """
+
+    def __init__(
+        self, segments: list[PriceSegment] | None = None, tz_name: str = "UTC"
+    ) -> None:
+        self.segments: list[PriceSegment] = segments or []
+        self.tz_name = tz_name
+        self._views: dict[int, dict[int, float]] = {}
+
+    def __len__(self) -> int:
+        return len(self.segments)
+
+    def __repr__(self) -> str:
+        return f"PriceSeries({len(self.segments)} segments, tz={self.tz_name})"
+
+    def covers(self, minute: int) -> bool:
+        """Return if a segment already holds a price for the epoch minute."""
+        return any(
+            segment.start <= minute < max(segment.end, segment.last_minute)
+            for segment in self.segments
+        )
+
+    def append(self, segment: PriceSegment) -> None:
+        self.segments.append(segment)
+        self._views.clear()
+
+    def merge(self, other: PriceSeries) -> None:
+        """Add the segments of other starting at a minute without a price yet."""
+        for segment in other.segments:
+            if not self.covers(segment.start):
+                self.segments.append(segment)
+        self.segments.sort(key=lambda segment: segment.start)
+        self._views.clear()
+
+    @property
+    def last_minute(self) -> int | None:
+        """Epoch minute at which the last received price ends, None when empty."""
+        if not self.segments:
+            return None
+        return max(segment.last_minute for segment in self.segments)
+
+    def extend(self, other: PriceSeries) -> int:
+        """
+        Append the prices of other after the last received price.
+
+        Prices up to the last minute are skipped, the rest is appended to the
+        buffer of the last segment when it continues it, so a feed polled every
+        few minutes keeps a single segment per resolution. Returns the number of
+        prices added.
+        """
+        added = 0
+        for segment in other.segments:
+            last_minute = self.last_minute
+            skip = 0
+            if last_minute is not None:
+                if segment.last_minute <= last_minute:
+                    continue
+                # ceiling division, a price starting before the last minute is known
+                skip = max(0, -((segment.start - last_minute) // segment.resolution))
+            start = segment.start + skip * segment.resolution
+            prices = segment.prices[skip:]
+
+            last = self.segments[-1] if self.segments else None
+            if (
+                last is not None
+                and last.resolution == segment.resolution
+                and last.last_minute == start
+            ):
+                last.prices.extend(prices)
+                self.segments[-1] = last._replace(end=max(last.end, segment.end))
+            else:
+                self.segments.append(
+                    PriceSegment(start, segment.resolution, prices, segment.end)
+                )
+            added += len(prices)
+
+        if added:
+            self._views.clear()
+        return added
+
+    def discard_before(self, minute: int) -> None:
+        """Drop the prices that end at or before the epoch minute."""
+        segments = []
+        for segment in self.segments:
+            if max(segment.end, segment.last_minute) <= minute:
+                continue
+            if segment.start + segment.resolution <= minute and segment.prices:
+                # the last price is kept while it holds until the end of the period
+                skip = min(
+                    (minute - segment.start) // segment.resolution,
+                    len(segment.prices) - 1,
+                )
+                segment = segment._replace(
+                    start=segment.start + skip * segment.resolution,
+                    prices=segment.prices[skip:],
+                )
+            segments.append(segment)
+        if segments != self.segments:
+            self.segments = segments
+            self._views.clear()
+
+    def prices(self, interval: int) -> dict[int, float]:
+        """
+        Return the prices resampled to interval minutes, keyed by epoch minute.
+
+        Averaged prices are rounded to 2 decimals, like the prices ENTSO-e
+        publishes, the segments themselves keep the full precision.
+        """
+        view = self._views.get(interval)
+        if view is None:
+            view = self._views[interval] = self._build_view(interval)
+        return view
+
+    def _build_view(self, interval: int) -> dict[int, float]:
+        view = {}
+        for segment in self.segments:
+            start, prices = segment.start, segment.prices
+            if segment.resolution != interval:
+                # the last price holds until the end of its bucket
+                prices = pad(
+                    array("d", prices),
+                    (-segment.last_minute % interval) // segment.resolution,
+                )
+                start, prices = resample(start, segment.resolution, prices, interval)
+                if segment.resolution < interval:
+                    prices = array("d", (round(price, 2) for price in prices))
+            else:
+                prices = array("d", prices)
+
+            # and the last (resampled) price holds until the end of the period
+            pad(prices, (segment.end - start) // interval - len(prices))
+            view.update(
+                zip(range(start, start + len(prices) * interval, interval), prices)
+            )
+        return dict(sorted(view.items()))
+
+    def localized(self, interval: int) -> dict[datetime, float]:
+        """Return the prices resampled to interval minutes, keyed by local datetime."""
+        table = offset_table(self.tz_name)
+        return {
+            table.to_datetime(minute): price
+            for minute, price in self.prices(interval).items()
+        }
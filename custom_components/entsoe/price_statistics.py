@@ -0,0 +1,108 @@
+"""Aggregate prices into the statistics returned by the get_price_statistics service."""
+
+from __future__ import annotations
+
+from collections.abc import Sequence
+from datetime import date, datetime, timedelta
+
+from homeassistant.util import dt
+
+GROUP_DAY = "day"
+GROUP_WEEK = "week"
+GROUPS = [GROUP_DAY, GROUP_WEEK]
+
+DEFAULT_PERCENTILES = (10, 50, 90)
+DEFAULT_SLOTS = 3
+
+
+def percentile(ordered: Sequence[float], q: float) -> float:
+    """
+    Return the q-th percentile of values sorted in ascending order.
+
+    Values between two ranks are interpolated linearly, the default method of
+    numpy.percentile.
+    """
+    rank = (len(ordered) - 1) * q / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def group_start(timestamp: datetime, group: str) -> date:
+    """Return the local day, or the monday of the week, the timestamp belongs to."""
+    # the range of the service is in the timezone of HA, so are its days
+    day = dt.as_local(timestamp).date()
+    if group == GROUP_WEEK:
+        day -= timedelta(days=day.weekday())
+    return day
+
+
+def summarize(
+    prices: list[tuple[datetime, float]],
+    percentiles: Sequence[float] = DEFAULT_PERCENTILES,
+    slots: int = DEFAULT_SLOTS,
+) -> dict:
+    """Return min, max, mean, percentiles and the extreme slots of the prices."""
+    # a single sort serves the extremes, the percentiles and the slots
+    order = sorted(range(len(prices)), key=lambda index: prices[index][1])
+    ordered = [prices[index][1] for index in order]
+
+    def slot(index: int) -> dict:
+        timestamp, price = prices[index]
+        return {"timestamp": timestamp.isoformat(), "price": price}
+
+    return {
+        "min": ordered[0],
+        "max": ordered[-1],
+        "mean": round(sum(ordered) / len(ordered), 5),
+        "percentiles": {
+            f"p{q:g}": round(percentile(ordered, q), 5) for q in percentiles
+        },
+        "cheapest": [slot(index) for index in order[:slots]],
+        "most_expensive": [
+            slot(index) for index in reversed(order[max(len(order) - slots, 0) :])
+        ],
+    }
+
+
+def hour_profile(prices: dict[datetime, float]) -> list[dict]:
+    """Return the min, max and mean price of every hour of the day in HA's timezone."""
+    hours: dict[int, list[float]] = {}
+    for timestamp, price in prices.items():
+        hours.setdefault(dt.as_local(timestamp).hour, []).append(price)
+
+    return [
+        {
+            "hour": hour,
+            "min": min(values),
+            "max": max(values),
+            "mean": round(sum(values) / len(values), 5),
+        }
+        for hour, values in sorted(hours.items())
+    ]
+
+
+def price_statistics(
+    prices: dict[datetime, float],
+    group: str = GROUP_DAY,
+    percentiles: Sequence[float] = DEFAULT_PERCENTILES,
+    slots: int = DEFAULT_SLOTS,
+) -> dict:
+    """
+    Aggregate prices keyed by local datetime per day or week.
+
+    Returns the statistics of every group in order, and the hour-of-day profile
+    of the whole range.
+    """
+    groups: dict[date, list[tuple[datetime, float]]] = {}
+    for timestamp, price in prices.items():
+        groups.setdefault(group_start(timestamp, group), []).append((timestamp, price))
+
+    return {
+        "group": group,
+        "periods": [
+            {"start": start.isoformat(), **summarize(items, percentiles, slots)}
+            for start, items in sorted(groups.items())
+        ],
+        "hour_profile": hour_profile(prices),
+    }
@@ -0,0 +1,102 @@
+"""Resample contiguous price buffers between resolutions."""
+
+from __future__ import annotations
+
+from array import array
+from collections.abc import Sequence
+from math import gcd
+
+# below this number of values the pure python implementation is faster than numpy
+NUMPY_THRESHOLD = 2048
+
+_numpy = None
+
+
+def _get_numpy():
+    """Import numpy on first use, returns None when it is not installed."""
+    global _numpy
+    if _numpy is None:
+        try:
+            import numpy
+        except ImportError:
+            numpy = False
+        _numpy = numpy
+    return _numpy or None
+
+
+def resample(
+    start: int, interval: int, prices: Sequence[float], target: int
+) -> tuple[int, array]:
+    """
+    Resample a contiguous buffer of prices to another interval.
+
+    args:
+        start: The epoch minute of the first price
+        interval: The interval in minutes between the prices
+        prices: The prices, one per interval without gaps
+        target: The interval in minutes after resampling
+
+    Downsampling averages all prices that fall in a target bucket (buckets at the
+    edges may be partially filled), upsampling repeats each price (forward fill).
+    When neither interval is a multiple of the other the prices are first
+    repeated into their greatest common divisor. Returns the start of the first
+    bucket and the resampled prices.
+    """
+    if interval == target or not prices:
+        return start, array("d", prices)
+
+    if interval % target == 0:
+        return start, upsample(prices, interval // target)
+
+    step = gcd(interval, target)
+    if step != interval:
+        prices = upsample(prices, interval // step)
+
+    return downsample(start, step, prices, target)
+
+
+def pad(prices: array, count: int) -> array:
+    """Repeat the last price count more times (forward fill), in place."""
+    if count > 0 and prices:
+        prices.extend((prices[-1],) * count)
+    return prices
+
+
+def upsample(prices: Sequence[float], factor: int) -> array:
+    """Repeat every price factor times."""
+    if len(prices) * factor >= NUMPY_THRESHOLD and (np := _get_numpy()):
+        return array("d", np.repeat(np.asarray(prices, dtype=float), factor).tobytes())
+
+    result = array("d")
+    for price in prices:
+        result.extend((price,) * factor)
+    return result
+
+
+def downsample(
+    start: int, interval: int, prices: Sequence[float], target: int
+) -> tuple[int, array]:
+    """Average the prices into buckets of target minutes, aligned to the epoch."""
+    # index in prices at which each bucket starts, the first may be a partial bucket
+    offset = (start % target) // interval
+    per_bucket = target // interval
+    bucket_start = start - start % target
+
+    if len(prices) >= NUMPY_THRESHOLD and (np := _get_numpy()):
+        values = np.asarray(prices, dtype=float)
+        boundaries = np.arange(
+            (per_bucket - offset) % per_bucket, len(values), per_bucket
+        )
+        if len(boundaries) == 0 or boundaries[0] != 0:
+            boundaries = np.concatenate(([0], boundaries))
+        sums = np.add.reduceat(values, boundaries)
+        counts = np.diff(np.append(boundaries, len(values)))
+        return bucket_start, array("d", (sums / counts).tobytes())
+
+    result = array("d")
+    first = min(len(prices), per_bucket - offset)
+    result.append(sum(prices[:first]) / first)
+    for index in range(first, len(prices), per_bucket):
+        bucket = prices[index : index + per_bucket]
+        result.append(sum(bucket) / len(bucket))
+    return bucket_start, result
@@ -0,0 +1,80 @@
+"""Record and replay raw ENTSO-e responses."""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+
+_LOGGER = logging.getLogger(__name__)
+
+MODE_RECORD = "record"
+MODE_REPLAY = "replay"
+
+# never written to disk
+SECRET_PARAMS = ("securityToken",)
+
+
+class ResponseRecorder:
+    """
+    Store raw response bodies on disk or serve them back.
+
+    In record mode every response body is written as <name>.xml next to a
+    <name>.json file holding the request parameters (without the security token),
+    using the same layout as test/datasets. In replay mode responses are read back
+    from that directory and no network access happens at all.
+    """
+
+    def __init__(self, directory: str, mode: str = MODE_RECORD) -> None:
+        if mode not in (MODE_RECORD, MODE_REPLAY):
+            raise ValueError(f"Unknown recorder mode {mode}")
+        self.directory = directory
+        self.mode = mode
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == MODE_REPLAY
+
+    @staticmethod
+    def name_for(params: dict) -> str:
+        """Return a stable file name for a request."""
+        params = {k: v for k, v in params.items() if k not in SECRET_PARAMS}
+        digest = hashlib.sha1(
+            json.dumps(params, sort_keys=True).encode()
+        ).hexdigest()[:8]
+        readable = "_".join(
+            str(params[key])
+            for key in ("documentType", "in_Domain", "periodStart", "periodEnd")
+            if key in params
+        )
+        return re.sub(r"[^A-Za-z0-9_]", "-", readable) + f"_{digest}"
+
+    def _write(self, params: dict, body: bytes) -> None:
+        params = {k: v for k, v in params.items() if k not in SECRET_PARAMS}
+        os.makedirs(self.directory, exist_ok=True)
+        name = os.path.join(self.directory, self.name_for(params))
+        with open(f"{name}.xml", "wb") as f:
+            f.write(body)
+        with open(f"{name}.json", "w") as f:
+            json.dump(params, f, indent=2, sort_keys=True)
+        _LOGGER.debug(f"Recorded response to {name}.xml")
+
+    def _read(self, params: dict) -> bytes:
+        name = os.path.join(self.directory, self.name_for(params))
+        with open(f"{name}.xml", "rb") as f:
+            return f.read()
+
+    async def async_record(self, params: dict, body: bytes) -> None:
+        """Write a response body and its request parameters to disk."""
+        await asyncio.get_running_loop().run_in_executor(
+            None, self._write, params, body
+        )
+
+    async def async_replay(self, params: dict) -> bytes:
+        """Return the recorded body for a request, FileNotFoundError if missing."""
+        return await asyncio.get_running_loop().run_in_executor(
+            None, self._read, params
+        )
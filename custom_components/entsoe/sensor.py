@@ -5,24 +5,36 @@ from __future__ import annotations
 import logging
 from collections.abc import Callable
 from dataclasses import dataclass
+from datetime import datetime, timedelta
 from typing import Any
 
 from homeassistant.components.sensor import (
     DOMAIN,
     RestoreSensor,
     SensorDeviceClass,
+    SensorEntity,
     SensorEntityDescription,
+    SensorExtraStoredData,
     SensorStateClass,
 )
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.const import PERCENTAGE
-from homeassistant.core import HassJob, HomeAssistant
+from homeassistant.const import (
+    ATTR_UNIT_OF_MEASUREMENT,
+    PERCENTAGE,
+    STATE_UNAVAILABLE,
+    STATE_UNKNOWN,
+    UnitOfEnergy,
+    UnitOfPower,
+)
+from homeassistant.core import Event, HassJob, HomeAssistant, State, callback
 from homeassistant.helpers import event
 from homeassistant.helpers.device_registry import DeviceEntryType, DeviceInfo
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from homeassistant.helpers.typing import StateType
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
+from homeassistant.util import dt as dt_util
 from homeassistant.util import utcnow
+from homeassistant.util.unit_conversion import EnergyConverter
 
 from .utils import bucket_time
 from .const import (
@@ -30,21 +42,33 @@ from .const import (
     CONF_CURRENCY,
     CONF_ENERGY_SCALE,
     CONF_ENTITY_NAME,
+    CONF_ZONES,
+    DATASET_GENERATION_FORECAST,
+    DATASET_IMBALANCE_PRICES,
+    DATASET_LOAD_FORECAST,
     DEFAULT_CURRENCY,
     DEFAULT_ENERGY_SCALE,
     DOMAIN,
+    PSR_SOLAR,
+    PSR_WIND,
 )
 from .coordinator import EntsoeCoordinator
 from .utils import get_interval_minutes
+from .zones import EntsoeZonesCoordinator
 
 _LOGGER = logging.getLogger(__name__)
 
+# attributes of the average sensor restored after a restart
+RESTORED_ATTRIBUTES = ("prices_today", "prices_tomorrow", "prices")
+
 
 @dataclass
 class EntsoeEntityDescription(SensorEntityDescription):
     """Describes ENTSO-e sensor entity."""
 
     value_fn: Callable[[dict], StateType] = None
+    # the sensor is only added when the dataset is enabled
+    dataset: str | None = None
 
 
 def sensor_descriptions(
@@ -129,6 +153,104 @@ def sensor_descriptions(
             icon="mdi:clock",
             value_fn=lambda coordinator: coordinator.get_min_time(),
         ),
+        EntsoeEntityDescription(
+            key="load_forecast",
+            name="Current total load forecast",
+            native_unit_of_measurement=UnitOfPower.MEGA_WATT,
+            device_class=SensorDeviceClass.POWER,
+            state_class=SensorStateClass.MEASUREMENT,
+            icon="mdi:transmission-tower",
+            suggested_display_precision=0,
+            dataset=DATASET_LOAD_FORECAST,
+            value_fn=lambda coordinator: coordinator.get_current_value(
+                DATASET_LOAD_FORECAST
+            ),
+        ),
+        EntsoeEntityDescription(
+            key="solar_forecast",
+            name="Current solar generation forecast",
+            native_unit_of_measurement=UnitOfPower.MEGA_WATT,
+            device_class=SensorDeviceClass.POWER,
+            state_class=SensorStateClass.MEASUREMENT,
+            icon="mdi:solar-power",
+            suggested_display_precision=0,
+            dataset=DATASET_GENERATION_FORECAST,
+            value_fn=lambda coordinator: coordinator.get_current_value(
+                DATASET_GENERATION_FORECAST, PSR_SOLAR
+            ),
+        ),
+        EntsoeEntityDescription(
+            key="wind_forecast",
+            name="Current wind generation forecast",
+            native_unit_of_measurement=UnitOfPower.MEGA_WATT,
+            device_class=SensorDeviceClass.POWER,
+            state_class=SensorStateClass.MEASUREMENT,
+            icon="mdi:wind-turbine",
+            suggested_display_precision=0,
+            dataset=DATASET_GENERATION_FORECAST,
+            value_fn=lambda coordinator: coordinator.get_current_value(
+                DATASET_GENERATION_FORECAST, PSR_WIND
+            ),
+        ),
+        EntsoeEntityDescription(
+            key="imbalance_price",
+            name="Latest imbalance price",
+            native_unit_of_measurement=f"{currency}/{energy_scale}",
+            state_class=SensorStateClass.MEASUREMENT,
+            icon="mdi:scale-unbalanced",
+            suggested_display_precision=3,
+            dataset=DATASET_IMBALANCE_PRICES,
+            value_fn=lambda coordinator: coordinator.get_latest_price(
+                DATASET_IMBALANCE_PRICES
+            ),
+        ),
+    )
+
+
+def cost_description(currency: str) -> EntsoeEntityDescription:
+    """Construct the EntsoeEntityDescription of the energy cost sensor."""
+    return EntsoeEntityDescription(
+        key="energy_cost",
+        name="Energy cost",
+        native_unit_of_measurement=currency,
+        device_class=SensorDeviceClass.MONETARY,
+        # negative prices lower the total, so it is not total_increasing
+        state_class=SensorStateClass.TOTAL,
+        icon="mdi:cash",
+        suggested_display_precision=2,
+    )
+
+
+def zone_descriptions(
+    currency: str, energy_scale: str, zones: list[str]
+) -> tuple[EntsoeEntityDescription, ...]:
+    """Construct the EntsoeEntityDescriptions of an entry comparing zones."""
+    return (
+        EntsoeEntityDescription(
+            key="zone_spread",
+            name="Current price spread between zones",
+            native_unit_of_measurement=f"{currency}/{energy_scale}",
+            state_class=SensorStateClass.MEASUREMENT,
+            icon="mdi:arrow-expand-vertical",
+            suggested_display_precision=3,
+            value_fn=lambda coordinator: coordinator.get_spread(),
+        ),
+        EntsoeEntityDescription(
+            key="cheapest_zone",
+            name="Current cheapest zone",
+            device_class=SensorDeviceClass.ENUM,
+            options=zones,
+            icon="mdi:arrow-down-bold",
+            value_fn=lambda coordinator: coordinator.get_min_zone(),
+        ),
+        EntsoeEntityDescription(
+            key="most_expensive_zone",
+            name="Current most expensive zone",
+            device_class=SensorDeviceClass.ENUM,
+            options=zones,
+            icon="mdi:arrow-up-bold",
+            value_fn=lambda coordinator: coordinator.get_max_zone(),
+        ),
     )
 
 
@@ -140,12 +262,32 @@ async def async_setup_entry(
     """Set up ENTSO-e price sensor entries."""
     entsoe_coordinator = hass.data[DOMAIN][config_entry.entry_id]
 
+    if CONF_ZONES in config_entry.options:
+        async_add_entities(
+            EntsoeZoneSensor(
+                entsoe_coordinator, description, config_entry.options[CONF_ENTITY_NAME]
+            )
+            for description in zone_descriptions(
+                currency=config_entry.options.get(CONF_CURRENCY, DEFAULT_CURRENCY),
+                energy_scale=config_entry.options.get(
+                    CONF_ENERGY_SCALE, DEFAULT_ENERGY_SCALE
+                ),
+                zones=entsoe_coordinator.zones,
+            )
+        )
+        return
+
     entities = []
     entity = {}
     for description in sensor_descriptions(
         currency=config_entry.options.get(CONF_CURRENCY, DEFAULT_CURRENCY),
         energy_scale=config_entry.options.get(CONF_ENERGY_SCALE, DEFAULT_ENERGY_SCALE),
     ):
+        if (
+            description.dataset is not None
+            and description.dataset not in entsoe_coordinator.datasets
+        ):
+            continue
         entity = description
         entities.append(
             EntsoeSensor(
@@ -153,6 +295,17 @@ async def async_setup_entry(
             )
         )
 
+    if entsoe_coordinator.energy_meter:
+        entities.append(
+            EntsoeCostSensor(
+                entsoe_coordinator,
+                cost_description(
+                    config_entry.options.get(CONF_CURRENCY, DEFAULT_CURRENCY)
+                ),
+                config_entry.options[CONF_ENTITY_NAME],
+            )
+        )
+
     # Add an entity for each sensor type
     async_add_entities(entities, True)
 
@@ -204,11 +357,61 @@ class EntsoeSensor(CoordinatorEntity, RestoreSensor):
             name="entso-e" + ((" (" + name + ")") if name != "" else ""),
         )
 
-        self._update_job = HassJob(self.async_schedule_update_ha_state)
+        self._update_job = HassJob(self._async_update_and_write)
         self._unsub_update = None
+        # state, availability and attributes of the last write
+        self._last_written = None
+        # the state was restored and is kept until the coordinator has prices
+        self._restored = False
 
         super().__init__(coordinator)
 
+    async def async_added_to_hass(self) -> None:
+        """Restore the last state while the coordinator has no prices yet."""
+        await super().async_added_to_hass()
+        if self.coordinator.data:
+            return
+        last_data = await self.async_get_last_sensor_data()
+        if last_data is None or last_data.native_value is None:
+            return
+
+        self._attr_native_value = last_data.native_value
+        last_state = await self.async_get_last_state()
+        if self.description.key == "avg_price" and last_state is not None:
+            self._attr_extra_state_attributes = {
+                key: last_state.attributes[key]
+                for key in RESTORED_ATTRIBUTES
+                if key in last_state.attributes
+            }
+        self._restored = True
+        self.last_update_success = True
+        _LOGGER.debug(f"restored '{self.entity_id}' to value: {self._attr_native_value}")
+        self.async_write_ha_state()
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Recalculate the state when the coordinator has new prices."""
+        self.hass.async_create_task(self._async_update_and_write())
+
+    def _written_state(self) -> tuple:
+        return (
+            self._attr_native_value,
+            self.available,
+            getattr(self, "_attr_extra_state_attributes", None),
+        )
+
+    @callback
+    def async_write_ha_state(self) -> None:
+        """Write the state and remember what was written."""
+        self._last_written = self._written_state()
+        super().async_write_ha_state()
+
+    async def _async_update_and_write(self, *_) -> None:
+        """Update the sensor, the state is only written when something changed."""
+        await self.async_update()
+        if self._written_state() != self._last_written:
+            self.async_write_ha_state()
+
     async def async_update(self) -> None:
         """Get the latest data and updates the states."""
         # _LOGGER.debug(f"update function for '{self.entity_id} called.'")
@@ -223,7 +426,7 @@ class EntsoeSensor(CoordinatorEntity, RestoreSensor):
             self.hass,
             self._update_job,
             bucket_time(utcnow(), self.coordinator.period_minutes)
-            + self.coordinator.update_interval,
+            + timedelta(minutes=self.coordinator.period_minutes),
         )
 
         # ensure the calculated data is refreshed
@@ -240,6 +443,7 @@ class EntsoeSensor(CoordinatorEntity, RestoreSensor):
 
                 self._attr_native_value = value
                 self.last_update_success = True
+                self._restored = False
                 _LOGGER.debug(f"updated '{self.entity_id}' to value: {value}")
 
             except Exception as exc:
@@ -248,6 +452,10 @@ class EntsoeSensor(CoordinatorEntity, RestoreSensor):
                 _LOGGER.warning(
                     f"Unable to update entity '{self.entity_id}', value: {value} and error: {exc}, data: {self.coordinator.data}"
                 )
+        elif self._restored:
+            _LOGGER.debug(
+                f"Keeping the restored state of '{self.entity_id}' until data is available."
+            )
         else:
             _LOGGER.warning(
                 f"Unable to update entity '{self.entity_id}': No valid data for today available."
@@ -277,3 +485,240 @@ class EntsoeSensor(CoordinatorEntity, RestoreSensor):
     def available(self) -> bool:
         """Return if entity is available."""
         return self.last_update_success
+
+
+@dataclass
+class CostExtraStoredData(SensorExtraStoredData):
+    """The accumulated cost and the meter reading in kWh it was accumulated up to."""
+
+    meter_reading: float | None = None
+    meter_time: datetime | None = None
+    # kWh consumed in slots without a price yet, by slot
+    pending_energy: dict[datetime, float] | None = None
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            **super().as_dict(),
+            "meter_reading": self.meter_reading,
+            "meter_time": self.meter_time.isoformat() if self.meter_time else None,
+            "pending_energy": {
+                slot.isoformat(): energy
+                for slot, energy in (self.pending_energy or {}).items()
+            },
+        }
+
+    @classmethod
+    def from_dict(cls, restored: dict[str, Any]) -> CostExtraStoredData | None:
+        data = super().from_dict(restored)
+        if data is None:
+            return None
+        meter_time = restored.get("meter_time")
+        data.meter_reading = restored.get("meter_reading")
+        data.meter_time = dt_util.parse_datetime(meter_time) if meter_time else None
+        data.pending_energy = {
+            dt_util.parse_datetime(slot): energy
+            for slot, energy in (restored.get("pending_energy") or {}).items()
+        }
+        return data
+
+
+class EntsoeCostSensor(EntsoeSensor):
+    """
+    Accumulates the cost of the energy meter of the entry.
+
+    Every meter update adds the consumed energy at the price of the slot it was
+    consumed in, a delta spanning slots is split over them by time. Energy of a
+    slot without a price stays pending until its price is known. The cost, the
+    pending energy and the last reading survive restarts, so energy consumed
+    while Home Assistant was down is charged on the first update after it.
+    """
+
+    def __init__(
+        self,
+        coordinator: EntsoeCoordinator,
+        description: EntsoeEntityDescription,
+        name: str = "",
+    ) -> None:
+        super().__init__(coordinator, description, name)
+        self._attr_native_value = 0.0
+        self._meter_reading: float | None = None
+        self._meter_time: datetime | None = None
+        self._pending_energy: dict[datetime, float] = {}
+
+    @property
+    def extra_restore_state_data(self) -> CostExtraStoredData:
+        return CostExtraStoredData(
+            self.native_value,
+            self.native_unit_of_measurement,
+            self._meter_reading,
+            self._meter_time,
+            dict(self._pending_energy),
+        )
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        return {"unpriced_energy": round(sum(self._pending_energy.values()), 3)}
+
+    async def async_added_to_hass(self) -> None:
+        """Restore the cost and follow the meter."""
+        # the price sensors restore their state, the cost sensor has its own
+        await CoordinatorEntity.async_added_to_hass(self)
+        if (extra_data := await self.async_get_last_extra_data()) is not None and (
+            restored := CostExtraStoredData.from_dict(extra_data.as_dict())
+        ) is not None:
+            self._attr_native_value = float(restored.native_value or 0)
+            self._meter_reading = restored.meter_reading
+            self._meter_time = restored.meter_time
+            self._pending_energy = restored.pending_energy or {}
+
+        self.async_on_remove(
+            event.async_track_state_change_event(
+                self.hass, [self.coordinator.energy_meter], self._async_meter_changed
+            )
+        )
+        if self._meter_reading is None:
+            self._async_read_meter(self.hass.states.get(self.coordinator.energy_meter))
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """The cost only changes with the meter."""
+
+    async def async_update(self) -> None:
+        """The cost only changes with the meter."""
+
+    @property
+    def available(self) -> bool:
+        return True
+
+    @callback
+    def _async_meter_changed(self, event: Event) -> None:
+        if self._async_read_meter(event.data["new_state"]):
+            self.async_write_ha_state()
+
+    @callback
+    def _async_read_meter(self, state: State | None) -> bool:
+        """Add the cost of the energy since the last reading, returns if it was added."""
+        if state is None or state.state in (STATE_UNKNOWN, STATE_UNAVAILABLE):
+            return False
+        unit = state.attributes.get(ATTR_UNIT_OF_MEASUREMENT)
+        if unit not in EnergyConverter.VALID_UNITS:
+            _LOGGER.warning(
+                f"Unable to track the cost of '{state.entity_id}', it is not measured in an energy unit: {unit}"
+            )
+            return False
+        try:
+            # readings are kept in kWh, so a change of unit is no reset
+            reading = EnergyConverter.convert(
+                float(state.state), unit, UnitOfEnergy.KILO_WATT_HOUR
+            )
+        except ValueError:
+            return False
+
+        if self._meter_reading is None:
+            self._meter_reading, self._meter_time = reading, state.last_updated
+            return False
+        if not self.coordinator.data:
+            # keep the last reading, the energy is charged once prices are known
+            return False
+
+        delta = reading - self._meter_reading
+        if delta < 0:
+            # the meter was reset, it counted the energy since the reset
+            delta = reading
+        for slot, energy in self.coordinator.split_energy(
+            delta, self._meter_time, state.last_updated
+        ).items():
+            self._pending_energy[slot] = self._pending_energy.get(slot, 0.0) + energy
+        self._meter_reading, self._meter_time = reading, state.last_updated
+
+        # charge every slot of which the price is known by now
+        for slot in sorted(self._pending_energy):
+            price = self.coordinator.data.get(slot)
+            if price is None:
+                continue
+            energy = EnergyConverter.convert(
+                self._pending_energy.pop(slot),
+                UnitOfEnergy.KILO_WATT_HOUR,
+                self.coordinator.energy_scale,
+            )
+            self._attr_native_value += energy * price
+        if self._pending_energy:
+            _LOGGER.debug(
+                f"'{self.entity_id}' has {sum(self._pending_energy.values())} kWh pending in slots without a price: {sorted(self._pending_energy)}"
+            )
+        return True
+
+
+class EntsoeZoneSensor(CoordinatorEntity, SensorEntity):
+    """Compares the prices of the zones of an entry in the current slot."""
+
+    _attr_attribution = ATTRIBUTION
+
+    def __init__(
+        self,
+        coordinator: EntsoeZonesCoordinator,
+        description: EntsoeEntityDescription,
+        name: str = "",
+    ) -> None:
+        """Initialize the sensor."""
+        super().__init__(coordinator)
+        self.entity_description: EntsoeEntityDescription = description
+
+        if name not in (None, ""):
+            self.entity_id = f"{DOMAIN}.{name}_{description.name}"
+            self._attr_unique_id = f"entsoe.{name}_{description.key}"
+            self._attr_name = f"{description.name} ({name})"
+        else:
+            self.entity_id = f"{DOMAIN}.{description.name}"
+            self._attr_unique_id = f"entsoe.{description.key}"
+            self._attr_name = f"{description.name}"
+
+        self._attr_device_info = DeviceInfo(
+            entry_type=DeviceEntryType.SERVICE,
+            identifiers={(DOMAIN, f"{coordinator.config_entry.entry_id}_entsoe")},
+            manufacturer="entso-e",
+            model="zones",
+            name="entso-e" + ((" (" + name + ")") if name != "" else ""),
+        )
+        self._update_job = HassJob(self._async_update_slot)
+        self._unsub_update = None
+
+    async def async_added_to_hass(self) -> None:
+        await super().async_added_to_hass()
+        self.async_on_remove(self._cancel_update)
+        self._async_update_slot()
+
+    @callback
+    def _cancel_update(self) -> None:
+        if self._unsub_update:
+            self._unsub_update()
+            self._unsub_update = None
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        self._async_update_state()
+        self.async_write_ha_state()
+
+    @callback
+    def _async_update_slot(self, *_) -> None:
+        """Update the state at the start of every slot."""
+        self._cancel_update()
+        self._unsub_update = event.async_track_point_in_utc_time(
+            self.hass,
+            self._update_job,
+            bucket_time(utcnow(), self.coordinator.period_minutes)
+            + timedelta(minutes=self.coordinator.period_minutes),
+        )
+        self._async_update_state()
+        self.async_write_ha_state()
+
+    @callback
+    def _async_update_state(self) -> None:
+        self._attr_native_value = self.entity_description.value_fn(self.coordinator)
+        self._attr_extra_state_attributes = {
+            "prices": self.coordinator.get_current_prices()
+        }
+
+    @property
+    def available(self) -> bool:
+        return super().available and self._attr_native_value is not None
@@ -2,11 +2,15 @@
 
 from __future__ import annotations
 
+import asyncio
 import logging
+import time
+from collections.abc import Awaitable, Callable, Hashable
 from datetime import date, datetime
 from functools import partial
 from typing import Final
 
+import homeassistant.helpers.config_validation as cv
 import voluptuous as vol
 from homeassistant.config_entries import ConfigEntry, ConfigEntryState
 from homeassistant.core import (
@@ -20,14 +24,25 @@ from homeassistant.exceptions import ServiceValidationError
 from homeassistant.helpers import selector
 from homeassistant.util import dt as dt_util
 
-from .const import DOMAIN
+from .const import CONF_ENTITY_NAME, DOMAIN
 from .coordinator import EntsoeCoordinator
+from .price_statistics import DEFAULT_PERCENTILES, DEFAULT_SLOTS, GROUP_DAY, GROUPS
 
 _LOGGER = logging.getLogger(__name__)
 
 ATTR_CONFIG_ENTRY: Final = "config_entry"
 ATTR_START: Final = "start"
 ATTR_END: Final = "end"
+ATTR_GROUP: Final = "group"
+ATTR_PERCENTILES: Final = "percentiles"
+ATTR_SLOTS: Final = "slots"
+ATTR_CONTIGUOUS: Final = "contiguous"
+ATTR_PROFILE: Final = "profile"
+ATTR_CAPACITY: Final = "capacity"
+ATTR_CHARGE_POWER: Final = "charge_power"
+ATTR_DISCHARGE_POWER: Final = "discharge_power"
+ATTR_EFFICIENCY: Final = "efficiency"
+ATTR_STATE_OF_CHARGE: Final = "state_of_charge"
 
 ENERGY_SERVICE_NAME: Final = "get_energy_prices"
 SERVICE_SCHEMA: Final = vol.Schema(
@@ -42,6 +57,72 @@ SERVICE_SCHEMA: Final = vol.Schema(
     }
 )
 
+STATISTICS_SERVICE_NAME: Final = "get_price_statistics"
+STATISTICS_SCHEMA: Final = SERVICE_SCHEMA.extend(
+    {
+        vol.Optional(ATTR_GROUP, default=GROUP_DAY): vol.In(GROUPS),
+        vol.Optional(ATTR_PERCENTILES, default=list(DEFAULT_PERCENTILES)): vol.All(
+            cv.ensure_list, [vol.All(vol.Coerce(float), vol.Range(min=0, max=100))]
+        ),
+        vol.Optional(ATTR_SLOTS, default=DEFAULT_SLOTS): vol.All(
+            vol.Coerce(int), vol.Range(min=0, max=96)
+        ),
+    }
+)
+
+PLAN_SERVICE_NAME: Final = "plan_cheapest_slots"
+PLAN_SCHEMA: Final = vol.Schema(
+    {
+        vol.Required(ATTR_CONFIG_ENTRY): selector.ConfigEntrySelector(
+            {
+                "integration": DOMAIN,
+            }
+        ),
+        vol.Required(ATTR_SLOTS): vol.All(vol.Coerce(int), vol.Range(min=1)),
+        vol.Optional(ATTR_START): str,
+        vol.Optional(ATTR_END): str,
+        vol.Optional(ATTR_CONTIGUOUS, default=False): cv.boolean,
+        vol.Optional(ATTR_PROFILE): vol.All(
+            cv.ensure_list, [vol.All(vol.Coerce(float), vol.Range(min=0))]
+        ),
+    }
+)
+
+BATTERY_SERVICE_NAME: Final = "plan_battery_schedule"
+BATTERY_SCHEMA: Final = vol.Schema(
+    {
+        vol.Required(ATTR_CONFIG_ENTRY): selector.ConfigEntrySelector(
+            {
+                "integration": DOMAIN,
+            }
+        ),
+        vol.Required(ATTR_CAPACITY): vol.All(vol.Coerce(float), vol.Range(min=0.1)),
+        vol.Required(ATTR_CHARGE_POWER): vol.All(vol.Coerce(float), vol.Range(min=0)),
+        vol.Optional(ATTR_DISCHARGE_POWER): vol.All(
+            vol.Coerce(float), vol.Range(min=0)
+        ),
+        vol.Optional(ATTR_EFFICIENCY, default=90): vol.All(
+            vol.Coerce(float), vol.Range(min=1, max=100)
+        ),
+        vol.Required(ATTR_STATE_OF_CHARGE): vol.All(
+            vol.Coerce(float), vol.Range(min=0, max=100)
+        ),
+    }
+)
+
+BACKFILL_SERVICE_NAME: Final = "backfill_statistics"
+BACKFILL_SCHEMA: Final = vol.Schema(
+    {
+        vol.Required(ATTR_CONFIG_ENTRY): selector.ConfigEntrySelector(
+            {
+                "integration": DOMAIN,
+            }
+        ),
+        vol.Required(ATTR_START): str,
+        vol.Optional(ATTR_END): str,
+    }
+)
+
 
 def __get_date(date_input: str | None) -> date | datetime:
     """Get date."""
@@ -60,18 +141,77 @@ def __get_date(date_input: str | None) -> date | datetime:
     )
 
 
-def __serialize_prices(prices) -> ServiceResponse:
+# identical calls within this many seconds after a response share it
+RESPONSE_TTL: Final = 10
+
+
+class ResponseCache:
+    """
+    Single-flight cache of service responses.
+
+    Calls with the same key while a response is computed await that computation,
+    calls shortly after it get the same response. Failed responses, and
+    responses with chunk errors, are not kept.
+    """
+
+    def __init__(self, ttl: float = RESPONSE_TTL) -> None:
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        # key: (monotonic expiry, None while in flight, and the shared task)
+        self._responses: dict[Hashable, tuple[float | None, asyncio.Task]] = {}
+
+    def __len__(self) -> int:
+        return len(self._responses)
+
+    async def get(
+        self, key: Hashable, compute: Callable[[], Awaitable[ServiceResponse]]
+    ) -> ServiceResponse:
+        now = time.monotonic()
+        cached = self._responses.get(key)
+        if cached is not None and (cached[0] is None or cached[0] > now):
+            self.hits += 1
+            # a cancelled caller must not cancel the computation of the others
+            return await asyncio.shield(cached[1])
+
+        self.misses += 1
+        self._prune(now)
+        task = asyncio.get_running_loop().create_task(compute())
+        self._responses[key] = (None, task)
+        task.add_done_callback(lambda task: self._completed(key, task))
+        return await asyncio.shield(task)
+
+    def _completed(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._responses.get(key, (None, None))[1] is not task:
+            return
+        if task.cancelled() or task.exception() or task.result().get("errors"):
+            del self._responses[key]
+        else:
+            self._responses[key] = (time.monotonic() + self.ttl, task)
+
+    def _prune(self, now: float) -> None:
+        for key, (expires, _) in list(self._responses.items()):
+            if expires is not None and expires <= now:
+                del self._responses[key]
+
+    def clear(self) -> None:
+        self._responses.clear()
+
+    @property
+    def info(self) -> dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self)}
+
+
+RESPONSE_CACHE = ResponseCache()
+
+
+def __serialize_prices(coordinator: EntsoeCoordinator, prices) -> ServiceResponse:
     """Serialize prices."""
-    return {
-        "prices": [
-            {"timestamp": dt.isoformat(), "price": price}
-            for dt, price in prices.items()
-        ]
-    }
+    return {"prices": coordinator.get_serialized_prices(prices)}
 
 
-def __get_coordinator(hass: HomeAssistant, call: ServiceCall) -> EntsoeCoordinator:
-    """Get the coordinator from the entry."""
+def __get_entry(hass: HomeAssistant, call: ServiceCall) -> ConfigEntry:
+    """Get the loaded entry of the call."""
     entry_id: str = call.data[ATTR_CONFIG_ENTRY]
     entry: ConfigEntry | None = hass.config_entries.async_get_entry(entry_id)
 
@@ -91,8 +231,22 @@ def __get_coordinator(hass: HomeAssistant, call: ServiceCall) -> EntsoeCoordinat
                 "config_entry": entry.title,
             },
         )
+    return entry
+
 
-    coordinator: EntsoeCoordinator = hass.data[DOMAIN][entry_id]
+def __get_coordinator(hass: HomeAssistant, call: ServiceCall) -> EntsoeCoordinator:
+    """Get the coordinator from the entry."""
+    entry = __get_entry(hass, call)
+    coordinator: EntsoeCoordinator = hass.data[DOMAIN][entry.entry_id]
+    if not isinstance(coordinator, EntsoeCoordinator):
+        # an entry comparing zones has no prices of a single area
+        raise ServiceValidationError(
+            translation_domain=DOMAIN,
+            translation_key="unsupported_config_entry",
+            translation_placeholders={
+                "config_entry": entry.title,
+            },
+        )
     return coordinator
 
 
@@ -106,12 +260,125 @@ async def __get_prices(
     start = __get_date(call.data.get(ATTR_START))
     end = __get_date(call.data.get(ATTR_END))
 
-    data = await coordinator.get_energy_prices(
-        start_date=start,
-        end_date=end,
+    async def compute() -> ServiceResponse:
+        data, errors = await coordinator.query_energy_prices(
+            start_date=start,
+            end_date=end,
+        )
+
+        response = __serialize_prices(coordinator, data)
+        # chunks that could not be fetched leave a gap, the rest is still returned
+        if errors:
+            response["errors"] = errors
+        return response
+
+    # the response only depends on the local days of the range
+    key = (ENERGY_SERVICE_NAME, coordinator, *coordinator.get_day_range(start, end))
+    return await RESPONSE_CACHE.get(key, compute)
+
+
+async def __get_price_statistics(
+    call: ServiceCall,
+    *,
+    hass: HomeAssistant,
+) -> ServiceResponse:
+    coordinator = __get_coordinator(hass, call)
+
+    start = __get_date(call.data.get(ATTR_START))
+    end = __get_date(call.data.get(ATTR_END))
+    group = call.data[ATTR_GROUP]
+    percentiles = tuple(call.data[ATTR_PERCENTILES])
+    slots = call.data[ATTR_SLOTS]
+
+    key = (
+        STATISTICS_SERVICE_NAME,
+        coordinator,
+        *coordinator.get_day_range(start, end),
+        group,
+        percentiles,
+        slots,
+    )
+    return await RESPONSE_CACHE.get(
+        key,
+        partial(
+            coordinator.get_price_statistics,
+            start_date=start,
+            end_date=end,
+            group=group,
+            percentiles=percentiles,
+            slots=slots,
+        ),
+    )
+
+
+async def __plan_cheapest_slots(
+    call: ServiceCall,
+    *,
+    hass: HomeAssistant,
+) -> ServiceResponse:
+    coordinator = __get_coordinator(hass, call)
+    count = call.data[ATTR_SLOTS]
+
+    plan = coordinator.plan_cheapest_slots(
+        count,
+        start=__get_date(call.data.get(ATTR_START)),
+        end=__get_date(call.data[ATTR_END]) if ATTR_END in call.data else None,
+        contiguous=call.data[ATTR_CONTIGUOUS],
+        profile=call.data.get(ATTR_PROFILE),
+    )
+    if plan is None:
+        raise ServiceValidationError(
+            translation_domain=DOMAIN,
+            translation_key="not_enough_prices",
+            translation_placeholders={
+                "slots": str(count),
+            },
+        )
+    return plan
+
+
+async def __plan_battery_schedule(
+    call: ServiceCall,
+    *,
+    hass: HomeAssistant,
+) -> ServiceResponse:
+    coordinator = __get_coordinator(hass, call)
+    charge_power = call.data[ATTR_CHARGE_POWER]
+
+    schedule = await coordinator.plan_battery_schedule(
+        capacity=call.data[ATTR_CAPACITY],
+        charge_power=charge_power,
+        discharge_power=call.data.get(ATTR_DISCHARGE_POWER, charge_power),
+        efficiency=call.data[ATTR_EFFICIENCY] / 100,
+        state_of_charge=call.data[ATTR_STATE_OF_CHARGE],
     )
+    if schedule is None:
+        raise ServiceValidationError(
+            translation_domain=DOMAIN,
+            translation_key="no_prices",
+        )
+    return schedule
 
-    return __serialize_prices(data)
+
+async def __backfill_statistics(
+    call: ServiceCall,
+    *,
+    hass: HomeAssistant,
+) -> ServiceResponse:
+    from .backfill import async_backfill_statistics, statistic_id_for
+
+    entry = __get_entry(hass, call)
+    coordinator = __get_coordinator(hass, call)
+    name = entry.options.get(CONF_ENTITY_NAME)
+
+    return await async_backfill_statistics(
+        hass,
+        coordinator,
+        statistic_id=statistic_id_for(coordinator, name),
+        name=f"{name or entry.title} price",
+        start=__get_date(call.data[ATTR_START]),
+        end=__get_date(call.data.get(ATTR_END)),
+    )
 
 
 @callback
@@ -125,3 +392,31 @@ def async_setup_services(hass: HomeAssistant) -> None:
         schema=SERVICE_SCHEMA,
         supports_response=SupportsResponse.ONLY,
     )
+    hass.services.async_register(
+        DOMAIN,
+        STATISTICS_SERVICE_NAME,
+        partial(__get_price_statistics, hass=hass),
+        schema=STATISTICS_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        PLAN_SERVICE_NAME,
+        partial(__plan_cheapest_slots, hass=hass),
+        schema=PLAN_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        BATTERY_SERVICE_NAME,
+        partial(__plan_battery_schedule, hass=hass),
+        schema=BATTERY_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        BACKFILL_SERVICE_NAME,
+        partial(__backfill_statistics, hass=hass),
+        schema=BACKFILL_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
@@ -0,0 +1,58 @@
+"""
+Benchmark parse_price_document on generated documents.
+
+Run from the test directory: python benchmark_parse.py
+Reports the wall time per parse, the peak memory allocated while parsing and the
+number of memory blocks still allocated for the result.
+"""
+
+import sys
+import os
+
+sys.path.append(os.path.abspath(".."))
+
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+from api_client import Area, EntsoeClient
+from fake_entsoe import generate_price_document
+
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+CASES = [
+    ("1 year PT60M", datetime(2025, 1, 1, tzinfo=timezone.utc), "PT60M", "PT60M"),
+    ("1 year PT15M", datetime(2025, 1, 1, tzinfo=timezone.utc), "PT15M", "PT15M"),
+    ("1 year PT15M -> PT60M", datetime(2025, 1, 1, tzinfo=timezone.utc), "PT15M", "PT60M"),
+    ("3 days PT15M", datetime(2024, 1, 4, tzinfo=timezone.utc), "PT15M", "PT15M"),
+]
+ROUNDS = 5
+
+
+def run(name, end, resolution, period):
+    document = generate_price_document(Area.NL, START, end, resolution)
+    client = EntsoeClient("benchmark", period=period)
+
+    durations = []
+    for _ in range(ROUNDS):
+        parse_start = time.perf_counter()
+        client.parse_price_document(document)
+        durations.append(time.perf_counter() - parse_start)
+
+    tracemalloc.start()
+    blocks_before = sys.getallocatedblocks()
+    result = client.parse_price_document(document)
+    blocks_after = sys.getallocatedblocks()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(
+        f"{name:24} {len(result):6} slots  "
+        f"{min(durations) * 1000:8.1f} ms  "
+        f"peak {peak / 1024 / 1024:6.1f} MiB  "
+        f"result blocks {blocks_after - blocks_before:7}"
+    )
+
+
+if __name__ == "__main__":
+    for case in CASES:
+        run(*case)
@@ -0,0 +1,282 @@
+"""A local stand-in for the ENTSO-e Transparency Platform, used by the tests.
+
+The server answers A44 (day-ahead price), A65 (load forecast), A69 (solar and
+wind forecast) and A85 (imbalance price, zipped) requests for any `Area` with
+generated values. Latency, error
+responses and hanging connections can be injected to exercise the client and
+coordinator without hitting the real API.
+"""
+
+import asyncio
+import io
+import math
+import zipfile
+from collections import deque
+from datetime import datetime, timedelta, timezone
+
+from aiohttp import web
+
+from api_client import Area
+from utils import get_interval_minutes
+
+REQUEST_DATETIMEFORMAT = "%Y%m%d%H%M"
+DOCUMENT_DATETIMEFORMAT = "%Y-%m-%dT%H:%MZ"
+NAMESPACE = "urn:iec62325.351:tc57wg16:451-3:publicationdocument:7:3"
+
+
+def generate_price(area_code: str, timestamp: datetime) -> float:
+    """Deterministic price for an area and slot, following a daily curve."""
+    hour = timestamp.hour + timestamp.minute / 60
+    offset = sum(ord(c) for c in area_code) % 40
+    return round(60 + offset + 40 * math.sin((hour - 6) / 24 * 2 * math.pi), 2)
+
+
+def generate_quantity(area_code: str, timestamp: datetime, psr_type: str | None) -> float:
+    """Deterministic load (no psr type) or generation forecast in MW for a slot."""
+    hour = timestamp.hour + timestamp.minute / 60
+    scale = 1000 + sum(ord(c) for c in area_code) % 40 * 100
+    if psr_type is None:
+        return round(scale * (10 + 2 * math.sin((hour - 9) / 24 * 2 * math.pi)), 1)
+    if psr_type == "B16":
+        return round(max(0.0, scale * 3 * math.sin((hour - 6) / 12 * math.pi)), 1)
+    return round(scale * (2 + math.cos(hour / 24 * 2 * math.pi)), 1)
+
+
+def _periods(start, end, resolution, value_element, value_fn) -> str:
+    """Build one Period per UTC day in [start, end)."""
+    interval = timedelta(minutes=get_interval_minutes(resolution))
+    periods = []
+    day_start = start
+    while day_start < end:
+        day_end = min(
+            end,
+            day_start.replace(hour=0, minute=0) + timedelta(days=1),
+        )
+        points = []
+        position = 1
+        slot = day_start
+        while slot < day_end:
+            points.append(
+                "<Point>"
+                f"<position>{position}</position>"
+                f"<{value_element}>{value_fn(slot)}</{value_element}>"
+                "</Point>"
+            )
+            position += 1
+            slot += interval
+        periods.append(
+            "<Period>"
+            "<timeInterval>"
+            f"<start>{day_start.strftime(DOCUMENT_DATETIMEFORMAT)}</start>"
+            f"<end>{day_end.strftime(DOCUMENT_DATETIMEFORMAT)}</end>"
+            "</timeInterval>"
+            f"<resolution>{resolution}</resolution>"
+            f"{''.join(points)}"
+            "</Period>"
+        )
+        day_start = day_end
+    return "".join(periods)
+
+
+def _document(root: str, document_type: str, timeseries: list[str]) -> str:
+    return (
+        '<?xml version="1.0" encoding="utf-8"?>'
+        f'<{root} xmlns="{NAMESPACE}">'
+        f"<type>{document_type}</type>"
+        f"{''.join(timeseries)}"
+        f"</{root}>"
+    )
+
+
+def generate_price_document(
+    area: Area, start: datetime, end: datetime, resolution: str = "PT60M"
+) -> str:
+    """Build an A44 document with one Period per UTC day in [start, end)."""
+    periods = _periods(
+        start,
+        end,
+        resolution,
+        "price.amount",
+        lambda slot: generate_price(area.code, slot),
+    )
+    return _document(
+        "Publication_MarketDocument",
+        "A44",
+        [
+            "<TimeSeries>"
+            "<mRID>1</mRID>"
+            f'<in_Domain.mRID codingScheme="A01">{area.code}</in_Domain.mRID>'
+            f'<out_Domain.mRID codingScheme="A01">{area.code}</out_Domain.mRID>'
+            "<currency_Unit.name>EUR</currency_Unit.name>"
+            "<price_Measure_Unit.name>MWH</price_Measure_Unit.name>"
+            "<curveType>A03</curveType>"
+            f"{periods}"
+            "</TimeSeries>"
+        ],
+    )
+
+
+def generate_forecast_document(
+    area: Area,
+    start: datetime,
+    end: datetime,
+    document_type: str,
+    resolution: str = "PT60M",
+) -> str:
+    """Build an A65 (load) or A69 (solar and wind) forecast document."""
+    psr_types = ["B16", "B18", "B19"] if document_type == "A69" else [None]
+    timeseries = []
+    for index, psr_type in enumerate(psr_types, start=1):
+        domain = (
+            f'<outBiddingZone_Domain.mRID codingScheme="A01">{area.code}</outBiddingZone_Domain.mRID>'
+            if psr_type is None
+            else f'<inBiddingZone_Domain.mRID codingScheme="A01">{area.code}</inBiddingZone_Domain.mRID>'
+            f"<MktPSRType><psrType>{psr_type}</psrType></MktPSRType>"
+        )
+        periods = _periods(
+            start,
+            end,
+            resolution,
+            "quantity",
+            lambda slot: generate_quantity(area.code, slot, psr_type),
+        )
+        timeseries.append(
+            "<TimeSeries>"
+            f"<mRID>{index}</mRID>"
+            f"{domain}"
+            "<quantity_Measure_Unit.name>MAW</quantity_Measure_Unit.name>"
+            "<curveType>A01</curveType>"
+            f"{periods}"
+            "</TimeSeries>"
+        )
+    return _document("GL_MarketDocument", document_type, timeseries)
+
+
+def generate_imbalance_document(
+    area: Area, start: datetime, end: datetime, resolution: str = "PT15M"
+) -> str:
+    """Build an A85 document, the imbalance price follows the day-ahead curve."""
+    periods = _periods(
+        start,
+        end,
+        resolution,
+        "imbalance_Price.amount",
+        lambda slot: round(generate_price(area.code, slot) * 1.5, 2),
+    )
+    return _document(
+        "Balancing_MarketDocument",
+        "A85",
+        [
+            "<TimeSeries>"
+            "<mRID>1</mRID>"
+            f'<area_Domain.mRID codingScheme="A01">{area.code}</area_Domain.mRID>'
+            "<currency_Unit.name>EUR</currency_Unit.name>"
+            "<price_Measure_Unit.name>MWH</price_Measure_Unit.name>"
+            "<curveType>A03</curveType>"
+            f"{periods}"
+            "</TimeSeries>"
+        ]
+        if start < end
+        else [],
+    )
+
+
+def zip_documents(documents: list[str]) -> bytes:
+    """Pack documents like the API packs the imbalance prices."""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for index, document in enumerate(documents):
+            archive.writestr(f"document_{index}.xml", document)
+    return buffer.getvalue()
+
+
+class FakeEntsoeServer:
+    """aiohttp application imitating the ENTSO-e API endpoint."""
+
+    def __init__(
+        self,
+        api_key: str = "fake-key",
+        resolution: str = "PT60M",
+        latency: float = 0,
+    ) -> None:
+        self.api_key = api_key
+        self.resolution = resolution
+        self.latency = latency
+        # statuses returned (in order) for the next requests, e.g. [503, 429]
+        self.errors: deque[int] = deque()
+        # when set, requests are accepted but never answered
+        self.hang = False
+        self.requests_sent = 0
+        # the parameters of every request, without the security token
+        self.queries: list[dict] = []
+        # imbalance prices are published up to this time, by default up to now
+        self.published_until: datetime | None = None
+        self._release = asyncio.Event()
+        self._runner: web.AppRunner | None = None
+        self.url: str | None = None
+
+    async def start(self) -> str:
+        """Start listening on a free local port and return the endpoint url."""
+        app = web.Application()
+        app.router.add_get("/api", self._handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://127.0.0.1:{port}/api"
+        return self.url
+
+    async def stop(self) -> None:
+        """Release hanging requests and stop the server."""
+        self._release.set()
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        self.requests_sent += 1
+        self.queries.append(
+            {k: v for k, v in request.query.items() if k != "securityToken"}
+        )
+
+        if self.hang:
+            await self._release.wait()
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.errors:
+            return web.Response(status=self.errors.popleft(), text="Injected error")
+        if request.query.get("securityToken") != self.api_key:
+            return web.Response(status=401, text="Unauthorized")
+
+        domain = (
+            request.query.get("in_Domain")
+            or request.query.get("outBiddingZone_Domain")
+            or request.query.get("controlArea_Domain")
+        )
+        area = next((a for a in Area if a.code == domain), None)
+        document_type = request.query.get("documentType")
+        if area is None or document_type not in ("A44", "A65", "A69", "A85"):
+            return web.Response(status=400, text="Unsupported request")
+
+        start = datetime.strptime(
+            request.query["periodStart"], REQUEST_DATETIMEFORMAT
+        ).replace(tzinfo=timezone.utc)
+        end = datetime.strptime(
+            request.query["periodEnd"], REQUEST_DATETIMEFORMAT
+        ).replace(tzinfo=timezone.utc)
+
+        if document_type == "A85":
+            published = self.published_until or datetime.now(timezone.utc)
+            interval = timedelta(minutes=15)
+            published -= (published - start) % interval
+            document = generate_imbalance_document(area, start, min(end, published))
+            return web.Response(
+                body=zip_documents([document]), content_type="application/zip"
+            )
+        if document_type == "A44":
+            document = generate_price_document(area, start, end, self.resolution)
+        else:
+            document = generate_forecast_document(
+                area, start, end, document_type, self.resolution
+            )
+        return web.Response(text=document, content_type="text/xml")
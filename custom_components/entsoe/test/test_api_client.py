@@ -5,8 +5,26 @@ import os
 
 sys.path.append(os.path.abspath("..\\"))
 
-from api_client import EntsoeClient
-from datetime import datetime
+from api_client import (
+    GENERATION_FORECAST,
+    IMBALANCE_PRICES,
+    Area,
+    EntsoeClient,
+    FetchRecord,
+    RateLimiter,
+    unpack_documents,
+)
+import asyncio
+from datetime import datetime, timedelta, timezone
+from fake_entsoe import (
+    generate_forecast_document,
+    generate_imbalance_document,
+    generate_price_document,
+    zip_documents,
+)
+from utils import get_interval_minutes, offset_table, parse_utc_minutes
+import resample
+from price_series import PriceSeries
 
 
 class TestDocumentParsing(unittest.TestCase):
@@ -17,7 +35,7 @@ class TestDocumentParsing(unittest.TestCase):
         return super().setUp()
 
     def test_be_60m(self):
-        with open(".\\datasets\\BE_60M.xml") as f:
+        with open("./datasets/BE_60M.xml") as f:
             data = f.read()
 
         self.maxDiff = None
@@ -236,6 +254,213 @@ class TestDocumentParsing(unittest.TestCase):
             },
         )
 
+    def test_fetch_record(self):
+        with open("./datasets/BE_60M_15M_mix.xml") as f:
+            data = f.read()
+
+        record = FetchRecord()
+        self.client.parse_price_document(data, record=record)
+
+        self.assertEqual(record.resolutions, ["PT15M", "PT60M"])
+        self.assertTrue(record.averaged)
+        self.assertEqual(len(record.points_per_timeseries), 1)
+        self.assertIsNotNone(record.parse_duration)
+
+    def test_dst_day(self):
+        data = generate_price_document(
+            Area.NL,
+            datetime(2024, 10, 26, 22, tzinfo=timezone.utc),
+            datetime(2024, 10, 27, 23, tzinfo=timezone.utc),
+        )
+
+        prices = self.client.parse_price_document(data)
+
+        self.assertEqual(len(prices), 25)
+        self.assertEqual(
+            [ts.hour for ts in prices][:5],
+            [0, 1, 2, 2, 3],
+        )
+        self.assertEqual(min(prices).utcoffset(), timedelta(hours=2))
+        self.assertEqual(max(prices).utcoffset(), timedelta(hours=1))
+
+    def test_price_series_views(self):
+        with open("./datasets/BE_60M_15M_mix.xml") as f:
+            data = f.read()
+
+        series = self.client.parse_price_series(data)
+
+        self.assertIsInstance(series, PriceSeries)
+        self.assertEqual(
+            [(segment.resolution, segment.end - segment.start) for segment in series.segments],
+            [(15, 1440), (15, 1440), (60, 1440)],
+        )
+        self.assertEqual(len(series.prices(60)), 72)
+        self.assertEqual(len(series.prices(15)), 3 * 96)
+        self.assertIs(series.prices(60), series.prices(60))
+        self.assertEqual(
+            series.localized(60), self.client.parse_price_document(data)
+        )
+
+    def test_generation_forecast(self):
+        data = generate_forecast_document(
+            Area.NL,
+            datetime(2024, 10, 7, tzinfo=timezone.utc),
+            datetime(2024, 10, 9, tzinfo=timezone.utc),
+            "A69",
+            "PT15M",
+        )
+        record = FetchRecord()
+
+        series = self.client.parse_timeseries(
+            data, GENERATION_FORECAST.quantity, record, GENERATION_FORECAST.group
+        )
+
+        self.assertEqual(sorted(series), ["B16", "B18", "B19"])
+        self.assertEqual(series["B16"].tz_name, "Europe/Amsterdam")
+        self.assertEqual(len(series["B19"].prices(15)), 2 * 96)
+        self.assertEqual(len(series["B19"].prices(60)), 2 * 24)
+        self.assertEqual(record.points_per_timeseries, [2 * 96] * 3)
+        self.assertTrue(record.averaged)
+
+    def test_zipped_imbalance_prices(self):
+        start = datetime(2024, 10, 7, tzinfo=timezone.utc)
+        documents = [
+            generate_imbalance_document(Area.NL, start, start + timedelta(days=1)),
+            generate_imbalance_document(
+                Area.NL, start + timedelta(days=1), start + timedelta(hours=30)
+            ),
+        ]
+
+        unpacked = unpack_documents(zip_documents(documents))
+        series = self.client.parse_documents(unpacked, IMBALANCE_PRICES.quantity)
+
+        self.assertEqual(unpacked, documents)
+        self.assertEqual(unpack_documents(documents[0].encode()), documents[:1])
+        self.assertEqual(list(series), [None])
+        self.assertEqual(series[None].tz_name, "Europe/Amsterdam")
+        self.assertEqual(len(series[None].prices(15)), 30 * 4)
+
+    def test_extend_appends_after_the_last_slot(self):
+        start = datetime(2024, 10, 7, tzinfo=timezone.utc)
+
+        def parse(hours_from, hours_to):
+            document = generate_imbalance_document(
+                Area.NL,
+                start + timedelta(hours=hours_from),
+                start + timedelta(hours=hours_to),
+            )
+            return self.client.parse_timeseries(document, IMBALANCE_PRICES.quantity)[
+                None
+            ]
+
+        buffer = parse(0, 10)
+        # a poll starts at the hour of the last slot, the overlap is skipped
+        self.assertEqual(buffer.extend(parse(9, 12)), 8)
+        self.assertEqual(buffer.extend(parse(11, 12)), 0)
+        self.assertEqual(buffer.extend(parse(12, 26)), 14 * 4)
+
+        # the days of the later documents continue the same buffer
+        self.assertEqual(len(buffer.segments), 1)
+        self.assertEqual(len(buffer.segments[0].prices), 26 * 4)
+        self.assertEqual(buffer.prices(15), parse(0, 26).prices(15))
+
+        buffer.discard_before(buffer.segments[0].start + 25 * 60)
+        self.assertEqual(len(buffer.prices(15)), 4)
+        self.assertEqual(
+            buffer.prices(15),
+            {
+                minute: price
+                for minute, price in parse(0, 26).prices(15).items()
+                if minute >= buffer.segments[0].start
+            },
+        )
+
+
+class TestRateLimiter(unittest.IsolatedAsyncioTestCase):
+    async def test_waits_for_the_window(self):
+        limiter = RateLimiter(limit=2, window=0.2)
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+
+        for _ in range(3):
+            await limiter.acquire()
+
+        self.assertGreaterEqual(loop.time() - start, 0.19)
+
+
+class TestTimestamps(unittest.TestCase):
+    def test_parse_utc_minutes(self):
+        self.assertEqual(
+            parse_utc_minutes("2024-10-05T22:00Z") * 60,
+            datetime(2024, 10, 5, 22, tzinfo=timezone.utc).timestamp(),
+        )
+
+    def test_offset_table(self):
+        table = offset_table("Europe/Amsterdam")
+        start = parse_utc_minutes("2024-03-30T00:00Z")
+
+        for minute in range(start, start + 3 * 1440, 15):
+            expected = datetime.fromtimestamp(minute * 60, timezone.utc).astimezone(
+                table._zone
+            )
+            converted = table.to_datetime(minute)
+            self.assertEqual(converted, expected)
+            self.assertEqual(converted.utcoffset(), expected.utcoffset())
+
+
+class TestResample(unittest.TestCase):
+    def test_interval_minutes(self):
+        self.assertEqual(get_interval_minutes("PT15M"), 15)
+        self.assertEqual(get_interval_minutes("PT30M"), 30)
+        self.assertEqual(get_interval_minutes("PT1H"), 60)
+        self.assertEqual(get_interval_minutes("P1D"), 1440)
+        with self.assertRaises(ValueError):
+            get_interval_minutes("P1Y")
+
+    def test_downsample_partial_buckets(self):
+        start, prices = resample.resample(30, 15, [1, 2, 3, 4, 5, 6, 7], 60)
+
+        self.assertEqual(start, 0)
+        self.assertEqual(list(prices), [1.5, 4.5, 7])
+
+    def test_upsample(self):
+        start, prices = resample.resample(60, 60, [1, 2], 15)
+        self.assertEqual(list(prices), [1, 1, 1, 1, 2, 2, 2, 2])
+
+        start, prices = resample.resample(0, 60, [1, 2], 30)
+        self.assertEqual(list(prices), [1, 1, 2, 2])
+
+    def test_numpy_matches_python(self):
+        prices = [float(i % 97) for i in range(5000)]
+        threshold = resample.NUMPY_THRESHOLD
+        try:
+            vectorized = resample.resample(45, 15, prices, 60)
+            repeated = resample.resample(0, 60, prices, 15)
+            resample.NUMPY_THRESHOLD = len(prices) * 10
+            self.assertEqual(resample.resample(45, 15, prices, 60), vectorized)
+            self.assertEqual(resample.resample(0, 60, prices, 15), repeated)
+        finally:
+            resample.NUMPY_THRESHOLD = threshold
+
+    def test_parse_upsampled(self):
+        with open("./datasets/BE_60M.xml") as f:
+            data = f.read()
+
+        prices = EntsoeClient("fake-key", period="PT15M").parse_price_document(data)
+
+        self.assertEqual(len(prices), 96)
+        self.assertEqual(
+            prices[datetime.fromisoformat("2024-10-07T22:45:00Z")], 64.98
+        )
+
+    def test_parse_30m(self):
+        with open("./datasets/BE_60M_15M_mix.xml") as f:
+            data = f.read()
+
+        prices = EntsoeClient("fake-key", period="PT30M").parse_price_document(data)
+
+        self.assertEqual(len(prices), 3 * 48)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,142 @@
+import unittest
+
+import sys
+import os
+
+sys.path.append(os.path.abspath(".."))
+
+import tempfile
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
+from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import HomeAssistantError
+
+import backfill
+from backfill import async_fetch_statistics, backfill_range, hourly_statistics
+from coordinator import EntsoeCoordinator
+from fake_entsoe import FakeEntsoeServer
+from utils import split_range
+
+CET = timezone(timedelta(hours=1))
+
+
+class TestBackfill(unittest.TestCase):
+    def test_chunks(self):
+        start = datetime(2022, 1, 1, tzinfo=timezone.utc)
+        end = datetime(2024, 3, 1, tzinfo=timezone.utc)
+
+        ranges = list(split_range(start, end, 365))
+
+        self.assertEqual(len(ranges), 3)
+        self.assertEqual(ranges[0][0], start)
+        self.assertEqual(ranges[-1][1], end)
+        for (_, chunk_end), (next_start, _) in zip(ranges, ranges[1:]):
+            self.assertEqual(chunk_end, next_start)
+        for chunk_start, chunk_end in ranges:
+            self.assertLessEqual(chunk_end - chunk_start, timedelta(days=365))
+
+    def test_hourly_statistics(self):
+        start = datetime(2024, 1, 1, tzinfo=CET)
+        prices = {
+            start + timedelta(minutes=15 * quarter): float(quarter)
+            for quarter in range(8)
+        }
+
+        statistics = hourly_statistics(prices)
+
+        self.assertEqual(
+            [row["start"] for row in statistics],
+            [
+                datetime(2023, 12, 31, 23, tzinfo=timezone.utc),
+                datetime(2024, 1, 1, 0, tzinfo=timezone.utc),
+            ],
+        )
+        self.assertEqual(statistics[0]["mean"], 1.5)
+        self.assertEqual(statistics[0]["min"], 0)
+        self.assertEqual(statistics[1]["max"], 7)
+
+    def test_range_of_complete_hours(self):
+        start = datetime(2024, 1, 1, 0, 30, tzinfo=timezone.utc)
+        now = datetime(2024, 1, 3, 12, 40, tzinfo=timezone.utc)
+
+        self.assertEqual(
+            backfill_range(start, now + timedelta(days=1), None, now),
+            (
+                datetime(2024, 1, 1, 0, tzinfo=timezone.utc),
+                datetime(2024, 1, 3, 12, tzinfo=timezone.utc),
+            ),
+        )
+
+    def test_range_resumed_after_the_last_imported_hour(self):
+        start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        end = datetime(2024, 1, 2, tzinfo=timezone.utc)
+        now = datetime(2024, 2, 1, tzinfo=timezone.utc)
+
+        self.assertEqual(
+            backfill_range(start, end, start + timedelta(hours=5), now),
+            (start + timedelta(hours=6), end),
+        )
+        # an import outside the range is no reason to skip hours
+        self.assertEqual(
+            backfill_range(start, end, end + timedelta(days=3), now), (start, end)
+        )
+
+
+class TestFetchStatistics(unittest.IsolatedAsyncioTestCase):
+    """Fetching the chunks of a backfill from the fake ENTSO-e server."""
+
+    START = datetime(2024, 10, 7, tzinfo=timezone.utc)
+    END = datetime(2024, 10, 8, tzinfo=timezone.utc)
+
+    async def asyncSetUp(self) -> None:
+        self.server = FakeEntsoeServer(latency=0.05)
+        url = await self.server.start()
+        self.directory = tempfile.TemporaryDirectory()
+        self.hass = HomeAssistant(self.directory.name)
+        self.coordinator = EntsoeCoordinator(
+            self.hass,
+            api_key="fake-key",
+            area="NL",
+            period="PT60M",
+            energy_scale="kWh",
+            modifyer="{{current_price}}",
+            api_urls=[url],
+        )
+        self.client = self.coordinator.create_client()
+
+    async def asyncTearDown(self) -> None:
+        await self.hass.async_stop(force=True)
+        await self.server.stop()
+        self.directory.cleanup()
+
+    async def test_hours_of_the_chunk(self):
+        statistics = await async_fetch_statistics(
+            self.coordinator, self.client, self.START, self.END
+        )
+
+        self.assertEqual(len(statistics), 24)
+        self.assertEqual(statistics[0]["start"], self.START)
+
+    async def test_failed_request_is_a_home_assistant_error(self):
+        self.server.errors.append(503)
+
+        with self.assertRaises(HomeAssistantError) as raised:
+            await async_fetch_statistics(
+                self.coordinator, self.client, self.START, self.END
+            )
+        self.assertEqual(raised.exception.translation_key, "backfill_failed")
+
+    async def test_timeout_is_a_home_assistant_error(self):
+        with patch.object(backfill, "CHUNK_TIMEOUT", 0.01):
+            with self.assertRaises(HomeAssistantError) as raised:
+                await async_fetch_statistics(
+                    self.coordinator, self.client, self.START, self.END
+                )
+        self.assertEqual(
+            raised.exception.translation_placeholders["error"], "TimeoutError"
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,432 @@
+import unittest
+
+import sys
+import os
+
+sys.path.append(os.path.abspath(".."))
+
+import tempfile
+from datetime import datetime, timedelta, timezone
+
+from homeassistant.core import HomeAssistant
+
+from coordinator import EntsoeCoordinator
+from fake_entsoe import FakeEntsoeServer
+from price_statistics import price_statistics
+
+
+class CoordinatorTestCase(unittest.IsolatedAsyncioTestCase):
+    """Coordinator against the fake ENTSO-e server."""
+
+    options = {
+        "api_key": "fake-key",
+        "area": "NL",
+        "period": "PT60M",
+        "energy_scale": "kWh",
+        "modifyer": "{{current_price}}",
+    }
+
+    async def asyncSetUp(self) -> None:
+        self.server = FakeEntsoeServer(resolution="PT15M")
+        self.url = await self.server.start()
+        # the prices are archived in the storage directory of the configuration
+        self.directory = tempfile.TemporaryDirectory()
+        self.hass = HomeAssistant(self.directory.name)
+        self.coordinator = EntsoeCoordinator(
+            self.hass, api_urls=[self.url], **self.options
+        )
+        await self.coordinator.async_refresh()
+
+    async def asyncTearDown(self) -> None:
+        self.coordinator.release_archive()
+        await self.hass.async_stop(force=True)
+        await self.server.stop()
+        self.directory.cleanup()
+
+
+class TestApplyOptions(CoordinatorTestCase):
+    async def test_apply_options_without_refetch(self):
+        prices = dict(self.coordinator.data)
+
+        self.assertTrue(self.coordinator.can_apply_options(**self.options))
+        self.coordinator.async_apply_options(
+            **{**self.options, "VAT": 0.21, "modifyer": "{{current_price + 0.1}}"}
+        )
+
+        self.assertEqual(self.server.requests_sent, 1)
+        for hour, price in prices.items():
+            self.assertAlmostEqual(
+                self.coordinator.data[hour], round((price + 0.1) * 1.21, 5)
+            )
+
+    async def test_switch_period_without_refetch(self):
+        hours = len(self.coordinator.data)
+
+        self.coordinator.async_apply_options(**{**self.options, "period": "PT15M"})
+
+        self.assertEqual(self.server.requests_sent, 1)
+        self.assertEqual(len(self.coordinator.data), hours * 4)
+        self.assertEqual(self.coordinator.period_minutes, 15)
+
+    def test_new_area_needs_refetch(self):
+        self.assertFalse(
+            self.coordinator.can_apply_options(**{**self.options, "area": "BE"})
+        )
+
+
+class TestFetchSchedule(CoordinatorTestCase):
+    options = {**CoordinatorTestCase.options, "period": "PT15M"}
+
+    def test_fetch_on_the_jitter_of_the_entry(self):
+        jitter = self.coordinator.fetch_jitter
+        self.assertLessEqual(jitter, timedelta(seconds=300))
+
+        now = datetime(2024, 10, 7, 10, 7, 12, tzinfo=timezone.utc)
+        for _ in range(4):
+            next_fetch = now + self.coordinator.next_fetch_delay(now)
+            self.assertGreater(next_fetch, now)
+            self.assertLessEqual(next_fetch - now, timedelta(minutes=15, seconds=5))
+            self.assertEqual(
+                next_fetch.replace(minute=next_fetch.minute // 15 * 15, second=0)
+                + jitter,
+                next_fetch,
+            )
+            now = next_fetch
+
+    def test_jitter_is_stable_and_spread(self):
+        jitters = {
+            EntsoeCoordinator(
+                self.hass, **{**self.options, "area": area}
+            ).fetch_jitter
+            for area in ("NL", "BE", "FR", "AT", "PL", "ES")
+        }
+        self.assertEqual(self.coordinator.fetch_jitter, self.coordinator.fetch_jitter)
+        self.assertGreater(len(jitters), 1)
+
+        self.coordinator.async_apply_options(**{**self.options, "fetch_spread": 0})
+        self.assertEqual(self.coordinator.fetch_jitter, timedelta(0))
+
+
+class TestRendering(CoordinatorTestCase):
+    def year_of_prices(self) -> dict:
+        start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        return {
+            start + timedelta(hours=hour): float(hour % 300) for hour in range(8784)
+        }
+
+    async def test_plain_template_without_rendering(self):
+        self.coordinator.async_apply_options(**{**self.options, "VAT": 0.21})
+        prices = self.year_of_prices()
+
+        self.assertTrue(self.coordinator.is_plain_template())
+        result = await self.coordinator.async_parse_hourprices(prices)
+
+        for hour in list(prices)[:48]:
+            self.assertEqual(
+                result[hour],
+                self.coordinator.calc_price(value=prices[hour], fake_dt=hour),
+            )
+
+    async def test_template_rendered_in_batches(self):
+        self.coordinator.async_apply_options(
+            **{**self.options, "modifyer": "{{ current_price * 2 + 0.1 }}"}
+        )
+        prices = self.year_of_prices()
+
+        self.assertFalse(self.coordinator.is_plain_template())
+        result = await self.coordinator.async_parse_hourprices(prices)
+
+        self.assertEqual(result, self.coordinator.parse_hourprices(prices))
+        self.assertEqual(len(result), len(prices))
+
+
+class TestTemplateTracking(CoordinatorTestCase):
+    options = {
+        **CoordinatorTestCase.options,
+        "modifyer": "{{ current_price + states('input_number.tariff') | float(0) }}",
+    }
+
+    async def test_recalculate_on_entity_change(self):
+        prices = dict(self.coordinator.data)
+        self.coordinator.async_track_template()
+
+        self.hass.states.async_set("input_number.tariff", "0.25")
+        await self.hass.async_block_till_done()
+
+        self.assertEqual(self.server.requests_sent, 1)
+        for hour, price in prices.items():
+            self.assertAlmostEqual(self.coordinator.data[hour], price + 0.25)
+
+        self.coordinator.async_untrack_template()
+        self.hass.states.async_set("input_number.tariff", "0.5")
+        await self.hass.async_block_till_done()
+
+        self.assertAlmostEqual(
+            self.coordinator.data[min(prices)], prices[min(prices)] + 0.25
+        )
+
+
+class TestSerializedPrices(CoordinatorTestCase):
+    def test_attributes_built_once_per_data_version(self):
+        prices = self.coordinator.get_prices()
+
+        self.assertIs(self.coordinator.get_prices(), prices)
+        self.assertIn(prices[0]["time"], {str(hour) for hour in self.coordinator.data})
+
+        self.coordinator.async_apply_options(**{**self.options, "VAT": 0.21})
+
+        self.assertIsNot(self.coordinator.get_prices(), prices)
+        self.assertAlmostEqual(
+            self.coordinator.get_prices()[0]["price"], round(prices[0]["price"] * 1.21, 5)
+        )
+
+    def test_service_timestamps(self):
+        data = self.coordinator.data
+        other = datetime(2020, 1, 1, tzinfo=timezone.utc)
+
+        serialized = self.coordinator.get_serialized_prices({**data, other: 1.0})
+
+        self.assertEqual(len(serialized), len(data) + 1)
+        self.assertEqual(serialized[0]["timestamp"], min(data).isoformat())
+        self.assertEqual(serialized[-1], {"timestamp": other.isoformat(), "price": 1.0})
+
+
+class TestPlanner(CoordinatorTestCase):
+    def test_plan_over_the_known_prices(self):
+        data = self.coordinator.data
+        start = min(data)
+
+        result = self.coordinator.plan_cheapest_slots(3, start=start)
+
+        self.assertEqual(
+            sorted(slot["price"] for slot in result["slots"]),
+            sorted(data.values())[:3],
+        )
+        self.assertIsNone(
+            self.coordinator.plan_cheapest_slots(len(data) + 1, start=start)
+        )
+
+    def test_profile_cost_in_the_currency(self):
+        start = min(self.coordinator.data)
+        kwh = self.coordinator.plan_cheapest_slots(2, start=start, profile=[2.0])
+
+        self.coordinator.async_apply_options(**{**self.options, "energy_scale": "MWh"})
+        mwh = self.coordinator.plan_cheapest_slots(2, start=start, profile=[2.0])
+
+        self.assertAlmostEqual(
+            mwh["slots"][0]["price"], kwh["slots"][0]["price"] * 1000
+        )
+        self.assertEqual(mwh["energy"], kwh["energy"])
+        self.assertAlmostEqual(mwh["cost"], kwh["cost"], places=4)
+
+    async def test_battery_schedule_planned_once_per_data_version(self):
+        schedule = await self.coordinator.plan_battery_schedule(10, 5, 5, 0.9, 50)
+
+        plan = self.coordinator.plan_battery_schedule
+
+        self.assertEqual(
+            datetime.fromisoformat(schedule["slots"][0]["timestamp"]),
+            self.coordinator.current_bucket_time,
+        )
+        self.assertGreaterEqual(schedule["profit"], 0)
+        self.assertIs(await plan(10, 5, 5, 0.9, 50), schedule)
+        self.assertIsNot(await plan(10, 5, 5, 0.9, 60), schedule)
+
+        # a live state of charge replaces the schedule instead of adding one per call
+        for state_of_charge in range(20):
+            await plan(10, 5, 5, 0.9, state_of_charge)
+        self.assertEqual(len(self.coordinator._derived), 1)
+        schedule = await plan(10, 5, 5, 0.9, 50)
+
+        self.coordinator.async_apply_options(**{**self.options, "VAT": 0.21})
+        self.assertIsNot(await plan(10, 5, 5, 0.9, 50), schedule)
+
+
+class TestCost(CoordinatorTestCase):
+    def test_cost_split_over_the_slots(self):
+        data = self.coordinator.data
+        first, second = sorted(data)[:2]
+        quarter = timedelta(minutes=15)
+
+        self.assertAlmostEqual(
+            self.coordinator.get_cost(2.0, first + quarter, first + 2 * quarter),
+            2.0 * data[first],
+        )
+        # three quarters in the first hour, one in the second
+        self.assertAlmostEqual(
+            self.coordinator.get_cost(4.0, first + quarter, second + quarter),
+            3.0 * data[first] + 1.0 * data[second],
+        )
+        self.assertAlmostEqual(
+            self.coordinator.get_cost(1.0, second, second), data[second]
+        )
+        # energy consumed before the known prices is not charged
+        self.assertEqual(
+            self.coordinator.get_cost(1.0, first - 2 * quarter, first), 0.0
+        )
+
+    def test_energy_split_over_the_slots(self):
+        first, second = sorted(self.coordinator.data)[:2]
+        quarter = timedelta(minutes=15)
+
+        self.assertEqual(
+            self.coordinator.split_energy(6.0, first - quarter, second + quarter),
+            {first - 4 * quarter: 1.0, first: 4.0, second: 1.0},
+        )
+
+
+class TestDatasets(CoordinatorTestCase):
+    options = {
+        **CoordinatorTestCase.options,
+        "datasets": ["load_forecast", "generation_forecast"],
+    }
+
+    async def test_datasets_share_the_refresh(self):
+        self.assertEqual(self.server.requests_sent, 3)
+        self.assertEqual(
+            sorted(self.coordinator.dataset_series["generation_forecast"]),
+            ["B16", "B18", "B19"],
+        )
+        self.assertGreater(self.coordinator.get_current_value("load_forecast"), 0)
+        self.assertGreater(
+            self.coordinator.get_current_value(
+                "generation_forecast", ("B18", "B19")
+            ),
+            0,
+        )
+
+    def test_changed_datasets_need_refetch(self):
+        self.assertFalse(
+            self.coordinator.can_apply_options(**{**self.options, "datasets": []})
+        )
+
+
+class TestImbalancePrices(CoordinatorTestCase):
+    options = {**CoordinatorTestCase.options, "datasets": ["imbalance_prices"]}
+
+    def test_polled_next_to_the_prices(self):
+        self.assertEqual(
+            sorted(query["documentType"] for query in self.server.queries),
+            ["A44", "A85"],
+        )
+        self.assertEqual(self.coordinator.refresh_minutes, 15)
+        self.assertGreater(self.coordinator.get_latest_price("imbalance_prices"), 0)
+
+    async def test_poll_appends_the_slots_after_the_last_one(self):
+        now = datetime.now(timezone.utc).replace(second=0, microsecond=0)
+        self.coordinator.dataset_series.clear()
+        self.server.published_until = now - timedelta(hours=2)
+        await self.coordinator.poll_datasets(now)
+        buffer = self.coordinator.dataset_series["imbalance_prices"][None]
+        last_minute = buffer.last_minute
+
+        self.server.published_until = now
+        await self.coordinator.async_refresh()
+
+        # the prices are complete, only the new imbalance prices are requested
+        query = self.server.queries[-1]
+        self.assertEqual(query["documentType"], "A85")
+        self.assertEqual(
+            query["periodStart"],
+            datetime.fromtimestamp(last_minute * 60, timezone.utc).strftime(
+                "%Y%m%d%H00"
+            ),
+        )
+        self.assertIs(self.coordinator.dataset_series["imbalance_prices"][None], buffer)
+        self.assertEqual(len(buffer.segments), 1)
+        self.assertGreater(buffer.last_minute, last_minute)
+
+        # and the buffer holds the same slots as a single fetch of the whole window
+        self.coordinator.dataset_series.clear()
+        await self.coordinator.poll_datasets(now)
+        self.assertEqual(
+            buffer.prices(15),
+            self.coordinator.dataset_series["imbalance_prices"][None].prices(15),
+        )
+
+
+class TestArchive(CoordinatorTestCase):
+    async def test_only_missing_days_are_fetched(self):
+        start = datetime(2024, 3, 1, tzinfo=timezone.utc)
+        end = datetime(2024, 3, 10, tzinfo=timezone.utc)
+
+        prices = await self.coordinator.get_energy_prices(start, end)
+        requests_sent = self.server.requests_sent
+
+        # the day of the end is included
+        self.assertEqual(len(prices), 10 * 24)
+        self.assertEqual(await self.coordinator.get_energy_prices(start, end), prices)
+        self.assertEqual(self.server.requests_sent, requests_sent)
+
+        later = datetime(2024, 3, 15, tzinfo=timezone.utc)
+        prices = await self.coordinator.get_energy_prices(start, later)
+
+        self.assertEqual(len(prices), 15 * 24)
+        self.assertEqual(self.server.requests_sent, requests_sent + 1)
+
+    async def test_long_range_fetched_in_chunks(self):
+        start = datetime(2023, 1, 1, tzinfo=timezone.utc)
+        end = datetime(2023, 7, 1, tzinfo=timezone.utc)
+        self.server.errors.append(503)
+
+        prices, errors = await self.coordinator.query_energy_prices(start, end)
+
+        # one of the six chunks failed, its prices are missing from the result
+        self.assertEqual(self.server.requests_sent, 1 + 6)
+        self.assertEqual(len(errors), 1)
+        self.assertLess(len(prices), 182 * 24)
+        self.assertEqual(len(prices), len(set(prices)))
+
+        prices, errors = await self.coordinator.query_energy_prices(start, end)
+
+        self.assertEqual(errors, [])
+        self.assertEqual(self.server.requests_sent, 1 + 6 + 1)
+        self.assertEqual(len(prices), 182 * 24)
+        self.assertEqual(prices, dict(sorted(prices.items())))
+
+
+class TestPriceStatistics(CoordinatorTestCase):
+    async def test_statistics_of_the_archived_prices(self):
+        start = datetime(2024, 3, 4, tzinfo=timezone.utc)
+        end = datetime(2024, 3, 18, tzinfo=timezone.utc)
+
+        statistics = await self.coordinator.get_price_statistics(
+            start, end, "week", [25, 75], 4
+        )
+        prices = await self.coordinator.get_energy_prices(start, end)
+
+        self.assertNotIn("errors", statistics)
+        self.assertEqual(
+            statistics["periods"], price_statistics(prices, "week", [25, 75], 4)["periods"]
+        )
+        self.assertEqual(len(statistics["hour_profile"]), 24)
+        self.assertEqual(len(statistics["periods"][0]["cheapest"]), 4)
+        for period in statistics["periods"]:
+            self.assertLessEqual(period["min"], period["percentiles"]["p25"])
+            self.assertLessEqual(period["percentiles"]["p75"], period["max"])
+
+
+class TestBootstrap(CoordinatorTestCase):
+    async def test_load_cached_without_fetching(self):
+        coordinator = EntsoeCoordinator(self.hass, api_urls=[self.url], **self.options)
+
+        await coordinator.async_load_cached()
+
+        self.assertEqual(self.server.requests_sent, 1)
+        self.assertEqual(coordinator.data, self.coordinator.data)
+
+    async def test_degraded_mode_keeps_the_prices(self):
+        prices = dict(self.coordinator.data)
+        self.server.errors.append(503)
+
+        series = await self.coordinator.fetch_prices(
+            datetime(2024, 10, 7, tzinfo=timezone.utc),
+            datetime(2024, 10, 8, tzinfo=timezone.utc),
+        )
+
+        self.assertIsNone(series)
+        self.assertEqual(self.coordinator.data, prices)
+
+
+if __name__ == "__main__":
+    unittest.main()
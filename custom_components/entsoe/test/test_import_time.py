@@ -0,0 +1,74 @@
+import unittest
+
+import sys
+import os
+
+import json
+import subprocess
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+
+# share of the import time of the preloaded Home Assistant modules the integration may
+# add, relative so the bound holds on slow or busy machines (locally about 0.02)
+IMPORT_TIME_RATIO = 0.1
+
+# modules Home Assistant has already loaded by the time the integration is imported
+PRELOADED = [
+    "aiohttp",
+    "homeassistant.components.sensor",
+    "homeassistant.config_entries",
+    "homeassistant.helpers.config_validation",
+    "homeassistant.helpers.entity_platform",
+    "homeassistant.helpers.selector",
+    "homeassistant.helpers.template",
+    "homeassistant.helpers.update_coordinator",
+]
+
+MEASURE = f"""
+import json, sys, time
+start = time.perf_counter()
+{"; ".join(f"import {module}" for module in PRELOADED)}
+preloaded = time.perf_counter() - start
+before = set(sys.modules)
+start = time.perf_counter()
+import custom_components.entsoe
+import custom_components.entsoe.config_flow
+import custom_components.entsoe.sensor
+duration = time.perf_counter() - start
+print(json.dumps({{
+    "duration": duration,
+    "preloaded": preloaded,
+    "modules": sorted(set(sys.modules) - before),
+}}))
+"""
+
+
+class TestImportTime(unittest.TestCase):
+    def measure(self) -> dict:
+        output = subprocess.run(
+            [sys.executable, "-c", MEASURE],
+            cwd=ROOT,
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout
+        return json.loads(output.splitlines()[-1])
+
+    def test_import_time_budget(self):
+        # take the best of a few runs to be robust against a busy machine
+        ratio = min(
+            measured["duration"] / measured["preloaded"]
+            for measured in (self.measure() for _ in range(3))
+        )
+
+        self.assertLess(ratio, IMPORT_TIME_RATIO)
+
+    def test_no_heavy_dependencies(self):
+        modules = self.measure()["modules"]
+
+        for module in ("pytz", "requests", "xml.etree.ElementTree"):
+            self.assertNotIn(module, modules)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,182 @@
+import unittest
+
+import sys
+import os
+
+sys.path.append(os.path.abspath(".."))
+
+import asyncio
+import statistics
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from homeassistant.core import HomeAssistant
+
+from api_client import EXECUTOR_PARSE_SIZE, EntsoeClient, EntsoeException, FetchRecord
+from coordinator import EntsoeCoordinator
+from fake_entsoe import FakeEntsoeServer
+from response_recorder import MODE_REPLAY, ResponseRecorder
+
+START = datetime(2024, 10, 7, tzinfo=timezone.utc)
+END = datetime(2024, 10, 8, tzinfo=timezone.utc)
+
+ENTRIES = 40
+CALLS_PER_ENTRY = 5
+AREAS = ["NL", "BE", "DE", "FR", "AT", "DK_1", "NO_2", "SE_3"]
+
+
+class TestFakeServer(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.server = FakeEntsoeServer()
+        self.url = await self.server.start()
+
+    async def asyncTearDown(self) -> None:
+        await self.server.stop()
+
+    async def test_query(self):
+        client = EntsoeClient("fake-key", api_urls=[self.url])
+        prices = await client.query_day_ahead_prices("NL", START, END)
+
+        self.assertEqual(len(prices), 24)
+        self.assertEqual(min(prices), START)
+        self.assertEqual(self.server.requests_sent, 1)
+
+    async def test_large_document_parsed_in_executor(self):
+        fetch_log = []
+        client = EntsoeClient("fake-key", api_urls=[self.url], fetch_log=fetch_log)
+        start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        end = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+        prices = await client.query_day_ahead_prices("NL", start, end)
+
+        self.assertGreater(fetch_log[0].bytes, EXECUTOR_PARSE_SIZE)
+        self.assertEqual(len(prices), 366 * 24)
+        self.assertIsNotNone(fetch_log[0].parse_duration)
+
+    async def test_fallback_to_next_endpoint(self):
+        self.server.errors.extend([503])
+        fetch_log = []
+        client = EntsoeClient(
+            "fake-key", api_urls=[self.url, self.url], fetch_log=fetch_log
+        )
+        prices = await client.query_day_ahead_prices("BE", START, END)
+
+        self.assertEqual(len(prices), 24)
+        self.assertEqual(self.server.requests_sent, 2)
+        self.assertEqual(fetch_log[0].status, 200)
+        self.assertNotIn("securityToken", fetch_log[0].params)
+
+    async def test_rate_limited(self):
+        self.server.errors.extend([429, 429])
+        client = EntsoeClient("fake-key", api_urls=[self.url, self.url])
+
+        with self.assertRaises(EntsoeException):
+            await client.query_day_ahead_prices("BE", START, END)
+
+    async def test_unauthorized(self):
+        record_log = []
+        client = EntsoeClient("wrong-key", api_urls=[self.url], fetch_log=record_log)
+
+        with self.assertRaises(EntsoeException):
+            await client.query_day_ahead_prices("NL", START, END)
+        self.assertIsInstance(record_log[0], FetchRecord)
+        self.assertEqual(record_log[0].status, 401)
+
+    async def test_hanging_connection(self):
+        self.server.hang = True
+        client = EntsoeClient("fake-key", api_urls=[self.url])
+
+        with self.assertRaises(asyncio.TimeoutError):
+            await asyncio.wait_for(
+                client.query_day_ahead_prices("NL", START, END), timeout=0.2
+            )
+
+    async def test_quarterly_resolution(self):
+        self.server.resolution = "PT15M"
+        client = EntsoeClient("fake-key", period="PT15M", api_urls=[self.url])
+        prices = await client.query_day_ahead_prices("DE_LU", START, END)
+
+        self.assertEqual(len(prices), 96)
+
+    async def test_record_and_replay(self):
+        with tempfile.TemporaryDirectory() as directory:
+            client = EntsoeClient(
+                "fake-key", api_urls=[self.url], recorder=ResponseRecorder(directory)
+            )
+            recorded = await client.query_day_ahead_prices("NL", START, END)
+            files = sorted(os.listdir(directory))
+            self.assertEqual(len(files), 2)
+            with open(os.path.join(directory, files[0])) as f:
+                self.assertNotIn("fake-key", f.read())
+
+            await self.server.stop()
+            replay_client = EntsoeClient(
+                "fake-key",
+                api_urls=[self.url],
+                recorder=ResponseRecorder(directory, mode=MODE_REPLAY),
+            )
+            replayed = await replay_client.query_day_ahead_prices("NL", START, END)
+
+            self.assertDictEqual(replayed, recorded)
+            self.assertEqual(self.server.requests_sent, 1)
+            with self.assertRaises(EntsoeException):
+                await replay_client.query_day_ahead_prices("BE", START, END)
+
+
+class TestConcurrentLoad(unittest.IsolatedAsyncioTestCase):
+    """Simulate many config entries calling get_energy_prices at the same time."""
+
+    async def asyncSetUp(self) -> None:
+        self.server = FakeEntsoeServer(latency=0.02)
+        self.url = await self.server.start()
+        # the prices are archived in the storage directory of the configuration
+        self.directory = tempfile.TemporaryDirectory()
+        self.hass = HomeAssistant(self.directory.name)
+
+    async def asyncTearDown(self) -> None:
+        await self.hass.async_stop(force=True)
+        await self.server.stop()
+        self.directory.cleanup()
+
+    async def test_concurrent_get_energy_prices(self):
+        coordinators = [
+            EntsoeCoordinator(
+                self.hass,
+                api_key="fake-key",
+                area=AREAS[i % len(AREAS)],
+                period="PT60M",
+                energy_scale="kWh",
+                modifyer="{{current_price}}",
+                api_urls=[self.url],
+            )
+            for i in range(ENTRIES)
+        ]
+        latencies = []
+
+        async def call(coordinator):
+            call_start = time.perf_counter()
+            prices = await coordinator.get_energy_prices(START, END)
+            latencies.append(time.perf_counter() - call_start)
+            return prices
+
+        results = await asyncio.gather(
+            *(call(c) for c in coordinators for _ in range(CALLS_PER_ENTRY))
+        )
+
+        percentiles = statistics.quantiles(latencies, n=100)
+        print(
+            f"\n{len(results)} get_energy_prices calls over {ENTRIES} entries: "
+            f"{self.server.requests_sent} requests sent, "
+            f"p50={percentiles[49] * 1000:.1f}ms "
+            f"p90={percentiles[89] * 1000:.1f}ms "
+            f"p99={percentiles[98] * 1000:.1f}ms"
+        )
+        # the day of the end is included
+        self.assertTrue(all(len(prices) == 48 for prices in results))
+        # the entries of an area share its archive and fill the range once, in one chunk
+        self.assertEqual(self.server.requests_sent, len(AREAS))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,181 @@
+import unittest
+
+import sys
+import os
+
+sys.path.append(os.path.abspath(".."))
+
+from datetime import datetime, timedelta, timezone
+from itertools import combinations, product
+
+from planner import battery_schedule, battery_step, cheapest_window, plan
+
+HOUR = timedelta(hours=1)
+START = datetime(2024, 10, 7, tzinfo=timezone.utc)
+PRICES = [0.30, 0.12, 0.25, 0.08, 0.09, 0.31, 0.10, 0.22, 0.05, 0.40, 0.11, 0.07]
+
+
+class TestPlanner(unittest.TestCase):
+    def setUp(self):
+        self.prices = {
+            START + index * HOUR: price for index, price in enumerate(PRICES)
+        }
+
+    def test_cheapest_slots_match_brute_force(self):
+        for count in range(1, 6):
+            result = plan(self.prices, count, HOUR, START, START + 12 * HOUR)
+            best = min(combinations(PRICES, count), key=sum)
+            self.assertAlmostEqual(
+                result["average_price"], round(sum(best) / count, 5)
+            )
+            timestamps = [slot["timestamp"] for slot in result["slots"]]
+            self.assertEqual(timestamps, sorted(timestamps))
+
+    def test_contiguous_window(self):
+        result = plan(
+            self.prices, 2, HOUR, START, START + 12 * HOUR, contiguous=True
+        )
+
+        self.assertEqual(result["start"], (START + 3 * HOUR).isoformat())
+        self.assertEqual(result["end"], (START + 5 * HOUR).isoformat())
+
+    def test_start_and_deadline(self):
+        # the 0.05 slot at 08:00 ends after the deadline
+        result = plan(
+            self.prices, 1, HOUR, START + timedelta(minutes=30), START + 8 * HOUR
+        )
+
+        self.assertEqual(
+            result["slots"],
+            [{"timestamp": (START + 3 * HOUR).isoformat(), "price": 0.08}],
+        )
+        self.assertIsNone(
+            plan(self.prices, 9, HOUR, START + 4 * HOUR, START + 12 * HOUR)
+        )
+
+    def test_profile_weights_the_window(self):
+        # a high second slot favours the 0.22, 0.05 pair over the 0.08, 0.09 pair
+        result = plan(
+            self.prices, 2, HOUR, START, START + 12 * HOUR, profile=[0.5, 3.0]
+        )
+
+        self.assertEqual(result["start"], (START + 7 * HOUR).isoformat())
+        self.assertEqual(result["energy"], 3.5)
+        self.assertEqual(result["cost"], round(0.5 * 0.22 + 3.0 * 0.05, 5))
+        self.assertEqual([slot["power"] for slot in result["slots"]], [0.5, 3.0])
+
+        # and the last power holds for the remaining slots
+        result = plan(self.prices, 3, HOUR, START, START + 12 * HOUR, profile=[1.0])
+        self.assertEqual(result["energy"], 3.0)
+
+    def test_windows_do_not_span_gaps(self):
+        slots = [(START, 0.1), (START + 2 * HOUR, 0.1), (START + 3 * HOUR, 0.5)]
+
+        self.assertEqual(cheapest_window(slots, 2, HOUR), slots[1:])
+        self.assertIsNone(cheapest_window(slots, 3, HOUR))
+
+
+class TestBatterySchedule(unittest.TestCase):
+    def brute_force(self, prices, levels, max_up, max_down, level, loss):
+        best = 0.0
+        for deltas in product(range(-max_down, max_up + 1), repeat=len(prices)):
+            profit, current = 0.0, level
+            for price, delta in zip(prices, deltas):
+                current += delta
+                if not 0 <= current <= levels:
+                    break
+                profit += -price * delta / loss if delta > 0 else -price * delta * loss
+            else:
+                best = max(best, profit)
+        return best
+
+    def test_matches_brute_force(self):
+        prices = [0.20, 0.05, 0.30, 0.10, 0.35]
+        slots = [(START + index * HOUR, price) for index, price in enumerate(prices)]
+
+        for state_of_charge in (0, 50, 100):
+            # at the grid side, 2 and 1 steps of the battery after the losses of 0.9
+            result = battery_schedule(
+                slots, HOUR, 4.0, 2.0 / 0.9, 0.9, 0.81, state_of_charge, levels=4
+            )
+            expected = self.brute_force(prices, 4, 2, 1, state_of_charge // 25, 0.9)
+            self.assertAlmostEqual(result["profit"], round(expected, 5))
+
+    def test_schedule(self):
+        slots = [(START, 0.30), (START + HOUR, 0.05), (START + 2 * HOUR, 0.30)]
+
+        result = battery_schedule(slots, HOUR, 10.0, 5.0, 5.0, 1.0, 0)
+
+        self.assertEqual(
+            [slot["action"] for slot in result["slots"]],
+            ["idle", "charge", "discharge"],
+        )
+        self.assertEqual(result["slots"][1]["power"], 5.0)
+        self.assertEqual(result["slots"][1]["state_of_charge"], 50.0)
+        self.assertEqual(result["slots"][2]["power"], -5.0)
+        self.assertAlmostEqual(result["profit"], 5 * 0.25)
+
+    def test_limits_at_the_grid(self):
+        slots = [(START, 0.05), (START + HOUR, 0.30), (START + 2 * HOUR, 0.31)]
+
+        result = battery_schedule(slots, HOUR, 10.0, 3.0, 2.0, 0.81, 0)
+
+        charge, first, second = result["slots"]
+        self.assertEqual(charge["power"], 3.0)
+        # 3 kWh from the grid is 2.7 kWh in the battery
+        self.assertEqual(charge["state_of_charge"], 27.0)
+        # 22 steps of 0.1 kWh, 1.98 kW at the grid, are sold at the highest price
+        self.assertLessEqual(-2.0, second["power"])
+        self.assertLessEqual(second["power"], -2.0 * (1 - 0.02))
+        self.assertEqual(second["state_of_charge"], 0.0)
+        self.assertAlmostEqual(
+            result["profit"],
+            -3.0 * 0.05 - first["power"] * 0.30 - second["power"] * 0.31,
+            places=2,
+        )
+
+    def test_small_charge_power(self):
+        quarter = timedelta(minutes=15)
+        slots = [
+            (START + index * quarter, price)
+            for index, price in enumerate([0.05] * 4 + [0.30] * 4)
+        ]
+
+        # 0.15 kW charges 0.0375 kWh per slot, below 1/50 of the capacity
+        result = battery_schedule(slots, quarter, 10.0, 0.15, 0.15, 1.0, 0)
+
+        self.assertEqual(
+            [slot["power"] for slot in result["slots"]], [0.15] * 4 + [-0.15] * 4
+        )
+        self.assertAlmostEqual(result["profit"], 0.15 * 4 * 0.25 / 4)
+
+    def test_limits_are_whole_steps(self):
+        for capacity, limits in ((10.0, (2.9, 1.0)), (10.0, (0.0375, 5.0))):
+            step = battery_step(capacity, limits)
+            self.assertLessEqual(step, capacity / 50)
+            for limit in limits:
+                self.assertGreaterEqual(int(limit / step + 1e-9), 1)
+                self.assertLessEqual(
+                    limit - int(limit / step + 1e-9) * step, 0.02 * limit
+                )
+
+    def test_prices_per_mwh(self):
+        slots = [(START, 50.0), (START + HOUR, 300.0)]
+
+        result = battery_schedule(slots, HOUR, 10.0, 5.0, 5.0, 1.0, 0, unit_kwh=1000)
+
+        self.assertAlmostEqual(result["profit"], 5 * 0.25)
+
+    def test_no_arbitrage_below_the_losses(self):
+        slots = [(START, 0.10), (START + HOUR, 0.11)]
+
+        result = battery_schedule(slots, HOUR, 10.0, 5.0, 5.0, 0.8, 0)
+
+        self.assertEqual(
+            [slot["action"] for slot in result["slots"]], ["idle", "idle"]
+        )
+        self.assertEqual(result["profit"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,154 @@
+import unittest
+
+import sys
+import os
+
+sys.path.append(os.path.abspath(".."))
+
+import tempfile
+from array import array
+
+from price_archive import RECORD, PriceArchive, open_archive, release_archive
+from price_series import PriceSegment, PriceSeries
+
+DAY = 1440
+# 2024-01-01T00:00Z in epoch minutes
+START = 28401120
+
+
+def day_series(day: int, resolution: int = 60, days: int = 1) -> PriceSeries:
+    count = days * DAY // resolution
+    return PriceSeries(
+        [
+            PriceSegment(
+                START + day * DAY,
+                resolution,
+                array("d", (float(day * 100 + index) for index in range(count))),
+                START + (day + days) * DAY,
+            )
+        ]
+    )
+
+
+class TestPriceArchive(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.archive = PriceArchive(os.path.join(self.directory.name, "NL.prices"))
+
+    def tearDown(self) -> None:
+        self.archive.close()
+        self.directory.cleanup()
+
+    def test_empty(self):
+        self.assertEqual(len(self.archive), 0)
+        self.assertEqual(self.archive.read(START, START + DAY), [])
+        self.assertEqual(
+            self.archive.missing_days(START, START + 2 * DAY),
+            [(START, START + 2 * DAY)],
+        )
+
+    def test_append_and_read(self):
+        self.archive.add(day_series(0))
+        self.archive.add(day_series(1, resolution=15))
+
+        self.assertEqual(len(self.archive), 24 + 96)
+        records = self.archive.read(START + 23 * 60 + 30, START + DAY + 30)
+        self.assertEqual([minute - START for minute, _, _ in records], [1380, 1440, 1455])
+        self.assertEqual(records[0], (START + 1380, 60, 23.0))
+
+        series = self.archive.series(START, START + 2 * DAY)
+        self.assertEqual(
+            [(segment.resolution, len(segment.prices)) for segment in series.segments],
+            [(60, 24), (15, 96)],
+        )
+        self.assertEqual(len(series.prices(60)), 48)
+
+    def test_missing_days(self):
+        self.archive.add(day_series(0))
+        self.archive.add(day_series(2))
+
+        self.assertEqual(
+            self.archive.missing_days(START, START + 5 * DAY),
+            [(START + DAY, START + 2 * DAY), (START + 3 * DAY, START + 5 * DAY)],
+        )
+
+    def test_insert_before_and_replace(self):
+        self.archive.add(day_series(2))
+        self.archive.add(day_series(0, days=3))
+
+        records = self.archive.read(START, START + 3 * DAY)
+        self.assertEqual(len(records), 72)
+        self.assertEqual(
+            [minute for minute, _, _ in records],
+            sorted(minute for minute, _, _ in records),
+        )
+        # the later add replaced the prices of day 2
+        self.assertEqual(records[48][2], 48.0)
+        self.assertEqual(self.archive.missing_days(START, START + 3 * DAY), [])
+
+    def test_daily_refresh_appended(self):
+        self.archive.add(day_series(0, days=2))
+        inode = os.stat(self.archive.path).st_ino
+
+        # yesterday and today archived already, only tomorrow is new
+        self.assertEqual(self.archive.add(day_series(0, days=3)), 24)
+        self.assertEqual(self.archive.add(day_series(0, days=3)), 0)
+
+        self.assertEqual(os.stat(self.archive.path).st_ino, inode)
+        self.assertEqual(len(self.archive), 72)
+        self.assertEqual(self.archive.missing_days(START, START + 3 * DAY), [])
+
+    def test_changed_price_rewritten(self):
+        self.archive.add(day_series(0, days=2))
+        series = day_series(0, days=3)
+        series.segments[0].prices[30] = -1.0
+
+        self.assertEqual(self.archive.add(series), 25)
+
+        records = self.archive.read(START, START + 3 * DAY)
+        self.assertEqual(len(records), 72)
+        self.assertEqual(records[30][2], -1.0)
+        self.assertEqual(records[31][2], 31.0)
+
+    def test_padded_to_period_end(self):
+        series = PriceSeries([PriceSegment(START, 60, array("d", [1.0, 2.0]), START + DAY)])
+        self.archive.add(series)
+
+        self.assertEqual(len(self.archive), 24)
+        self.assertEqual(self.archive.read(START + DAY - 60, START + DAY)[0][2], 2.0)
+
+    def test_partial_record_dropped(self):
+        self.archive.add(day_series(0))
+        self.archive.close()
+        # an append interrupted after 7 bytes
+        with open(self.archive.path, "ab") as file:
+            file.write(RECORD.pack(START + DAY, 60, 1.0)[:7])
+
+        self.assertEqual(len(self.archive), 24)
+        self.assertEqual(os.path.getsize(self.archive.path), 24 * RECORD.size)
+        self.archive.add(day_series(1))
+        self.archive.add(day_series(0, resolution=15))
+
+        records = self.archive.read(START, START + 2 * DAY)
+        self.assertEqual(len(records), 96 + 24)
+        self.assertEqual(records[-1], (START + DAY + 23 * 60, 60, 123.0))
+        self.assertEqual(self.archive.missing_days(START, START + 2 * DAY), [])
+
+    def test_shared_until_released(self):
+        path = os.path.join(self.directory.name, "BE.prices")
+        archive = open_archive(path)
+        self.assertIs(open_archive(path), archive)
+        archive.add(day_series(0))
+        self.assertEqual(len(archive), 24)
+
+        release_archive(archive)
+        self.assertIsNotNone(archive._mmap)
+        release_archive(archive)
+        self.assertIsNone(archive._mmap)
+        reopened = open_archive(path)
+        self.assertIsNot(reopened, archive)
+        release_archive(reopened)
+
+
+if __name__ == "__main__":
+    unittest.main()
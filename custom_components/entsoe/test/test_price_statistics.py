@@ -0,0 +1,103 @@
+import unittest
+
+import sys
+import os
+
+sys.path.append(os.path.abspath(".."))
+
+from datetime import datetime, timedelta, timezone
+
+import numpy
+from homeassistant.util import dt
+
+from price_statistics import percentile, price_statistics
+
+CET = timezone(timedelta(hours=1))
+
+
+class TestPriceStatistics(unittest.TestCase):
+    def setUp(self):
+        # the days are those of the timezone of HA
+        dt.set_default_time_zone(CET)
+        self.addCleanup(dt.set_default_time_zone, timezone.utc)
+        # two weeks of hourly prices, a monday to a sunday
+        start = datetime(2024, 1, 1, tzinfo=CET)
+        self.prices = {
+            start + timedelta(hours=hour): float((hour * 7) % 24 + hour // 24)
+            for hour in range(14 * 24)
+        }
+
+    def test_percentile_matches_numpy(self):
+        values = sorted(self.prices.values())
+        for q in (0, 10, 25, 50, 90, 99.5, 100):
+            self.assertAlmostEqual(percentile(values, q), numpy.percentile(values, q))
+
+    def test_per_day(self):
+        statistics = price_statistics(self.prices, "day", (50,), slots=2)
+
+        self.assertEqual(len(statistics["periods"]), 14)
+        first = statistics["periods"][0]
+        self.assertEqual(first["start"], "2024-01-01")
+        self.assertEqual((first["min"], first["max"]), (0.0, 23.0))
+        self.assertEqual(first["mean"], 11.5)
+        self.assertEqual(first["percentiles"], {"p50": 11.5})
+        self.assertEqual(
+            [slot["price"] for slot in first["cheapest"]], [0.0, 1.0]
+        )
+        self.assertEqual(
+            [slot["price"] for slot in first["most_expensive"]], [23.0, 22.0]
+        )
+        self.assertEqual(
+            first["cheapest"][0]["timestamp"], "2024-01-01T00:00:00+01:00"
+        )
+
+    def test_without_slots(self):
+        first = price_statistics(self.prices, "day", slots=0)["periods"][0]
+
+        self.assertEqual(first["cheapest"], [])
+        self.assertEqual(first["most_expensive"], [])
+
+    def test_days_of_the_ha_timezone(self):
+        dt.set_default_time_zone(timezone.utc)
+        statistics = price_statistics(self.prices, "day")
+
+        # midnight CET is 23:00 UTC of the day before
+        self.assertEqual(len(statistics["periods"]), 15)
+        self.assertEqual(statistics["periods"][0]["start"], "2023-12-31")
+        self.assertEqual(statistics["periods"][0]["max"], 0.0)
+        self.assertEqual(statistics["periods"][-1]["start"], "2024-01-14")
+
+        # and so are the hours, 00:00 CET is hour 23 of the day before
+        profile = statistics["hour_profile"]
+        self.assertEqual(profile[23]["min"], 0.0)
+        self.assertEqual(profile[0]["min"], 7.0)
+
+    def test_per_week(self):
+        statistics = price_statistics(self.prices, "week")
+
+        self.assertEqual(
+            [period["start"] for period in statistics["periods"]],
+            ["2024-01-01", "2024-01-08"],
+        )
+        self.assertEqual(statistics["periods"][1]["max"], 23.0 + 13)
+        self.assertEqual(
+            list(statistics["periods"][0]["percentiles"]), ["p10", "p50", "p90"]
+        )
+
+    def test_hour_profile(self):
+        profile = price_statistics(self.prices)["hour_profile"]
+
+        self.assertEqual([hour["hour"] for hour in profile], list(range(24)))
+        self.assertEqual(profile[0]["min"], 0.0)
+        self.assertEqual(profile[0]["max"], 13.0)
+        self.assertEqual(profile[0]["mean"], 6.5)
+
+    def test_empty(self):
+        self.assertEqual(
+            price_statistics({}),
+            {"group": "day", "periods": [], "hour_profile": []},
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
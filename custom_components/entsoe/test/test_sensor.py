@@ -0,0 +1,238 @@
+import unittest
+
+import sys
+import os
+
+sys.path.append(os.path.abspath(".."))
+
+import tempfile
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from homeassistant.components.sensor import SensorExtraStoredData
+from homeassistant.core import HomeAssistant
+from homeassistant.util import dt
+
+from coordinator import EntsoeCoordinator
+from fake_entsoe import FakeEntsoeServer
+from sensor import CostExtraStoredData, EntsoeCostSensor, cost_description
+
+METER = "sensor.energy_meter"
+KWH = {"unit_of_measurement": "kWh"}
+
+
+class TestCostExtraStoredData(unittest.TestCase):
+    def test_round_trip(self):
+        meter_time = dt.utcnow().replace(microsecond=0)
+        data = CostExtraStoredData(1.25, "EUR", 10.5, meter_time)
+
+        restored = CostExtraStoredData.from_dict(data.as_dict())
+
+        self.assertEqual(restored.native_value, 1.25)
+        self.assertEqual(restored.native_unit_of_measurement, "EUR")
+        self.assertEqual(restored.meter_reading, 10.5)
+        self.assertEqual(restored.meter_time, meter_time)
+
+    def test_pending_energy_round_trip(self):
+        slot = dt.utcnow().replace(minute=0, second=0, microsecond=0)
+        data = CostExtraStoredData(0.0, "EUR", 1.0, slot, {slot: 0.75})
+
+        restored = CostExtraStoredData.from_dict(data.as_dict())
+
+        self.assertEqual(restored.pending_energy, {slot: 0.75})
+
+    def test_without_reading(self):
+        restored = CostExtraStoredData.from_dict(
+            CostExtraStoredData(0.0, "EUR").as_dict()
+        )
+
+        self.assertIsNone(restored.meter_reading)
+        self.assertIsNone(restored.meter_time)
+        self.assertEqual(restored.pending_energy, {})
+
+
+class TestCostSensor(unittest.IsolatedAsyncioTestCase):
+    """The cost sensor of an entry against the fake ENTSO-e server."""
+
+    async def asyncSetUp(self) -> None:
+        self.server = FakeEntsoeServer()
+        url = await self.server.start()
+        self.directory = tempfile.TemporaryDirectory()
+        self.hass = HomeAssistant(self.directory.name)
+        self.coordinator = EntsoeCoordinator(
+            self.hass,
+            api_key="fake-key",
+            area="NL",
+            period="PT60M",
+            energy_scale="kWh",
+            modifyer="{{current_price}}",
+            api_urls=[url],
+            energy_meter=METER,
+        )
+        self.coordinator.config_entry = SimpleNamespace(
+            entry_id="cost", pref_disable_polling=True
+        )
+        await self.coordinator.async_refresh()
+
+        self.sensor = EntsoeCostSensor(self.coordinator, cost_description("EUR"))
+        self.sensor.hass = self.hass
+        # the state machine is not under test, only what would be written
+        write = patch.object(EntsoeCostSensor, "async_write_ha_state")
+        self.writes = write.start()
+        self.addCleanup(write.stop)
+
+    async def asyncTearDown(self) -> None:
+        self.coordinator.release_archive()
+        await self.hass.async_stop(force=True)
+        await self.server.stop()
+        self.directory.cleanup()
+
+    async def add_sensor(self, restored: SensorExtraStoredData | None = None):
+        with patch.object(
+            EntsoeCostSensor, "async_get_last_extra_data", return_value=restored
+        ):
+            await self.sensor.async_added_to_hass()
+
+    async def set_meter(self, value, attributes=KWH):
+        self.hass.states.async_set(METER, value, attributes)
+        await self.hass.async_block_till_done()
+        return self.hass.states.get(METER)
+
+    async def test_downtime_charged_after_restore(self):
+        meter_time = self.coordinator.current_bucket_time - timedelta(hours=3)
+        await self.add_sensor(CostExtraStoredData(2.0, "EUR", 10.0, meter_time))
+
+        self.assertEqual(self.sensor.native_value, 2.0)
+        state = await self.set_meter("12.5")
+
+        self.assertGreater(self.sensor.native_value, 2.0)
+        self.assertAlmostEqual(
+            self.sensor.native_value,
+            2.0 + self.coordinator.get_cost(2.5, meter_time, state.last_updated),
+        )
+        self.assertEqual(self.sensor.extra_restore_state_data.meter_reading, 12.5)
+        self.assertEqual(
+            self.sensor.extra_restore_state_data.meter_time, state.last_updated
+        )
+        self.writes.assert_called_once()
+
+    async def test_first_reading_is_the_start(self):
+        await self.set_meter("100")
+        await self.add_sensor()
+
+        self.assertEqual(self.sensor.native_value, 0.0)
+        previous = self.hass.states.get(METER)
+        state = await self.set_meter("101")
+
+        self.assertAlmostEqual(
+            self.sensor.native_value,
+            self.coordinator.get_cost(1.0, previous.last_updated, state.last_updated),
+        )
+
+    async def test_decreasing_reading_is_a_reset(self):
+        await self.set_meter("50")
+        await self.add_sensor()
+        previous = self.hass.states.get(METER)
+
+        state = await self.set_meter("3")
+
+        # the meter counted 3 kWh since its reset
+        self.assertAlmostEqual(
+            self.sensor.native_value,
+            self.coordinator.get_cost(3.0, previous.last_updated, state.last_updated),
+        )
+        self.assertEqual(self.sensor.extra_restore_state_data.meter_reading, 3.0)
+
+    async def test_unit_change_is_no_consumption(self):
+        await self.set_meter("10")
+        await self.add_sensor()
+        previous = self.hass.states.get(METER)
+
+        state = await self.set_meter("10500", {"unit_of_measurement": "Wh"})
+
+        self.assertAlmostEqual(
+            self.sensor.native_value,
+            self.coordinator.get_cost(0.5, previous.last_updated, state.last_updated),
+        )
+        self.assertEqual(self.sensor.extra_restore_state_data.meter_reading, 10.5)
+
+    async def test_unknown_and_unavailable_ignored(self):
+        await self.set_meter("10")
+        await self.add_sensor()
+
+        await self.set_meter("unknown")
+        await self.set_meter("unavailable")
+        await self.set_meter("20", {"unit_of_measurement": "W"})
+
+        self.assertEqual(self.sensor.native_value, 0.0)
+        self.assertEqual(self.sensor.extra_restore_state_data.meter_reading, 10.0)
+        self.writes.assert_not_called()
+
+    async def test_readings_before_prices_charged_later(self):
+        await self.set_meter("10")
+        await self.add_sensor()
+        previous = self.hass.states.get(METER)
+        data, self.coordinator.data = self.coordinator.data, None
+
+        await self.set_meter("11")
+
+        self.assertEqual(self.sensor.native_value, 0.0)
+        self.assertEqual(self.sensor.extra_restore_state_data.meter_reading, 10.0)
+
+        self.coordinator.data = data
+        state = await self.set_meter("12")
+
+        # the energy since the last charged reading is charged at once
+        self.assertAlmostEqual(
+            self.sensor.native_value,
+            self.coordinator.get_cost(2.0, previous.last_updated, state.last_updated),
+        )
+
+    async def test_slots_without_price_charged_once_priced(self):
+        await self.set_meter("10")
+        await self.add_sensor()
+        previous = self.hass.states.get(METER)
+        hour = timedelta(hours=1)
+        current = self.coordinator.current_bucket_time
+        missing = {
+            slot: self.coordinator.data.pop(slot) for slot in (current, current + hour)
+        }
+
+        await self.set_meter("12")
+
+        self.assertEqual(self.sensor.native_value, 0.0)
+        self.assertEqual(self.sensor.extra_state_attributes["unpriced_energy"], 2.0)
+        self.assertEqual(self.sensor.extra_restore_state_data.meter_reading, 12.0)
+        self.assertAlmostEqual(
+            sum(self.sensor.extra_restore_state_data.pending_energy.values()), 2.0
+        )
+
+        self.coordinator.data.update(missing)
+        state = await self.set_meter("12.0")
+
+        # no energy was consumed since, the pending energy is charged at its prices
+        self.assertAlmostEqual(
+            self.sensor.native_value,
+            self.coordinator.get_cost(2.0, previous.last_updated, state.last_updated),
+        )
+        self.assertGreater(self.sensor.native_value, 0.0)
+        self.assertEqual(self.sensor.extra_state_attributes["unpriced_energy"], 0.0)
+
+    async def test_pending_energy_restored(self):
+        slot = self.coordinator.current_bucket_time
+        meter_time = slot + timedelta(minutes=1)
+        await self.add_sensor(
+            CostExtraStoredData(1.0, "EUR", 10.0, meter_time, {slot: 0.5})
+        )
+
+        await self.set_meter("10")
+
+        self.assertAlmostEqual(
+            self.sensor.native_value, 1.0 + 0.5 * self.coordinator.data[slot]
+        )
+        self.assertEqual(self.sensor.extra_restore_state_data.pending_energy, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+import unittest
+
+import sys
+import os
+
+sys.path.append(os.path.abspath(".."))
+
+import asyncio
+
+from services import ResponseCache
+
+
+class TestResponseCache(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.cache = ResponseCache(ttl=10)
+        self.computed = 0
+
+    async def compute(self, response=None):
+        self.computed += 1
+        await asyncio.sleep(0.01)
+        return response or {"prices": [self.computed]}
+
+    async def test_concurrent_calls_share_one_computation(self):
+        responses = await asyncio.gather(
+            *(self.cache.get("key", self.compute) for _ in range(10))
+        )
+
+        self.assertEqual(self.computed, 1)
+        self.assertTrue(all(response is responses[0] for response in responses))
+        self.assertEqual(self.cache.info, {"hits": 9, "misses": 1, "size": 1})
+
+        # and a burst right after the response gets the same one
+        self.assertIs(await self.cache.get("key", self.compute), responses[0])
+        self.assertEqual(self.computed, 1)
+
+    async def test_expired_and_other_keys_are_computed(self):
+        await self.cache.get("key", self.compute)
+        await self.cache.get("other", self.compute)
+        self.assertEqual(self.computed, 2)
+
+        cache = ResponseCache(ttl=0)
+        await cache.get("key", self.compute)
+        await cache.get("key", self.compute)
+        self.assertEqual(self.computed, 4)
+        self.assertEqual(len(cache), 1)
+
+    async def test_failures_are_not_kept(self):
+        async def fail():
+            raise ValueError("failed")
+
+        with self.assertRaises(ValueError):
+            await self.cache.get("key", fail)
+        await self.cache.get("key", lambda: self.compute({"prices": [], "errors": [1]}))
+        await self.cache.get("key", self.compute)
+
+        self.assertEqual(self.computed, 2)
+        self.assertEqual(self.cache.info["misses"], 3)
+
+    async def test_cancelled_caller_does_not_cancel_the_others(self):
+        first = asyncio.ensure_future(self.cache.get("key", self.compute))
+        second = asyncio.ensure_future(self.cache.get("key", self.compute))
+        await asyncio.sleep(0)
+        first.cancel()
+
+        self.assertEqual(await second, {"prices": [1]})
+
+
+if __name__ == "__main__":
+    unittest.main()
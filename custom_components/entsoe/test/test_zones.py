@@ -0,0 +1,123 @@
+import unittest
+
+import sys
+import os
+
+sys.path.append(os.path.abspath(".."))
+
+import math
+import tempfile
+from array import array
+from datetime import datetime, timedelta, timezone
+
+from homeassistant.core import HomeAssistant
+
+from fake_entsoe import FakeEntsoeServer
+from price_series import PriceSegment, PriceSeries
+from zones import EntsoeZonesCoordinator, align
+
+
+class TestAlign(unittest.TestCase):
+    def test_buffers_share_one_axis(self):
+        hourly = PriceSeries([PriceSegment(0, 60, array("d", [10.0, 20.0]), 120)])
+        quarterly = PriceSeries(
+            [PriceSegment(60, 15, array("d", [40.0, 40.0, 80.0, 80.0]), 120)]
+        )
+
+        prices = align({"NL": hourly, "BE": quarterly}, 60, 1)
+
+        self.assertEqual((prices.start, prices.interval, len(prices)), (0, 60, 2))
+        self.assertEqual(prices.slot(0), {"NL": 10.0})
+        self.assertEqual(prices.slot(75), {"NL": 20.0, "BE": 60.0})
+        self.assertTrue(math.isnan(prices.prices["BE"][0]))
+        self.assertEqual(prices.slot(120), {})
+
+
+class TestZonesCoordinator(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.server = FakeEntsoeServer()
+        self.url = await self.server.start()
+        self.directory = tempfile.TemporaryDirectory()
+        self.hass = HomeAssistant(self.directory.name)
+        self.coordinator = EntsoeZonesCoordinator(
+            self.hass,
+            api_key="fake-key",
+            zones=["NL", "BE", "DE"],
+            period="PT60M",
+            api_urls=[self.url],
+        )
+
+    async def asyncTearDown(self) -> None:
+        await self.hass.async_stop(force=True)
+        await self.server.stop()
+        self.directory.cleanup()
+
+    async def test_zones_fetched_at_once(self):
+        await self.coordinator.async_refresh()
+
+        self.assertEqual(self.server.requests_sent, 3)
+        prices = self.coordinator.get_current_prices()
+        self.assertEqual(sorted(prices), ["BE", "DE", "NL"])
+        self.assertEqual(
+            self.coordinator.get_spread(),
+            round(max(prices.values()) - min(prices.values()), 5),
+        )
+        self.assertEqual(prices[self.coordinator.get_min_zone()], min(prices.values()))
+        self.assertEqual(prices[self.coordinator.get_max_zone()], max(prices.values()))
+
+        # all zones are known, the next refresh does not fetch
+        await self.coordinator.async_refresh()
+        self.assertEqual(self.server.requests_sent, 3)
+
+    async def test_failed_zone_is_left_out(self):
+        self.server.errors.append(503)
+
+        await self.coordinator.async_refresh()
+
+        self.assertTrue(self.coordinator.last_update_success)
+        self.assertEqual(len(self.coordinator.get_current_prices()), 2)
+        self.assertTrue(self.coordinator.check_update_needed(datetime.now(timezone.utc)))
+
+    async def test_stale_zone_fetched_again(self):
+        await self.coordinator.async_refresh()
+        now = datetime.now(timezone.utc)
+        self.assertFalse(self.coordinator.check_update_needed(now))
+
+        # BE failed after an earlier success and kept only the prices of yesterday
+        stale = self.coordinator.series["BE"]
+        self.coordinator.series["BE"] = PriceSeries(stale.segments[:1], stale.tz_name)
+
+        self.assertTrue(self.coordinator.check_update_needed(now))
+
+    async def test_fetch_on_the_jitter_of_the_entry(self):
+        jitter = self.coordinator.fetch_jitter
+        self.assertLessEqual(jitter, timedelta(seconds=300))
+
+        await self.coordinator.async_refresh()
+
+        # the next refresh is scheduled on the jitter after the next period boundary
+        next_fetch = datetime.now(timezone.utc) + self.coordinator.update_interval
+        self.assertLessEqual(
+            self.coordinator.update_interval, timedelta(hours=1, seconds=5)
+        )
+        self.assertAlmostEqual(
+            (next_fetch.replace(minute=0, second=0, microsecond=0) + jitter).timestamp(),
+            next_fetch.timestamp(),
+            delta=1,
+        )
+
+    async def test_jitter_follows_the_fetch_spread(self):
+        other = EntsoeZonesCoordinator(
+            self.hass,
+            api_key="fake-key",
+            zones=["FR", "ES"],
+            period="PT60M",
+            fetch_spread=0,
+        )
+
+        self.assertEqual(other.fetch_jitter, timedelta(0))
+        self.assertEqual(self.coordinator.fetch_jitter, self.coordinator.fetch_jitter)
+
+
+if __name__ == "__main__":
+    unittest.main()
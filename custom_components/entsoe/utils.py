@@ -1,14 +1,28 @@
+import calendar
 import re
-from datetime import timedelta
+import zlib
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from zoneinfo import ZoneInfo
 
+_MINUTE = timedelta(minutes=1)
+# a fetch due within this time is moved to the next period, so it does not run twice
+FETCH_TOLERANCE = timedelta(seconds=5)
+_DURATION = re.compile(r"P(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?)?")
 
+
+@lru_cache
 def get_interval_minutes(iso8601_interval: str) -> int:
     """
     Convert an ISO 8601 duration string to total minutes.
-    Example: 'PT15M' -> 15
+    Example: 'PT15M' -> 15, 'PT1H' -> 60, 'P1D' -> 1440
     """
 
-    return int(re.match(r"PT(\d+)M", iso8601_interval).group(1))
+    match = _DURATION.fullmatch(iso8601_interval)
+    if match is None or not any(match.groups()):
+        raise ValueError(f"Unsupported resolution {iso8601_interval}")
+    days, hours, minutes = (int(group or 0) for group in match.groups())
+    return days * 1440 + hours * 60 + minutes
 
 
 def bucket_time(ts, bucket_size):
@@ -20,3 +34,112 @@ def bucket_time(ts, bucket_size):
     return ts - timedelta(
         minutes=ts.minute % bucket_size, seconds=ts.second, microseconds=ts.microsecond
     )
+
+
+def fetch_jitter(seed: str, spread: int, minutes: int) -> timedelta:
+    """
+    Return the offset after each period boundary at which an entry fetches.
+
+    The offset is stable per seed and at most spread seconds, so the entries of
+    all installations do not hit the API at the same second.
+    """
+    spread = min(spread, minutes * 60 - 1)
+    if spread <= 0:
+        return timedelta(0)
+    return timedelta(seconds=zlib.crc32(seed.encode()) % (spread + 1))
+
+
+def next_fetch_delay(now: datetime, minutes: int, jitter: timedelta) -> timedelta:
+    """Return the time from now until the next period boundary plus the jitter."""
+    next_fetch = bucket_time(now, minutes) + jitter
+    while next_fetch <= now + FETCH_TOLERANCE:
+        next_fetch += timedelta(minutes=minutes)
+    return next_fetch - now
+
+
+def split_range(start, end, days: int):
+    """Split the range from start to end in consecutive ranges of at most days."""
+    while start < end:
+        chunk_end = min(start + timedelta(days=days), end)
+        yield start, chunk_end
+        start = chunk_end
+
+
+def parse_utc_minutes(timestamp: str) -> int:
+    """
+    Convert an ENTSO-e UTC timestamp to minutes since the unix epoch.
+    Example: '2024-10-05T22:00Z' -> 28800720
+    """
+    return (
+        calendar.timegm(
+            (
+                int(timestamp[0:4]),
+                int(timestamp[5:7]),
+                int(timestamp[8:10]),
+                int(timestamp[11:13]),
+                int(timestamp[14:16]),
+                0,
+            )
+        )
+        // 60
+    )
+
+
+class OffsetTable:
+    """
+    Convert epoch minutes into aware datetimes of a time zone.
+
+    The UTC offset is computed once per UTC day (including the exact minute of a
+    DST transition on that day) and every result shares one fixed-offset tzinfo
+    per distinct offset, so converting a series costs one datetime per slot.
+    """
+
+    def __init__(self, tz_name: str) -> None:
+        self._zone = ZoneInfo(tz_name)
+        # utc day -> (transition minute, offset before, offset after)
+        self._days: dict[int, tuple[int, int, int]] = {}
+        self._tzinfos: dict[int, timezone] = {}
+
+    def _utcoffset(self, minutes: int) -> int:
+        return datetime.fromtimestamp(minutes * 60, self._zone).utcoffset() // _MINUTE
+
+    def _compute_day(self, day: int) -> tuple[int, int, int]:
+        start = day * 1440
+        end = start + 1440
+        before = self._utcoffset(start)
+        after = self._utcoffset(end)
+        if before == after:
+            return end, before, before
+
+        # search the minute at which the offset changes
+        low, high = start, end
+        while high - low > 1:
+            middle = (low + high) // 2
+            if self._utcoffset(middle) == before:
+                low = middle
+            else:
+                high = middle
+        return high, before, after
+
+    def offset(self, minutes: int) -> int:
+        """Return the UTC offset in minutes at the given epoch minute."""
+        day = minutes // 1440
+        entry = self._days.get(day)
+        if entry is None:
+            entry = self._days[day] = self._compute_day(day)
+        transition, before, after = entry
+        return before if minutes < transition else after
+
+    def to_datetime(self, minutes: int) -> datetime:
+        """Return the aware local datetime of an epoch minute."""
+        offset = self.offset(minutes)
+        tzinfo = self._tzinfos.get(offset)
+        if tzinfo is None:
+            tzinfo = self._tzinfos[offset] = timezone(timedelta(minutes=offset))
+        return datetime.fromtimestamp(minutes * 60, tzinfo)
+
+
+@lru_cache
+def offset_table(tz_name: str) -> OffsetTable:
+    """Return the shared OffsetTable of a time zone."""
+    return OffsetTable(tz_name)
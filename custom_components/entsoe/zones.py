@@ -0,0 +1,219 @@
+"""Day-ahead prices of several bidding zones on one aligned time axis."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+from array import array
+from collections import deque
+from datetime import datetime, timedelta, timezone
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+from homeassistant.util import dt
+
+from .api_client import EntsoeClient, EntsoeUnauthorized
+from .const import (
+    AREA_INFO,
+    DEFAULT_CURRENCY,
+    DEFAULT_ENERGY_SCALE,
+    DEFAULT_FETCH_SPREAD,
+    ENERGY_SCALES,
+    FETCH_HISTORY_SIZE,
+)
+from .price_series import PriceSeries
+from .utils import bucket_time, fetch_jitter, get_interval_minutes, next_fetch_delay
+
+# seconds the fetch of a single zone may take
+ZONE_TIMEOUT = 10
+
+
+class ZonePrices:
+    """
+    The prices of every zone in buffers of equal length.
+
+    Index i of each buffer holds the price of the slot starting at epoch minute
+    start + i * interval, NaN where the zone has no price for the slot. A slot
+    is therefore looked up once for all zones, without comparing timestamps.
+    """
+
+    def __init__(self, start: int, interval: int, prices: dict[str, array]) -> None:
+        self.start = start
+        self.interval = interval
+        self.prices = prices
+
+    def __len__(self) -> int:
+        return len(next(iter(self.prices.values()), ()))
+
+    @property
+    def end(self) -> int:
+        """Epoch minute at which the last slot ends."""
+        return self.start + len(self) * self.interval
+
+    def slot(self, minute: int) -> dict[str, float]:
+        """Return the prices of the zones that have one for the slot of the minute."""
+        index = (minute - self.start) // self.interval
+        if not 0 <= index < len(self):
+            return {}
+        return {
+            zone: buffer[index]
+            for zone, buffer in self.prices.items()
+            if not math.isnan(buffer[index])
+        }
+
+
+def align(series: dict[str, PriceSeries], interval: int, scale: float) -> ZonePrices:
+    """Resample the series of the zones to one interval and align their buffers."""
+    views = {zone: zone_series.prices(interval) for zone, zone_series in series.items()}
+    minutes = [minute for view in views.values() for minute in view]
+    if not minutes:
+        return ZonePrices(0, interval, {zone: array("d") for zone in series})
+
+    start = min(minutes)
+    length = (max(minutes) - start) // interval + 1
+    prices = {}
+    for zone, view in views.items():
+        buffer = array("d", [math.nan]) * length
+        for minute, price in view.items():
+            buffer[(minute - start) // interval] = round(price / scale, 5)
+        prices[zone] = buffer
+    return ZonePrices(start, interval, prices)
+
+
+class EntsoeZonesCoordinator(DataUpdateCoordinator):
+    """Fetches the prices of several zones at once and compares them per slot."""
+
+    def __init__(
+            self,
+            hass: HomeAssistant,
+            api_key,
+            zones,
+            period,
+            energy_scale=DEFAULT_ENERGY_SCALE,
+            currency=DEFAULT_CURRENCY,
+            api_urls=None,
+            fetch_spread=DEFAULT_FETCH_SPREAD,
+    ) -> None:
+        self.api_key = api_key
+        self.zones = list(zones)
+        self.period = period
+        self.period_minutes = get_interval_minutes(period)
+        self.energy_scale = energy_scale
+        self.currency = currency
+        self.api_urls = api_urls
+        # seconds after each period boundary over which the fetches of entries are spread
+        self.fetch_spread = fetch_spread
+        # the last series of every zone, a zone that fails to fetch keeps its own
+        self.series: dict[str, PriceSeries] = {}
+        self.fetch_history = deque(maxlen=FETCH_HISTORY_SIZE)
+
+        super().__init__(
+            hass,
+            logging.getLogger(__name__),
+            name="ENTSO-e zones coordinator",
+            update_interval=timedelta(minutes=self.period_minutes),
+        )
+
+    # ENTSO: the offset after each period boundary at which this entry fetches, stable per entry
+    @property
+    def fetch_jitter(self) -> timedelta:
+        seed = self.config_entry.entry_id if self.config_entry else ",".join(self.zones)
+        return fetch_jitter(seed, self.fetch_spread, self.period_minutes)
+
+    # ENTSO: time until the next fetch, the sensors keep updating on the period boundaries
+    def next_fetch_delay(self, now=None) -> timedelta:
+        return next_fetch_delay(
+            now or dt.utcnow(), self.period_minutes, self.fetch_jitter
+        )
+
+    # ENTSO: the prices are published once a day, fetch when today or tomorrow is missing for a zone
+    def check_update_needed(self, now: datetime) -> bool:
+        if self.data is None or len(self.series) < len(self.zones):
+            return True
+        # a zone that failed keeps its older series, so the zone ending first decides
+        end = min(
+            max(
+                (segment.end for segment in self.series[zone].segments), default=0
+            )
+            for zone in self.zones
+        )
+        end = datetime.fromtimestamp(end * 60, timezone.utc)
+        tomorrow = now.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(
+            days=1
+        )
+        if end < tomorrow:
+            return True
+        return now.hour > 11 and end < tomorrow + timedelta(days=1)
+
+    async def _async_update_data(self) -> ZonePrices:
+        # the next refresh is scheduled with this interval once this one finishes
+        self.update_interval = self.next_fetch_delay()
+        now = dt.now()
+        if not self.check_update_needed(now):
+            self.logger.debug("Skipping api fetch. All data is already available")
+            return self.data
+
+        yesterday = now.replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(
+            days=1
+        )
+        tomorrow_evening = yesterday + timedelta(hours=71)
+        client = EntsoeClient(
+            api_key=self.api_key,
+            period=self.period,
+            fetch_log=self.fetch_history,
+            api_urls=self.api_urls,
+            session=async_get_clientsession(self.hass),
+        )
+
+        async def fetch(zone):
+            async with asyncio.timeout(ZONE_TIMEOUT):
+                return await client.query_price_series(
+                    AREA_INFO[zone]["code"], yesterday, tomorrow_evening
+                )
+
+        results = await asyncio.gather(
+            *(fetch(zone) for zone in self.zones), return_exceptions=True
+        )
+        for zone, result in zip(self.zones, results):
+            if isinstance(result, EntsoeUnauthorized):
+                raise UpdateFailed("Unauthorized: Please check your API-key.") from result
+            if isinstance(result, Exception):
+                self.logger.warning(
+                    f"Fetching the prices of {zone} failed with exception: {result!r}"
+                )
+                continue
+            self.series[zone] = result
+
+        if not self.series:
+            raise UpdateFailed("Fetching data from Entso-e failed.")
+        return align(
+            {zone: self.series[zone] for zone in self.zones if zone in self.series},
+            self.period_minutes,
+            ENERGY_SCALES[self.energy_scale],
+        )
+
+    # SENSOR: the prices of the zones in the current slot
+    def get_current_prices(self) -> dict[str, float]:
+        if self.data is None:
+            return {}
+        now = bucket_time(dt.utcnow(), self.period_minutes)
+        return self.data.slot(int(now.timestamp()) // 60)
+
+    # SENSOR: the difference between the most expensive and the cheapest zone
+    def get_spread(self) -> float | None:
+        prices = self.get_current_prices()
+        if len(prices) < 2:
+            return None
+        return round(max(prices.values()) - min(prices.values()), 5)
+
+    # SENSOR: the zone with the lowest price, on a tie the first configured
+    def get_min_zone(self) -> str | None:
+        prices = self.get_current_prices()
+        return min(prices, key=prices.get) if prices else None
+
+    # SENSOR: the zone with the highest price, on a tie the first configured
+    def get_max_zone(self) -> str | None:
+        prices = self.get_current_prices()
+        return max(prices, key=prices.get) if prices else None